@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 多账号
+
+每个账号使用独立的数据目录与共享内存名称，账号列表保存在 data/accounts.json。
+默认账号 default 沿用原有的 data/ 目录与 BiliMate_shm，单账号部署无需迁移。
+同一进程内的账号共用一个 HTTP 连接池（各账号的 cookies 仍相互独立）。
+"""
+
+import re, json, threading
+from pathlib import Path
+from settings_manager import write_json_atomic
+
+DATA_DIR = Path(__file__).parent / "data"
+ACCOUNTS_FILE = DATA_DIR / "accounts.json"
+DEFAULT_ACCOUNT = "default"
+# 账号名（同时用于目录名与共享内存名称，需保持简短）
+ACCOUNT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,16}$")
+
+# 共享连接池
+HTTP_POOL_CONNECTIONS = 8
+HTTP_POOL_MAXSIZE = 32
+_http_adapter = None
+_http_adapter_lock = threading.Lock()
+
+
+# 账号的文件与共享内存名称
+class AccountPaths:
+    def __init__(self, name: str = DEFAULT_ACCOUNT, base_dir: Path = DATA_DIR):
+        self.name = name
+        base_dir = Path(base_dir)
+        if name == DEFAULT_ACCOUNT:
+            self.data_dir = base_dir
+            self.shm_name = "BiliMate_shm"
+        else:
+            self.data_dir = base_dir / "accounts" / name
+            self.shm_name = f"BiliMate_{name}"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.cookie_file = self.data_dir / "cookies.json"
+        self.settings_file = self.data_dir / "settings.json"
+        self.log_file = self.data_dir / "log_BiliMate.txt"
+        self.session_cursor_file = self.data_dir / "session_cursor.json"
+        self.history_file = self.data_dir / "history.db"
+        self.repeat_guard_file = self.data_dir / "repeat_guard.json"
+        self.checkpoint_file = self.data_dir / "checkpoint.bin"
+        self.fan_names_file = self.data_dir / "fan_names.db"
+        self.profile_request_file = self.data_dir / "profile_request.json"
+
+
+# 校验账号名
+def check_account_name(name: str):
+    if not ACCOUNT_NAME_PATTERN.match(name or ""):
+        raise ValueError("账号名仅支持字母、数字、下划线和短横线，长度 1-16")
+    return name
+
+
+# 读取账号列表（文件不存在或无效时仅有默认账号）
+def load_accounts(path: Path = ACCOUNTS_FILE):
+    try:
+        names = json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        names = []
+    accounts = []
+    for name in names if isinstance(names, list) else []:
+        if isinstance(name, str) and ACCOUNT_NAME_PATTERN.match(name) and name not in accounts:
+            accounts.append(name)
+    return accounts or [DEFAULT_ACCOUNT]
+
+
+# 保存账号列表
+def save_accounts(accounts, path: Path = ACCOUNTS_FILE):
+    write_json_atomic(path, list(accounts), ensure_ascii=False, indent=2)
+
+
+# 添加账号
+def add_account(name: str, path: Path = ACCOUNTS_FILE):
+    accounts = load_accounts(path)
+    if check_account_name(name) not in accounts:
+        accounts.append(name)
+        save_accounts(accounts, path)
+    return accounts
+
+
+# 移除账号（数据目录保留）
+def remove_account(name: str, path: Path = ACCOUNTS_FILE):
+    accounts = [each for each in load_accounts(path) if each != name]
+    save_accounts(accounts or [DEFAULT_ACCOUNT], path)
+    return accounts
+
+
+# 将会话挂载到进程内共用的连接池
+def share_connection_pool(session):
+    global _http_adapter
+    if not hasattr(session, "mount"):
+        return False
+    with _http_adapter_lock:
+        if _http_adapter is None:
+            from requests.adapters import HTTPAdapter
+            _http_adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", _http_adapter)
+    session.mount("http://", _http_adapter)
+    return True
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 接口容错
+
+为 BiliApi 的各个接口分别提供重试（指数退避 + 抖动）与熔断：连续失败达到阈值后熔断，
+熔断期间直接拒绝调用，到期后放行一次试探请求，成功即恢复，失败则延长熔断时间。
+某个接口熔断时其它接口照常工作（降级运行）。每次请求的耗时与结果可记录到 MetricsRegistry。
+
+任务出错时由 TaskSupervisor 按退避时间在进程内重新运行该任务，不再重启整个进程。
+"""
+
+import time, random, threading
+from metrics import API_SECONDS, API_REQUESTS
+
+# 各接口的重试次数（未列出的接口不经过容错层，如登录相关接口）
+# 粉丝分页与消息发送已有各自的重试，此处只做熔断
+ENDPOINT_RETRIES = {
+    "get_relation_state": 2,
+    "get_fans_detail": 0,
+    "get_fans_list_status": 2,
+    "get_sessions": 2,
+    "get_user_info": 1,
+    "get_video_data": 2,
+    "send_message": 0,
+}
+
+
+# 接口熔断中
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"接口 {endpoint} 熔断中，{retry_in:.0f}秒后重试")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+# 熔断器
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 60, max_reset_timeout: float = 600):
+        self.threshold = max(1, threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opens = 0
+        self._timeout = reset_timeout
+        self._opened_until = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+
+    # 调整参数
+    def configure(self, threshold: int = None, reset_timeout: float = None):
+        with self._lock:
+            if threshold is not None:
+                self.threshold = max(1, threshold)
+            if reset_timeout is not None:
+                self.reset_timeout = reset_timeout
+                if self.state == self.CLOSED:
+                    self._timeout = reset_timeout
+
+
+    # 是否允许本次调用
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() < self._opened_until:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial = False
+            # 半开状态仅放行一次试探请求
+            if self._trial:
+                return False
+            self._trial = True
+            return True
+
+
+    # 距离下次试探的秒数
+    def retry_in(self):
+        return max(0.0, self._opened_until - time.monotonic())
+
+
+    # 调用成功
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._timeout = self.reset_timeout
+            self._trial = False
+
+
+    # 调用失败
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # 试探失败，延长熔断时间
+                self._timeout = min(self._timeout * 2, self.max_reset_timeout)
+            elif self.state == self.OPEN or self.failures < self.threshold:
+                return
+            self.state = self.OPEN
+            self.opens += 1
+            self._opened_until = time.monotonic() + self._timeout
+            self._trial = False
+
+
+# 带容错的 BiliApi 包装
+class ResilientApi:
+    def __init__(self, api, retry_delay: float = 1.0, max_delay: float = 30.0, breaker_threshold: int = 5,
+                 breaker_reset: float = 60, retries: dict = None, metrics=None):
+        self._api = api
+        # 可选的 MetricsRegistry，记录每次请求耗时与结果
+        self.metrics = metrics
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self.retries = dict(ENDPOINT_RETRIES if retries is None else retries)
+        self.breakers = {name: CircuitBreaker(breaker_threshold, breaker_reset) for name in self.retries}
+        self.stats_data = {name: {"calls": 0, "failures": 0, "retries": 0, "rejected": 0} for name in self.retries}
+        self._wrapped = {}
+
+
+    # 调整参数
+    def configure(self, retry_delay: float = None, breaker_threshold: int = None, breaker_reset: float = None):
+        if retry_delay is not None:
+            self.retry_delay = retry_delay
+        for breaker in self.breakers.values():
+            breaker.configure(breaker_threshold, breaker_reset)
+
+
+    # 未经容错层的属性与接口直接转发
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name not in self.retries or not callable(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            def wrapped(*args, **kwargs):
+                return self.call(name, getattr(self._api, name), *args, **kwargs)
+            self._wrapped[name] = wrapped
+        return wrapped
+
+
+    # 带重试与熔断的调用
+    def call(self, name: str, func, *args, **kwargs):
+        breaker = self.breakers[name]
+        stats = self.stats_data[name]
+        error = None
+        for attempt in range(self.retries[name] + 1):
+            if attempt:
+                stats["retries"] += 1
+                delay = min(self.retry_delay * (2 ** (attempt - 1)), self.max_delay)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+            if not breaker.allow():
+                stats["rejected"] += 1
+                if self.metrics is not None:
+                    self.metrics.inc(API_REQUESTS, endpoint=name, result="rejected")
+                raise CircuitOpenError(name, breaker.retry_in())
+            stats["calls"] += 1
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._record(name, start, "error")
+                stats["failures"] += 1
+                breaker.failure()
+                error = e
+                continue
+            self._record(name, start, "ok")
+            breaker.success()
+            return result
+        raise error
+
+
+    # 记录请求耗时与结果
+    def _record(self, name: str, start: float, result: str):
+        if self.metrics is None:
+            return
+        self.metrics.observe(API_SECONDS, time.perf_counter() - start, endpoint=name)
+        self.metrics.inc(API_REQUESTS, endpoint=name, result=result)
+
+
+    # 熔断中的接口
+    def degraded(self):
+        return [name for name, breaker in self.breakers.items() if breaker.state != CircuitBreaker.CLOSED]
+
+
+    # 统计信息
+    def stats(self):
+        return {
+            name: dict(stats, state=self.breakers[name].state, opens=self.breakers[name].opens)
+            for name, stats in self.stats_data.items()
+        }
+
+
+# 任务监督：出错时按退避时间在进程内重新运行该任务
+class TaskSupervisor:
+    def __init__(self, name: str, log=print, base_delay: float = 5, max_delay: float = 300):
+        self.name = name
+        self.log = log
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.restarts = 0
+        self.backoff = 0.0
+        self.last_error = ""
+
+
+    # 运行一次任务，成功返回 True
+    def run(self, func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            self.failures += 1
+            self.restarts += 1
+            self.last_error = str(e)
+            self.backoff = min(self.base_delay * (2 ** (self.failures - 1)), self.max_delay)
+            if isinstance(e, CircuitOpenError):
+                # 熔断期间等到下次试探时再运行
+                self.backoff = max(self.backoff, e.retry_in)
+                self.log(f"[{self.name}]降级运行：{e}")
+            else:
+                self.log(f"[{self.name}]异常：{e}")
+                self.log(f"[{self.name}]将在{self.backoff:.0f}秒后重新运行")
+            return False
+        if self.failures:
+            self.log(f"[{self.name}]已恢复")
+        self.failures = 0
+        self.backoff = 0.0
+        return True
+
+
+    # 统计信息
+    def stats(self):
+        return {
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "backoff": round(self.backoff, 1),
+            "last_error": self.last_error,
+        }
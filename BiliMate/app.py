@@ -1,24 +1,37 @@
-import sys, subprocess, signal, atexit, os
-import threading
+import sys, signal, atexit, os, argparse
 import streamlit.web.cli as stcli
+from supervisor import WorkerSupervisor
+from metrics import DEFAULT_PORT, MetricsServer
 
-server_proc = None
+supervisor = None
 
-def start_server():
-    global server_proc
-    server_proc = subprocess.Popen([sys.executable, "./BiliMate/server.py"])
+def start_server(workers: int):
+    """启动监督线程：按账号分片启动 server.py 工作进程，异常时自动重启"""
+    global supervisor
+    supervisor = WorkerSupervisor(workers=workers)
+    supervisor.start()
+
+def start_metrics(port: int):
+    """启动本地指标端点（Prometheus 文本格式），汇总全部账号"""
+    try:
+        MetricsServer(supervisor.collect_metrics, port).start()
+    except OSError as e:
+        print(f"指标端点启动失败（端口 {port}）：{e}")
 
 def cleanup():
-    """主进程退出时杀掉 server.py"""
-    if server_proc and server_proc.poll() is None:
-        # Windows 用 terminate；Linux/macOS 可以 terminate -> wait -> kill
-        server_proc.terminate()
-        try:
-            server_proc.wait(timeout=3)
-        except subprocess.TimeoutExpired:
-            server_proc.kill()
+    """主进程退出时结束全部 server.py 工作进程"""
+    if supervisor is not None:
+        supervisor.shutdown()
 
 if __name__ == "__main__":
+    # 工作进程数：默认等于 CPU 核数（无账号分配的进程不会启动）
+    parser = argparse.ArgumentParser(description="BiliMate")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("BILIMATE_WORKERS", 0)))
+    parser.add_argument("--port", type=int, default=8181)
+    # 指标端点端口，0 为不启动
+    parser.add_argument("--metrics-port", type=int, default=int(os.environ.get("BILIMATE_METRICS_PORT", DEFAULT_PORT)))
+    args, _ = parser.parse_known_args()
+
     # 注册钩子：当主进程收到 SIGINT/SIGTERM/SIGHUP 时杀子进程
     atexit.register(cleanup)
     signal.signal(signal.SIGINT,  lambda *_: sys.exit(0))
@@ -28,8 +41,10 @@ if __name__ == "__main__":
         signal.signal(signal.SIGHUP, lambda *_: sys.exit(0))
 
     # 启动 server
-    start_server()
+    start_server(args.workers or os.cpu_count() or 1)
+    if args.metrics_port:
+        start_metrics(args.metrics_port)
 
     # 启动 webui
-    sys.argv = ["streamlit", "run", "./BiliMate/webui.py", "--server.port=8181"]
-    stcli.main()
\ No newline at end of file
+    sys.argv = ["streamlit", "run", "./BiliMate/webui.py", f"--server.port={args.port}"]
+    stcli.main()
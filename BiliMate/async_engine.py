@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – asyncio 引擎（可选）
+
+以可取消的周期任务替代 线程 + sleep 轮询：粉丝轮询、会话轮询、视频数据、共享内存
+各自独立运行，阻塞的 BiliApi 调用放入有界线程池执行，单个慢请求不会拖住其它轮询。
+收到 SIGINT / SIGTERM 后停止调度、取消全部任务并等待其退出；线程池中已在执行的阻塞调用
+无法取消，等待其结束（最多 SHUTDOWN_TIMEOUT 秒）后再关闭数据库、日志与共享内存。
+可同时托管多个账号，所有账号共用同一个事件循环与线程池。
+
+在 settings.json 中设置 "async_engine": true 启用。
+"""
+
+import asyncio, signal, time, threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from metrics import STAGE_SECONDS
+
+# 退出时等待进行中的阻塞调用的最长时间（秒）
+SHUTDOWN_TIMEOUT = 30
+
+
+# 周期任务
+class PeriodicTask:
+    def __init__(self, name: str, func, interval, run_if=None, error_delay: float = 60, log=print):
+        # interval 可为数值或返回数值的函数（支持热更新间隔）
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_if = run_if
+        self.error_delay = error_delay
+        self.log = log
+        self.runs = 0
+        self.errors = 0
+        self.last_duration = 0.0
+
+
+    # 当前间隔
+    def current_interval(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+
+# BiliMate asyncio 引擎
+class BiliMateAsyncEngine:
+    def __init__(self, servers, max_workers: int = None):
+        # 单个服务端或服务端列表（每个账号一个）
+        self.servers = list(servers) if isinstance(servers, (list, tuple)) else [servers]
+        self.server = self.servers[0]
+        if max_workers is None:
+            max_workers = min(32, 2 + 2 * len(self.servers))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="BiliMate")
+        self.tasks: dict[str, asyncio.Task] = {}
+        # 线程池中已提交、尚未结束的调用
+        self.pending = set()
+        self.periodic: dict[str, PeriodicTask] = {}
+        self.stop_evt = None
+
+
+    # 在线程池中执行阻塞调用
+    async def run_blocking(self, func, *args):
+        future = self.executor.submit(func, *args)
+        self.pending.add(future)
+        future.add_done_callback(self.pending.discard)
+        return await asyncio.wrap_future(future)
+
+
+    # 在守护线程中执行长时间阻塞调用（如等待扫码登录），退出时不阻塞进程
+    def run_daemon(self, func, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def target():
+            try:
+                result = func(*args)
+            except BaseException as e:
+                error = e
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(error))
+            else:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+        threading.Thread(target=target, daemon=True).start()
+        return future
+
+
+    # 等待停止信号，超时返回 False
+    async def wait_stop(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.stop_evt.wait(), timeout=max(0, timeout))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+    # 周期任务循环
+    async def run_periodic(self, task: PeriodicTask):
+        while not self.stop_evt.is_set():
+            try:
+                if task.run_if is None or task.run_if():
+                    start = time.monotonic()
+                    await self.run_blocking(task.func)
+                    task.last_duration = time.monotonic() - start
+                    task.runs += 1
+                # 执行后再取间隔，自适应间隔可依据本次结果调整
+                delay = task.current_interval()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                task.errors += 1
+                # 接口熔断中则等到下次试探时再运行
+                delay = max(task.error_delay, getattr(e, "retry_in", 0))
+                task.log(f"[{task.name}]异常：{e}")
+                task.log(f"[{task.name}]将在{delay:.0f}秒后重试")
+            if await self.wait_stop(delay):
+                break
+
+
+    # 启动周期任务
+    def start_periodic(self, task: PeriodicTask):
+        self.periodic[task.name] = task
+        self.tasks[task.name] = asyncio.create_task(self.run_periodic(task), name=task.name)
+        task.log(f"\n[启动任务]-{task.name}")
+
+
+    # 注册退出信号
+    def install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop_evt.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows 不支持，退回 KeyboardInterrupt
+                pass
+
+
+    # 停止全部任务
+    async def shutdown(self):
+        self.stop_evt.set()
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+        for server in self.servers:
+            server.thread_auto_reply_msg_status = False
+            server.thread_update_video_data_status = False
+        # 取消任务不会中断已在线程中运行的轮询，等待其结束后再关闭连接
+        await asyncio.get_running_loop().run_in_executor(None, self.wait_workers, SHUTDOWN_TIMEOUT)
+        for server in self.servers:
+            # 写入最后一次状态
+            try:
+                server.update_shared_mem()
+            except Exception:
+                pass
+            server.log_print("\n程序已终止")
+            server.close()
+
+
+    # 等待线程池与后台粉丝加载中进行中的调用结束（排队中的直接取消），超时返回 False
+    def wait_workers(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        _, running = wait(list(self.pending), timeout=timeout)
+        threads = [server.fans_reload_thread for server in self.servers
+                   if getattr(server, "fans_reload_thread", None) is not None]
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        alive = len(running) + sum(thread.is_alive() for thread in threads)
+        if alive:
+            self.server.log_print(f"退出时仍有 {alive} 个调用未结束")
+        return not alive
+
+
+    # 重新加载设置参数并轮询新消息
+    @staticmethod
+    def poll_sessions(server):
+        # 一轮完整耗时（与线程模式的 auto_reply 阶段对应，性能分析时对本轮采样）
+        with server.metrics.timer(STAGE_SECONDS, stage="auto_reply"), server.profiler.iteration("auto_reply"):
+            server.load_settings()
+            server.poll_sessions()
+            server.notice_idle()
+
+
+    # 轮询粉丝变化（与会话轮询并行，性能分析时一并采样但不计入轮数）
+    @staticmethod
+    def poll_fans(server):
+        with server.profiler.iteration("auto_reply", count=False):
+            server.poll_fans()
+
+
+    # 更新视频数据
+    @staticmethod
+    def update_video_data(server):
+        with server.profiler.iteration("video_data"):
+            server.update_video_data()
+
+
+    # 单个账号：登录后启动各周期任务
+    async def run_account(self, server):
+        # 多账号时任务名带账号前缀
+        prefix = "" if len(self.servers) == 1 else f"{server.account}/"
+        log = server.log_print
+        # 共享内存先行，登录过程中前端即可显示二维码
+        self.start_periodic(PeriodicTask(f"{prefix}共享内存", server.update_shared_mem, 1, error_delay=1, log=log))
+        prepare = self.run_daemon(server.prepare)
+        stop = asyncio.create_task(self.stop_evt.wait())
+        await asyncio.wait({prepare, stop}, return_when=asyncio.FIRST_COMPLETED)
+        if self.stop_evt.is_set():
+            prepare.cancel()
+            return
+        stop.cancel()
+        await prepare
+
+        server.notice_status = True
+        server.thread_update_video_data_status = True
+        server.thread_auto_reply_msg_status = True
+        self.start_periodic(PeriodicTask(
+            f"{prefix}更新视频数据", lambda: self.update_video_data(server), 3600,
+            run_if=lambda: server.thread_update_video_data_status, log=log))
+        self.start_periodic(PeriodicTask(
+            f"{prefix}粉丝轮询", lambda: self.poll_fans(server), lambda: server.fans_interval.delay,
+            run_if=lambda: server.thread_auto_reply_msg_status, log=log))
+        self.start_periodic(PeriodicTask(
+            f"{prefix}会话轮询", lambda: self.poll_sessions(server), lambda: server.session_interval.delay,
+            run_if=lambda: server.thread_auto_reply_msg_status, log=log))
+        self.start_periodic(PeriodicTask(
+            f"{prefix}状态快照", server.save_checkpoint, lambda: max(10, server.checkpoint_interval), log=log))
+
+
+    # 主流程
+    async def main(self):
+        self.stop_evt = asyncio.Event()
+        self.install_signal_handlers()
+        try:
+            # 各账号独立登录，互不等待
+            results = await asyncio.gather(*(self.run_account(server) for server in self.servers), return_exceptions=True)
+            for server, result in zip(self.servers, results):
+                if isinstance(result, Exception):
+                    server.log_print(f"账号启动失败：{result}")
+            await self.stop_evt.wait()
+        finally:
+            await self.shutdown()
+
+
+    # 启动引擎
+    def run(self):
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            pass
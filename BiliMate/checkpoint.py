@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 运行状态快照
+
+定期把粉丝索引（关注顺序的 mid 数组，昵称另存于 fan_names.db）、会话游标、重复回复保护状态及视频数据写入 data/ 下的二进制快照，
+启动时直接恢复，粉丝列表改为后台对账，回复流程无需等待逐页加载。
+
+文件格式（小端）：
+    头部    magic "BMCP" | 版本 u16 | 分区数 u16 | my_mid i64 | 写入时间 f64
+    分区    标记 4 字节 | 长度 u32 | 内容      （未知标记跳过，便于扩展）
+            FMID 为 i64 mid 数组（关注从旧到新）
+    尾部    CRC32 u32（校验此前全部字节）
+"""
+
+import time, struct, zlib
+from pathlib import Path
+from settings_manager import write_bytes_atomic
+from fan_index import pack_mids, unpack_mids
+
+MAGIC = b"BMCP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHqd")
+SECTION_HEADER = struct.Struct("<4sI")
+CRC = struct.Struct("<I")
+
+# 视频数据（按固定顺序存储）
+STAT_FIELDS = (
+    "total_fans", "inc_fans", "total_click", "inc_click",
+    "total_like", "inc_like", "total_fav", "inc_fav", "fans_num",
+)
+STAT = struct.Struct("<" + "q" * len(STAT_FIELDS) + "d")
+CURSOR_HEADER = struct.Struct("<qI")
+CURSOR_ENTRY = struct.Struct("<qq")
+REPEAT_ENTRY = struct.Struct("<qdB")
+
+
+# 编码快照
+def encode_checkpoint(state: dict):
+    sections = []
+    if "stats" in state:
+        stats = state["stats"]
+        sections.append((b"STAT", STAT.pack(
+            *(int(stats.get(field) or 0) for field in STAT_FIELDS), float(state.get("fans_full_sync_time", 0)))))
+    if "fan_mids" in state:
+        sections.append((b"FMID", pack_mids(state["fan_mids"])))
+    if "cursor" in state:
+        timestamp_ns, handled = state["cursor"]
+        parts = [CURSOR_HEADER.pack(timestamp_ns, len(handled))]
+        parts.extend(CURSOR_ENTRY.pack(mid, seqno) for mid, seqno in handled)
+        sections.append((b"CURS", b"".join(parts)))
+    if "repeat" in state:
+        users = state["repeat"]
+        parts = [struct.pack("<I", len(users))]
+        for mid, last_seen, hashes in users:
+            hashes = list(hashes)[-255:]
+            parts.append(REPEAT_ENTRY.pack(mid, last_seen, len(hashes)))
+            parts.append(struct.pack(f"<{len(hashes)}Q", *hashes))
+        sections.append((b"REPT", b"".join(parts)))
+    parts = [HEADER.pack(MAGIC, VERSION, len(sections), int(state.get("my_mid") or 0), time.time())]
+    for tag, payload in sections:
+        parts.append(SECTION_HEADER.pack(tag, len(payload)))
+        parts.append(payload)
+    data = b"".join(parts)
+    return data + CRC.pack(zlib.crc32(data))
+
+
+# 解码快照，格式或校验不符时抛出 ValueError
+def decode_checkpoint(data: bytes):
+    if len(data) < HEADER.size + CRC.size:
+        raise ValueError("快照文件不完整")
+    body, (crc,) = data[:-CRC.size], CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(body) != crc:
+        raise ValueError("快照校验失败")
+    magic, version, count, my_mid, created = HEADER.unpack_from(body, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("快照格式不支持")
+    state = {"my_mid": my_mid, "created": created}
+    offset = HEADER.size
+    for _ in range(count):
+        tag, length = SECTION_HEADER.unpack_from(body, offset)
+        offset += SECTION_HEADER.size
+        payload = body[offset:offset + length]
+        offset += length
+        if tag == b"STAT":
+            values = STAT.unpack(payload)
+            state["stats"] = dict(zip(STAT_FIELDS, values))
+            state["fans_full_sync_time"] = values[-1]
+        elif tag == b"FMID":
+            state["fan_mids"] = unpack_mids(payload)
+        elif tag == b"CURS":
+            timestamp_ns, n = CURSOR_HEADER.unpack_from(payload, 0)
+            handled = [CURSOR_ENTRY.unpack_from(payload, CURSOR_HEADER.size + idx * CURSOR_ENTRY.size) for idx in range(n)]
+            state["cursor"] = (timestamp_ns, handled)
+        elif tag == b"REPT":
+            n = struct.unpack_from("<I", payload, 0)[0]
+            pos = 4
+            users = []
+            for _ in range(n):
+                mid, last_seen, k = REPEAT_ENTRY.unpack_from(payload, pos)
+                pos += REPEAT_ENTRY.size
+                users.append((mid, last_seen, list(struct.unpack_from(f"<{k}Q", payload, pos))))
+                pos += 8 * k
+            state["repeat"] = users
+    return state
+
+
+# 写入快照（临时文件 + 替换）
+def save_checkpoint(path: Path, state: dict):
+    data = encode_checkpoint(state)
+    write_bytes_atomic(path, data)
+    return len(data)
+
+
+# 读取快照，文件不存在或损坏返回 None
+def load_checkpoint(path: Path):
+    try:
+        return decode_checkpoint(Path(path).read_bytes())
+    except (OSError, ValueError, struct.error):
+        return None
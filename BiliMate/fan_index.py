@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 大规模粉丝索引
+
+粉丝数不设上限：粉丝 mid 保存为两个紧凑的 array('q')（每个粉丝 16 字节）：
+    关注顺序  从旧到新，用于最新粉丝展示、增量对账与快照
+    有序数组  升序，成员判断为二分查找 O(log n)
+昵称单独保存在数据目录下的 SQLite 表（fan_names.db），按需查询，不常驻内存。
+取消关注与重新关注多为最近的粉丝：在关注顺序末尾查找并删除，更早的记录只标记失效，
+在保存快照或失效记录较多时一次性压缩。
+全量加载时分页流式写入：每页只追加 mid 并批量写入昵称，不保留整页记录。
+"""
+
+import sys, heapq, bisect, sqlite3, threading
+from array import array
+from itertools import islice, groupby
+from pathlib import Path
+
+NAMES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fan_names (
+    mid   INTEGER PRIMARY KEY,
+    uname TEXT    NOT NULL
+);
+"""
+# 单次查询的 mid 数（SQLite 参数个数上限 999）
+QUERY_BATCH = 500
+# 清理昵称时每批扫描的行数
+PRUNE_BATCH = 10000
+# 流式构建时每批写入的昵称数
+NAME_BATCH = 5000
+# 分块排序的块大小（限制排序时的临时对象数量）
+SORT_CHUNK = 1 << 16
+# 取消关注、重新关注时在关注顺序末尾查找的范围
+TAIL_SCAN = 4096
+# 失效记录超过该数量时压缩关注顺序
+COMPACT_THRESHOLD = 1024
+
+
+# mid 数组编码为小端字节（快照）
+def pack_mids(mids: array):
+    if sys.byteorder == "little":
+        return mids.tobytes()
+    swapped = array("q", mids)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+# 小端字节解码为 mid 数组
+def unpack_mids(payload: bytes):
+    mids = array("q")
+    mids.frombytes(payload[:len(payload) - len(payload) % mids.itemsize])
+    if sys.byteorder != "little":
+        mids.byteswap()
+    return mids
+
+
+# 升序排列 mid 数组：分块排序后归并，临时对象只有一块的大小
+def sort_mids(mids: array):
+    chunks = [array("q", sorted(mids[i:i + SORT_CHUNK])) for i in range(0, len(mids), SORT_CHUNK)]
+    if len(chunks) <= 1:
+        return chunks[0] if chunks else array("q")
+    return array("q", heapq.merge(*chunks))
+
+
+# 粉丝昵称存储（SQLite，按需查询）
+class FanNames:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+
+    # 首次使用时打开数据库
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(NAMES_SCHEMA)
+        return self._conn
+
+
+    # 批量写入昵称（fans 为 {'uname', 'mid'} 记录）
+    def put_many(self, fans):
+        rows = [(f['mid'], str(f['uname'])) for f in fans]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO fan_names (mid, uname) VALUES (?, ?)", rows)
+
+
+    # 查询昵称，无记录返回 None
+    def get(self, mid: int):
+        with self._lock:
+            row = self._connection().execute("SELECT uname FROM fan_names WHERE mid = ?", (mid,)).fetchone()
+        return row[0] if row else None
+
+
+    # 批量查询昵称，返回 {mid: uname}
+    def get_many(self, mids):
+        mids = list(mids)
+        result = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(mids), QUERY_BATCH):
+                batch = mids[start:start + QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                result.update(conn.execute(
+                    f"SELECT mid, uname FROM fan_names WHERE mid IN ({placeholders})", batch).fetchall())
+        return result
+
+
+    # 删除昵称
+    def delete_many(self, mids):
+        rows = [(mid,) for mid in mids]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM fan_names WHERE mid = ?", rows)
+
+
+    # 清理不再是粉丝的昵称（keep 为粉丝索引），返回删除数
+    def prune(self, keep):
+        removed = 0
+        last = -sys.maxsize - 1
+        while True:
+            with self._lock:
+                mids = [row[0] for row in self._connection().execute(
+                    "SELECT mid FROM fan_names WHERE mid > ? ORDER BY mid LIMIT ?", (last, PRUNE_BATCH))]
+            if not mids:
+                return removed
+            last = mids[-1]
+            stale = [mid for mid in mids if mid not in keep]
+            self.delete_many(stale)
+            removed += len(stale)
+
+
+    # 昵称记录数
+    def count(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM fan_names").fetchone()[0]
+
+
+    # 关闭
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 粉丝索引（紧凑 mid 数组 + 二分查找，昵称按需查询）
+class FanIndex:
+    def __init__(self, order=(), names: FanNames = None):
+        # order: 关注顺序从旧到新的 mid
+        self.names = names
+        self._lock = threading.Lock()
+        # 变更计数，用于判断是否需要重新发布
+        self.version = 0
+        self._set_order(array("q", order))
+
+
+    # 由分页数据流式构建，pages 为按页码顺序的粉丝列表（每页从新到旧，与接口返回顺序一致）
+    @classmethod
+    def from_pages(cls, pages, names: FanNames = None):
+        newest_first = array("q")
+        pending = []
+        for fans in pages:
+            newest_first.extend(f['mid'] for f in fans)
+            if names is not None:
+                pending.extend(fans)
+                if len(pending) >= NAME_BATCH:
+                    names.put_many(pending)
+                    pending = []
+        if names is not None:
+            names.put_many(pending)
+        newest_first.reverse()
+        return cls(newest_first, names=names)
+
+
+    # 设置关注顺序并重建有序数组（重复的 mid 只保留最新的位置）
+    def _set_order(self, order: array):
+        ordered = sort_mids(order)
+        duplicated = {a for a, b in zip(ordered, islice(ordered, 1, None)) if a == b}
+        if duplicated:
+            # 只记录重复的 mid，临时集合很小
+            seen = set()
+            unique = array("q")
+            for mid in reversed(order):
+                if mid in duplicated:
+                    if mid in seen:
+                        continue
+                    seen.add(mid)
+                unique.append(mid)
+            unique.reverse()
+            order = unique
+            ordered = array("q", (mid for mid, _ in groupby(ordered)))
+        self._order = order
+        self._sorted = ordered
+        # 关注顺序中已失效的 mid（取消关注，或重新关注后较早的位置），压缩时清理
+        self._stale = set()
+
+
+    # 从关注顺序中移除 mid：末尾范围内直接删除，更早的记录标记失效
+    def _discard_order(self, mid: int):
+        order = self._order
+        if mid not in self._stale:
+            try:
+                del order[order.index(mid, max(0, len(order) - TAIL_SCAN))]
+                return
+            except ValueError:
+                pass
+        self._stale.add(mid)
+        if len(self._stale) > COMPACT_THRESHOLD:
+            self._compact()
+
+
+    # 压缩关注顺序：去掉失效记录（仍是粉丝的只保留最新的位置）
+    def _compact(self):
+        if not self._stale:
+            return
+        stale = self._stale
+        kept = set()
+        order = array("q")
+        for mid in reversed(self._order):
+            if mid in stale:
+                if mid in kept or mid not in self:
+                    continue
+                kept.add(mid)
+            order.append(mid)
+        order.reverse()
+        self._order = order
+        self._stale = set()
+
+
+    # 有序数组中插入
+    def _insert_sorted(self, mid: int):
+        self._sorted.insert(bisect.bisect_left(self._sorted, mid), mid)
+
+
+    # 有序数组中删除
+    def _delete_sorted(self, mid: int):
+        idx = bisect.bisect_left(self._sorted, mid)
+        if idx < len(self._sorted) and self._sorted[idx] == mid:
+            del self._sorted[idx]
+
+
+    # 添加最新关注的粉丝（fans 按从新到旧排列，与接口返回顺序一致）
+    def extend_newest(self, fans):
+        fans = list(fans)
+        if self.names is not None:
+            self.names.put_many(fans)
+        with self._lock:
+            for fan in reversed(fans):
+                mid = fan['mid']
+                if mid in self:
+                    # 重新关注：移到最新
+                    self._discard_order(mid)
+                else:
+                    self._insert_sorted(mid)
+                self._order.append(mid)
+            self.version += 1
+
+
+    # 添加单个粉丝（视为最新关注）
+    def add(self, fan: dict):
+        self.extend_newest([fan])
+        return {'uname': fan['uname'], 'mid': fan['mid']}
+
+
+    # 移除粉丝（取消关注）
+    def remove(self, mid: int):
+        record = self.get(mid, {'uname': "", 'mid': mid}) if mid in self else None
+        if record is None:
+            return None
+        with self._lock:
+            self._delete_sorted(mid)
+            self._discard_order(mid)
+            self.version += 1
+        if self.names is not None:
+            self.names.delete_many([mid])
+        return record
+
+
+    # 以远端最新的粉丝替换本地最新的 covered 个记录（增量对账结果，fans 从新到旧）
+    def replace_newest(self, fans: list, covered: int):
+        remote = list(dict.fromkeys(f['mid'] for f in fans))
+        remote_set = set(remote)
+        if self.names is not None:
+            self.names.put_many(fans)
+        with self._lock:
+            self._compact()
+            keep = len(self._order) - covered
+            dropped = self._order[keep:]
+            removed = [mid for mid in dropped if mid not in remote_set]
+            for mid in removed:
+                self._delete_sorted(mid)
+            dropped_set = set(dropped)
+            for mid in remote_set:
+                if mid not in dropped_set:
+                    self._insert_sorted(mid)
+            del self._order[keep:]
+            self._order.extend(reversed(remote))
+            self.version += 1
+        if self.names is not None:
+            self.names.delete_many(removed)
+        return removed
+
+
+    # 追加更早关注的粉丝（mids 从旧到新，如部分分页加载失败时保留的原有记录），已有的跳过，返回追加数
+    def extend_oldest(self, mids):
+        with self._lock:
+            missing = array("q", (mid for mid in mids if mid not in self))
+            added = len(missing)
+            if not added:
+                return 0
+            self._compact()
+            missing.extend(self._order)
+            self._set_order(missing)
+            self.version += 1
+        return added
+
+
+    # 查看最新关注的粉丝
+    def latest(self):
+        return self.get(self.newest_mids(1)[0])
+
+
+    # 清空
+    def clear(self):
+        with self._lock:
+            self._set_order(array("q"))
+            self.version += 1
+
+
+    # 获取粉丝记录，非粉丝或无昵称记录时返回 default
+    def get(self, mid: int, default=None):
+        if mid not in self or self.names is None:
+            return default
+        uname = self.names.get(mid)
+        return default if uname is None else {'uname': uname, 'mid': mid}
+
+
+    # 批量获取粉丝昵称，返回 {mid: uname}（非粉丝与无昵称记录的跳过）
+    def get_many(self, mids):
+        mids = [mid for mid in mids if mid in self]
+        if not mids or self.names is None:
+            return {}
+        return self.names.get_many(mids)
+
+
+    # 最新关注的 n 个粉丝 mid（从新到旧）
+    def newest_mids(self, n: int):
+        with self._lock:
+            order, stale = self._order, self._stale
+            if not stale:
+                mids = order[max(0, len(order) - n):]
+                mids.reverse()
+                return mids
+            mids = array("q")
+            kept = set()
+            for mid in reversed(order):
+                if len(mids) >= n:
+                    break
+                if mid in stale:
+                    if mid in kept or mid not in self:
+                        continue
+                    kept.add(mid)
+                mids.append(mid)
+            return mids
+
+
+    # 最新关注的 n 个粉丝（从新到旧）
+    def newest(self, n: int):
+        mids = self.newest_mids(n)
+        unames = self.names.get_many(mids) if self.names is not None else {}
+        return [{'uname': unames.get(mid, ""), 'mid': mid} for mid in mids]
+
+
+    # 关注顺序（从旧到新）的 mid 数组副本，用于快照
+    def order(self):
+        with self._lock:
+            self._compact()
+            return array("q", self._order)
+
+
+    # 内存占用（字节，不含昵称）
+    def nbytes(self):
+        return (len(self._order) + len(self._sorted)) * self._order.itemsize
+
+
+    def __contains__(self, mid):
+        ordered = self._sorted
+        idx = bisect.bisect_left(ordered, mid)
+        return idx < len(ordered) and ordered[idx] == mid
+
+
+    def __len__(self):
+        return len(self._sorted)
+
+
+    def __bool__(self):
+        return bool(self._sorted)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 粉丝分页并发加载
+
+通过有界线程池并发拉取粉丝分页，并以令牌桶限制请求速率；
+每页单独重试，失败的页不影响其它页，结果按页码顺序重新拼接；
+大量粉丝时按窗口分批拉取、逐页产出，无需在内存中保留全部分页。
+"""
+
+import time, threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 速率限制（令牌桶）
+class RateLimiter:
+    def __init__(self, rate: float = 5, burst: int = 1):
+        # rate: 每秒允许的请求数，<=0 表示不限速
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    # 获取一个令牌，不足时等待
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# 粉丝分页加载器
+class PagedFansLoader:
+    def __init__(self, bili_api, concurrency: int = 4, rate: float = 5, retries: int = 2,
+                 retry_delay: float = 1.0, page_size: int = 50):
+        self.bili_api = bili_api
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate, burst=self.concurrency)
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self.page_size = page_size
+
+
+    # 拉取单页（带重试），失败返回 None
+    def fetch_page(self, page: int):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.retry_delay * (2 ** (attempt - 1)))
+            self.limiter.acquire()
+            try:
+                fans_detail = self.bili_api.get_fans_detail(page=page, num=self.page_size)
+            except Exception:
+                continue
+            if fans_detail and 'list' in fans_detail:
+                return fans_detail['list']
+        return None
+
+
+    # 并发拉取指定页码，返回 ({页码: 粉丝列表}, [失败页码])
+    def fetch_pages(self, pages):
+        pages = list(pages)
+        if not pages:
+            return {}, []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pages))) as pool:
+            results = dict(zip(pages, pool.map(self.fetch_page, pages)))
+        failed = [page for page, fans in results.items() if fans is None]
+        return {page: fans for page, fans in results.items() if fans is not None}, failed
+
+
+    # 按页码顺序流式拉取前 total 个粉丝，每次并发拉取 window 页，逐页产出 (页码, 粉丝列表 或 None)
+    def iter_pages(self, total: int, window: int = None):
+        if total <= 0:
+            return
+        pages = (total - 1) // self.page_size + 1
+        window = window or self.concurrency * 4
+        for start in range(1, pages + 1, window):
+            batch = range(start, min(pages, start + window - 1) + 1)
+            results, _ = self.fetch_pages(batch)
+            for page in batch:
+                yield page, results.get(page)
+
+
+    # 加载前 total 个粉丝，返回 (按关注顺序从新到旧的粉丝列表, [失败页码])
+    def load(self, total: int):
+        fans = []
+        failed = []
+        for page, page_fans in self.iter_pages(total):
+            if page_fans is None:
+                failed.append(page)
+            else:
+                fans.extend(page_fans)
+        return fans, failed
+
+
+    # 增量对账：从最新一页开始拉取，直到与本地记录对齐
+    # known: 本地粉丝索引（FanIndex），total: 当前粉丝总数
+    # 仅与本地最新的 window 个记录比对，远端粉丝在本地的位置超出比对范围时视为未能对齐
+    # 返回 ((远端最新粉丝列表, 被替换的本地最新记录数) 或 None, 拉取页数)，None 表示最新几页内未能对齐
+    def reconcile(self, known, total: int, max_pages: int = 4, window: int = None):
+        pages = (total - 1) // self.page_size + 1 if total > 0 else 0
+        recent = known.newest_mids(window or max_pages * self.page_size * 4)
+        known_pos = {mid: idx for idx, mid in enumerate(recent)}
+        remote = []
+        remote_mids = set()
+        added = 0
+        removed = 0
+        covered = 0     # 本地前 covered 个记录已与远端比对
+        fetched = 0
+        for page in range(1, min(pages, max_pages) + 1):
+            fans = self.fetch_page(page)
+            fetched += 1
+            if fans is None:
+                return None, fetched
+            remote.extend(fans)
+            last_pos = -1
+            for f in fans:
+                if f['mid'] in remote_mids:
+                    continue
+                remote_mids.add(f['mid'])
+                pos = known_pos.get(f['mid'])
+                if pos is None:
+                    if f['mid'] in known:
+                        return None, fetched
+                    added += 1
+                else:
+                    last_pos = max(last_pos, pos)
+            # 统计本地已覆盖区间中远端不存在的记录（即取消关注）
+            while covered <= last_pos:
+                if recent[covered] not in remote_mids:
+                    removed += 1
+                covered += 1
+            if covered and len(known) - removed + added == total:
+                return (remote, covered), fetched
+        return None, fetched
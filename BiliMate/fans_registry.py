@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 粉丝索引
+
+以 mid 为键的有序字典保存粉丝记录：成员判断、增删均为 O(1)。
+字典按关注时间 从旧到新 排列，对外（前端展示）按 从新到旧 输出。
+用于每轮检测到的新粉丝（数量少，记录含昵称）；全部粉丝见 fan_index.py。
+"""
+
+
+# 粉丝索引
+class FansRegistry:
+    def __init__(self, fans=()):
+        # mid -> {'uname', 'mid'}，插入顺序 = 关注时间从旧到新
+        self._index: dict[int, dict] = {}
+        # 变更计数，用于判断是否需要重新发布
+        self.version = 0
+        self.extend_newest(fans)
+
+
+    # 从B站接口数据构造粉丝记录
+    @staticmethod
+    def make_record(fan: dict):
+        return {'uname': fan['uname'], 'mid': fan['mid']}
+
+
+    # 添加最新关注的粉丝（fans 按从新到旧排列，与接口返回顺序一致）
+    def extend_newest(self, fans):
+        for fan in reversed(list(fans)):
+            self.add(fan)
+
+
+    # 添加单个粉丝（视为最新关注）
+    def add(self, fan: dict):
+        record = self.make_record(fan)
+        self._index.pop(record['mid'], None)
+        self._index[record['mid']] = record
+        self.version += 1
+        return record
+
+
+    # 移除粉丝（取消关注）
+    def remove(self, mid: int):
+        record = self._index.pop(mid, None)
+        if record is not None:
+            self.version += 1
+        return record
+
+
+    # 查看最新关注的粉丝
+    def latest(self):
+        return self._index[next(reversed(self._index))]
+
+
+    # 清空
+    def clear(self):
+        self._index.clear()
+        self.version += 1
+
+
+    # 获取粉丝记录
+    def get(self, mid: int, default=None):
+        return self._index.get(mid, default)
+
+
+    # 最新关注的 n 个粉丝（从新到旧）
+    def newest(self, n: int):
+        result = []
+        for record in reversed(self._index.values()):
+            if len(result) >= n:
+                break
+            result.append(record)
+        return result
+
+
+    # 全部粉丝（从新到旧）
+    def to_list(self):
+        return list(reversed(self._index.values()))
+
+
+    def __contains__(self, mid):
+        return mid in self._index
+
+
+    def __len__(self):
+        return len(self._index)
+
+
+    def __bool__(self):
+        return bool(self._index)
+
+
+    def __iter__(self):
+        return reversed(self._index.values())
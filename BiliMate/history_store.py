@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 回复历史存储
+
+SQLite（WAL 模式）记录每条消息的处理结果：时间、用户、身份、命中规则、消息与回复。
+写入由后台线程批量提交；按 用户+时间、时间、规则+时间 建立索引，
+另维护按天汇总的规则命中表，近 N 天命中统计无需扫描明细。
+查询均为游标分页（按 id 倒序），数据量增大时耗时不随页码增长。
+"""
+
+import time, queue, sqlite3, threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS replies (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts     REAL    NOT NULL,
+    mid    INTEGER NOT NULL,
+    role   TEXT    NOT NULL,
+    rule   TEXT    NOT NULL,
+    status TEXT    NOT NULL,
+    msg    TEXT,
+    reply  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_replies_mid_id ON replies (mid, id);
+CREATE INDEX IF NOT EXISTS idx_replies_ts ON replies (ts);
+CREATE INDEX IF NOT EXISTS idx_replies_rule_ts ON replies (rule, ts);
+CREATE TABLE IF NOT EXISTS rule_daily (
+    day  TEXT    NOT NULL,
+    rule TEXT    NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (day, rule)
+) WITHOUT ROWID;
+"""
+
+
+# 打开数据库连接
+def connect(path: Path, readonly: bool = False):
+    if readonly:
+        conn = sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# 历史写入（后台批量提交）
+class HistoryWriter:
+    def __init__(self, path: Path, batch_size: int = 500, flush_interval: float = 1.0, queue_size: int = 20000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._conn = connect(self.path)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="BiliMateHistory")
+        self._thread.start()
+
+
+    # 记录一条消息处理结果（不阻塞）
+    def record(self, mid: int, role: str, rule: str, status: str, msg: str = "", reply: str = "", ts: float = None):
+        try:
+            self._queue.put_nowait((ts or time.time(), mid, role, rule or "", status, msg, reply))
+        except queue.Full:
+            self.dropped += 1
+
+
+    # 后台线程
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                if self._stop.is_set():
+                    break
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._insert(batch)
+            except Exception as e:
+                print(f"写入回复历史失败：{e}")
+        self._conn.close()
+
+
+    # 批量插入并更新按天汇总
+    def _insert(self, batch):
+        daily: dict[tuple[str, str], int] = {}
+        for ts, _, _, rule, status, _, _ in batch:
+            if status == "sent":
+                key = (time.strftime("%Y-%m-%d", time.localtime(ts)), rule)
+                daily[key] = daily.get(key, 0) + 1
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO replies (ts, mid, role, rule, status, msg, reply) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            self._conn.executemany(
+                "INSERT INTO rule_daily (day, rule, hits) VALUES (?, ?, ?) "
+                "ON CONFLICT (day, rule) DO UPDATE SET hits = hits + excluded.hits",
+                [(day, rule, hits) for (day, rule), hits in daily.items()],
+            )
+        self.written += len(batch)
+
+
+    # 写完剩余记录并停止
+    def close(self, timeout: float = 5):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+# 历史查询（只读）
+class HistoryReader:
+    def __init__(self, path: Path):
+        self.conn = connect(path, readonly=True)
+
+
+    # 某用户的全部对话（按时间倒序，before_id 为上一页最后一条的 id）
+    def conversations(self, mid: int, limit: int = 50, before_id: int = None):
+        if before_id is None:
+            rows = self.conn.execute(
+                "SELECT * FROM replies WHERE mid = ? ORDER BY id DESC LIMIT ?", (mid, limit))
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM replies WHERE mid = ? AND id < ? ORDER BY id DESC LIMIT ?", (mid, before_id, limit))
+        return [dict(row) for row in rows]
+
+
+    # 最近记录
+    def recent(self, limit: int = 50, before_id: int = None):
+        if before_id is None:
+            rows = self.conn.execute("SELECT * FROM replies ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM replies WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
+        return [dict(row) for row in rows]
+
+
+    # 近 days 天各规则命中次数
+    def rule_hits(self, days: int = 7):
+        since = time.strftime("%Y-%m-%d", time.localtime(time.time() - (days - 1) * 86400))
+        rows = self.conn.execute(
+            "SELECT rule, SUM(hits) AS hits FROM rule_daily WHERE day >= ? GROUP BY rule ORDER BY hits DESC",
+            (since,))
+        return [dict(row) for row in rows]
+
+
+    # 某规则在时间段内的记录
+    def by_rule(self, rule: str, since_ts: float, limit: int = 50):
+        rows = self.conn.execute(
+            "SELECT * FROM replies WHERE rule = ? AND ts >= ? ORDER BY ts DESC LIMIT ?", (rule, since_ts, limit))
+        return [dict(row) for row in rows]
+
+
+    def close(self):
+        self.conn.close()
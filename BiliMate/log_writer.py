@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 日志写入
+
+日志行放入有界队列，由后台线程批量写入并定期刷新，调用方永不阻塞（队列满时丢弃并计数）。
+文件超过上限时按编号重命名轮转（log.1、log.2 ...），可选 gzip 压缩旧分段，内存占用恒定。
+"""
+
+import gzip, queue, shutil, threading, atexit
+from pathlib import Path
+
+
+# 后台日志写入器
+class AsyncLogWriter:
+    def __init__(self, path: Path, max_bytes: int = 100 * 1024 * 1024, backups: int = 5,
+                 compress: bool = False, queue_size: int = 10000, flush_interval: float = 0.5):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.rotations = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="BiliMateLog")
+        self._thread.start()
+        atexit.register(self.close)
+
+
+    # 写入一行（不阻塞）
+    def write(self, line: str):
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+
+    # 调整轮转参数
+    def configure(self, max_bytes: int = None, backups: int = None, compress: bool = None):
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if backups is not None:
+            self.backups = backups
+        if compress is not None:
+            self.compress = compress
+
+
+    # 后台线程
+    def _run(self):
+        file = None
+        try:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                # 一次取完当前队列中的全部日志
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    if file is None:
+                        file = open(self.path, "a", encoding="utf-8")
+                    file.write("\n".join(batch) + "\n")
+                    file.flush()
+                    if file.tell() >= self.max_bytes:
+                        file.close()
+                        file = None
+                        self._rotate()
+                except Exception as e:
+                    print(f"写入日志失败：{e}")
+                    if file is not None:
+                        file.close()
+                        file = None
+        finally:
+            if file is not None:
+                file.close()
+
+
+    # 分段文件名
+    def _segment(self, idx: int):
+        suffix = ".gz" if self.compress else ""
+        return self.path.with_name(f"{self.path.name}.{idx}{suffix}")
+
+
+    # 轮转：log -> log.1 -> log.2 ...，超出 backups 的分段删除
+    def _rotate(self):
+        for idx in range(self.backups, 0, -1):
+            for suffix in ("", ".gz"):
+                src = self.path.with_name(f"{self.path.name}.{idx}{suffix}")
+                if not src.exists():
+                    continue
+                if idx >= self.backups:
+                    src.unlink()
+                else:
+                    src.replace(self.path.with_name(f"{self.path.name}.{idx + 1}{suffix}"))
+        if self.backups <= 0:
+            self.path.unlink(missing_ok=True)
+        elif self.compress:
+            # 流式压缩，内存占用恒定
+            rotated = self.path.with_name(f"{self.path.name}.rotating")
+            self.path.replace(rotated)
+            with open(rotated, "rb") as src, gzip.open(self._segment(1), "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            rotated.unlink()
+        else:
+            self.path.replace(self._segment(1))
+        self.rotations += 1
+
+
+    # 写完剩余日志并停止
+    def close(self, timeout: float = 3):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+    # 统计信息
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 运行指标
+
+记录计数器、数值与耗时直方图（固定分桶，观测一次仅一次二分查找与计数），
+导出为 Prometheus 文本格式，由本地 HTTP 端点（默认 127.0.0.1:9181/metrics）提供。
+每个账号一个 MetricsRegistry，快照经共享内存 metrics 分区发布，
+监督进程汇总各账号的快照对外提供，前端读取同一分区展示摘要。
+"""
+
+import time, json, bisect, functools, threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 耗时分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_PORT = 9181
+
+# 指标名称
+API_SECONDS = "bilimate_api_request_seconds"
+API_REQUESTS = "bilimate_api_requests_total"
+STAGE_SECONDS = "bilimate_stage_seconds"
+STAGE_ERRORS = "bilimate_stage_errors_total"
+REPLIES = "bilimate_replies_total"
+
+# 指标说明与类型
+METRIC_HELP = {
+    API_SECONDS: ("histogram", "BiliApi 单次请求耗时（秒，每次重试单独计）"),
+    API_REQUESTS: ("counter", "BiliApi 请求数（result: ok/error/rejected）"),
+    STAGE_SECONDS: ("histogram", "回复流程各阶段耗时（秒）"),
+    STAGE_ERRORS: ("counter", "回复流程各阶段异常数"),
+    REPLIES: ("counter", "回复结果数（status 同回复历史）"),
+    "bilimate_fans_loaded": ("gauge", "已加载粉丝数"),
+    "bilimate_reply_queue_depth": ("gauge", "待回复会话数"),
+    "bilimate_send_queue_depth": ("gauge", "待发送消息数"),
+    "bilimate_api_circuit_open": ("gauge", "接口是否熔断中（1 为熔断）"),
+    "bilimate_worker_up": ("gauge", "工作进程是否运行"),
+    "bilimate_worker_restarts_total": ("counter", "工作进程重启次数"),
+}
+
+
+# 按分桶计数估算分位数（桶内线性插值）
+def bucket_quantile(buckets, counts, q: float):
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for idx, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            lower = buckets[idx - 1] if idx else 0.0
+            if idx >= len(buckets):
+                # 超出最大分桶，返回最大分桶上限
+                return buckets[-1]
+            return lower + (buckets[idx] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+# 耗时直方图
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # 最后一项为超出最大分桶（+Inf）的计数
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+
+    # 记录一次观测
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+# 指标注册表（线程安全）
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # (名称, 标签) -> 值
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+
+
+    # 计数器累加
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+
+    # 设置数值
+    def set(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+
+    # 记录耗时
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+
+    # 计时代码块，异常时另记异常数（name 为直方图名称，errors 为异常计数器名称）
+    @contextmanager
+    def timer(self, name: str, errors: str = None, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            if errors:
+                self.inc(errors, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+
+    # 快照（可 JSON 序列化）
+    def snapshot(self):
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                "gauges": [[name, dict(labels), value] for (name, labels), value in self._gauges.items()],
+                "histograms": [
+                    [name, dict(labels), list(h.counts), h.sum]
+                    for (name, labels), h in self._histograms.items()
+                ],
+            }
+
+
+# 方法装饰器：记录阶段耗时与异常数（所属对象需有 metrics 属性）
+def timed_stage(stage: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(STAGE_SECONDS, STAGE_ERRORS, stage=stage):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 快照编码（共享内存 metrics 分区）
+def encode_snapshot(snapshot: dict):
+    return json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+# 快照解码
+def decode_snapshot(payload: bytes):
+    return json.loads(payload) if payload else {}
+
+
+# 标签格式化
+def _format_labels(labels: dict):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# 数值格式化
+def _format_value(value: float):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# 导出 Prometheus 文本格式，snapshots 为 [(附加标签, 快照)]，如 [({"account": "default"}, snapshot)]
+def render_prometheus(snapshots):
+    families: dict[str, list] = {}
+    for extra, snapshot in snapshots:
+        buckets = snapshot.get("buckets", DEFAULT_BUCKETS)
+        for kind in ("counters", "gauges"):
+            for name, labels, value in snapshot.get(kind, []):
+                families.setdefault(name, []).append(f"{name}{_format_labels({**extra, **labels})} {_format_value(value)}")
+        for name, labels, counts, total in snapshot.get("histograms", []):
+            lines = families.setdefault(name, [])
+            labels = {**extra, **labels}
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(total))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    output = []
+    for name, lines in families.items():
+        kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+        output.append(f"# HELP {name} {help_text}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(lines)
+    return "\n".join(output) + "\n"
+
+
+# 直方图摘要（前端展示）：每项含标签、次数、平均与 P50/P95/P99（秒）
+def summarize(snapshot: dict, name: str):
+    buckets = snapshot.get("buckets", DEFAULT_BUCKETS)
+    rows = []
+    for metric, labels, counts, total in snapshot.get("histograms", []):
+        if metric != name:
+            continue
+        count = sum(counts)
+        rows.append(dict(
+            labels,
+            count=count,
+            avg=total / count if count else 0.0,
+            p50=bucket_quantile(buckets, counts, 0.5),
+            p95=bucket_quantile(buckets, counts, 0.95),
+            p99=bucket_quantile(buckets, counts, 0.99),
+        ))
+    return rows
+
+
+# 计数器按标签取值
+def counter_values(snapshot: dict, name: str):
+    return [(labels, value) for metric, labels, value in snapshot.get("counters", []) if metric == name]
+
+
+# 本地 HTTP 端点
+class MetricsServer:
+    def __init__(self, collect, port: int = DEFAULT_PORT, host: str = "127.0.0.1"):
+        # collect() 返回 [(附加标签, 快照)]
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self._httpd = None
+
+
+    # 在后台线程中启动
+    def start(self):
+        collect = self.collect
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = render_prometheus(collect()).encode()
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # 不输出访问日志
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="BiliMateMetrics").start()
+        return self
+
+
+    # 停止
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 自适应轮询间隔
+
+有活动（新粉丝、新消息）后立即回到最短间隔；连续空闲时按倍数指数退避直至最长间隔。
+每次间隔叠加随机抖动，且始终限制在 [最短, 最长] 区间内。
+粉丝轮询与会话轮询各用一个实例，节奏互不影响。
+"""
+
+import random, threading
+
+
+# 自适应轮询间隔
+class AdaptiveInterval:
+    def __init__(self, min_interval: float = 5, max_interval: float = 60, backoff: float = 2.0, jitter: float = 0.2):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        # 退避后的基准间隔（不含抖动）
+        self.current = min_interval
+        # 下一次实际等待时间（含抖动）
+        self.delay = min_interval
+        self.active_polls = 0
+        self.idle_polls = 0
+        self._lock = threading.Lock()
+
+
+    # 调整参数
+    def configure(self, min_interval: float = None, max_interval: float = None, backoff: float = None, jitter: float = None):
+        with self._lock:
+            if min_interval is not None:
+                self.min_interval = max(0.1, min_interval)
+            if max_interval is not None:
+                self.max_interval = max_interval
+            self.max_interval = max(self.min_interval, self.max_interval)
+            if backoff is not None:
+                self.backoff = max(1.0, backoff)
+            if jitter is not None:
+                self.jitter = min(max(0.0, jitter), 1.0)
+            self.current = min(max(self.current, self.min_interval), self.max_interval)
+            self.delay = self._jittered()
+
+
+    # 叠加抖动并限制在区间内
+    def _jittered(self):
+        delay = self.current * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(max(delay, self.min_interval), self.max_interval)
+
+
+    # 记录一次轮询结果，返回下一次等待时间
+    def record(self, active: bool):
+        with self._lock:
+            if active:
+                self.active_polls += 1
+                self.current = self.min_interval
+            else:
+                self.idle_polls += 1
+                self.current = min(self.current * self.backoff, self.max_interval)
+            self.delay = self._jittered()
+            return self.delay
+
+
+    # 统计信息
+    def stats(self):
+        return {
+            "delay": round(self.delay, 2),
+            "min": self.min_interval,
+            "max": self.max_interval,
+            "active_polls": self.active_polls,
+            "idle_polls": self.idle_polls,
+        }
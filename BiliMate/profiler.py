@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 按需性能分析
+
+前端写入控制文件（profile_request.json）发起一次分析：对指定任务的 N 轮迭代进行采样。
+采样线程按固定间隔读取正在执行迭代的线程的调用栈（sys._current_frames），
+仅在迭代进行中采样，空闲等待不计入，对运行中的服务影响很小。
+自动回复的一轮迭代之外，回复线程处理会话与发送线程发送回复时也一并采样（不计入轮数），
+各线程的调用栈以线程名为根，可在火焰图中区分。
+结束后在数据目录写入：
+    profile_<任务>_<时间>.folded  折叠调用栈（flamegraph.pl / speedscope 可直接读取）
+    profile_<任务>_<时间>.txt     耗时最多的函数（自身 / 累计采样占比）
+"""
+
+import os, sys, json, time, threading
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from settings_manager import write_json_atomic
+
+# 可分析的任务
+TARGETS = {
+    "auto_reply": "自动回复消息",
+    "video_data": "更新视频数据",
+}
+# 采样间隔（毫秒）与单次分析的最长时间（秒）
+DEFAULT_INTERVAL_MS = 5
+MAX_SECONDS = 3600
+# 保留的分析结果数
+KEEP_PROFILES = 10
+# 摘要中显示的函数数
+TOP_FUNCTIONS = 30
+FILE_PREFIX = "profile_"
+TIME_FORMAT = "%Y%m%d_%H%M%S"
+TIME_LENGTH = len(time.strftime(TIME_FORMAT))
+
+
+# 调用栈帧名称：函数名 (文件名:行号)
+def frame_label(code):
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# 列出分析结果（按文件名末尾的开始时间，新的在前，与任务无关），返回 [(摘要文件, 折叠调用栈文件)]
+def list_profiles(out_dir: Path):
+    summaries = sorted(Path(out_dir).glob(f"{FILE_PREFIX}*.txt"),
+                       key=lambda path: (path.stem[-TIME_LENGTH:], path.stat().st_mtime_ns), reverse=True)
+    return [(summary, summary.with_suffix(".folded")) for summary in summaries]
+
+
+# 单次分析
+class ProfileSession:
+    def __init__(self, request_id, target: str, iterations: int, interval_ms: float, out_dir: Path, log=print):
+        self.request_id = request_id
+        self.target = target
+        self.iterations = max(1, iterations)
+        self.interval = max(1.0, interval_ms) / 1000
+        self.out_dir = Path(out_dir)
+        self.log = log
+        self.done = 0
+        self.samples = 0
+        self.busy_seconds = 0.0
+        self.started = time.time()
+        self.state = "running"
+        self.file = ""
+        # 正在执行迭代的线程：ident -> 线程名；嵌套迭代的层数
+        self._active: dict[int, str] = {}
+        self._depth = Counter()
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True, name="BiliMateProfiler")
+        self._thread.start()
+
+
+    # 进入迭代（在执行迭代的线程中调用）
+    def enter(self):
+        thread = threading.current_thread()
+        with self._lock:
+            self._active[thread.ident] = thread.name
+            self._depth[thread.ident] += 1
+
+
+    # 结束迭代，count 为 False 时不计入迭代次数（如异步引擎中与会话轮询并行的粉丝轮询）
+    def exit(self, busy: float, count: bool = True):
+        ident = threading.get_ident()
+        with self._lock:
+            self._depth[ident] -= 1
+            if self._depth[ident] <= 0:
+                del self._depth[ident]
+                self._active.pop(ident, None)
+            if not count:
+                return
+            self.done += 1
+            self.busy_seconds += busy
+            if self.done >= self.iterations:
+                self._stop.set()
+
+
+    # 取消
+    def cancel(self):
+        self._stop.set()
+
+
+    # 采样循环，结束后写入结果
+    def run(self):
+        own = threading.get_ident()
+        deadline = time.monotonic() + MAX_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, thread_name in active.items():
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_name)
+                self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            del frames
+        try:
+            self.file = self.write()
+            self.state = "done"
+            self.log(f"性能分析完成：{self.file}（{self.done} 轮，{self.samples} 个采样）")
+        except Exception as e:
+            self.state = "error"
+            self.log(f"性能分析结果写入失败：{e}")
+
+
+    # 写入折叠调用栈与函数摘要，返回摘要文件名
+    def write(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{FILE_PREFIX}{self.target}_{time.strftime(TIME_FORMAT, time.localtime(self.started))}"
+        folded = self.out_dir / f"{stem}.folded"
+        summary = self.out_dir / f"{stem}.txt"
+        folded.write_text("".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common()), encoding="utf-8")
+        # 自身采样（栈顶函数）与累计采样（出现在栈中的函数，同一栈内只计一次）
+        own, total = Counter(), Counter()
+        for stack, count in self._stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        samples = max(1, self.samples)
+        lines = [
+            f"任务：{TARGETS.get(self.target, self.target)}（{self.target}）",
+            f"开始：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))}，"
+            f"迭代：{self.done}/{self.iterations}，迭代耗时合计：{self.busy_seconds:.2f}s",
+            f"采样间隔：{self.interval * 1000:.0f}ms，采样数：{self.samples}",
+            "",
+            f"自身耗时最多的函数（前 {TOP_FUNCTIONS}）：",
+            f"{'自身%':>8}{'累计%':>8}{'采样':>8}  函数",
+        ]
+        for label, count in own.most_common(TOP_FUNCTIONS):
+            lines.append(f"{count / samples:>8.1%}{total[label] / samples:>8.1%}{count:>8}  {label}")
+        lines += ["", f"累计耗时最多的函数（前 {TOP_FUNCTIONS}）：", f"{'累计%':>8}{'采样':>8}  函数"]
+        for label, count in total.most_common(TOP_FUNCTIONS):
+            lines.append(f"{count / samples:>8.1%}{count:>8}  {label}")
+        summary.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        # 只保留最近的结果
+        for old_summary, old_folded in list_profiles(self.out_dir)[KEEP_PROFILES:]:
+            old_summary.unlink(missing_ok=True)
+            old_folded.unlink(missing_ok=True)
+        return summary.name
+
+
+    # 状态信息
+    def stats(self):
+        return {
+            "id": self.request_id,
+            "target": self.target,
+            "state": self.state,
+            "iterations": self.iterations,
+            "done": self.done,
+            "samples": self.samples,
+            "file": self.file,
+        }
+
+
+# 性能分析控制：读取控制文件，按请求启动或取消分析
+class Profiler:
+    def __init__(self, control_file: Path, out_dir: Path, log=print):
+        self.control_file = Path(control_file)
+        self.out_dir = Path(out_dir)
+        self.log = log
+        self.session: ProfileSession = None
+        self._key = None
+        self._handled_id = None
+        # 启动前写入的请求不再执行（如重启前未完成的分析）
+        self._since = time.time_ns()
+        self._lock = threading.Lock()
+
+
+    # 检查控制文件（修改时间或大小变化时才读取）
+    def poll(self):
+        try:
+            stat = self.control_file.stat()
+        except FileNotFoundError:
+            return
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._key:
+            return
+        self._key = key
+        try:
+            request = json.loads(self.control_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            if request.get("id") == self._handled_id or (request.get("id") or 0) < self._since:
+                return
+            self._handled_id = request.get("id")
+            if request.get("action") == "cancel":
+                if self.session is not None and self.session.state == "running":
+                    self.session.cancel()
+                    self.log("性能分析已取消")
+                return
+            target = request.get("target")
+            if target not in TARGETS:
+                self.log(f"未知的性能分析任务：{target}")
+                return
+            if self.session is not None and self.session.state == "running":
+                self.session.cancel()
+            self.session = ProfileSession(
+                self._handled_id, target, int(request.get("iterations", 10)),
+                float(request.get("interval_ms", DEFAULT_INTERVAL_MS)), self.out_dir, log=self.log)
+            self.log(f"开始性能分析：{TARGETS[target]}，{self.session.iterations} 轮")
+
+
+    # 包裹一轮迭代：该任务正在分析时，迭代期间对当前线程采样
+    # count 为 False 时（回复、发送等随迭代产生的工作）不检查控制文件，跟随主循环的检查结果
+    @contextmanager
+    def iteration(self, target: str, count: bool = True):
+        if count:
+            self.poll()
+        session = self.session
+        if session is None or session.target != target or session.state != "running":
+            yield
+            return
+        start = time.perf_counter()
+        session.enter()
+        try:
+            yield
+        finally:
+            session.exit(time.perf_counter() - start, count)
+
+
+    # 状态信息
+    def stats(self):
+        session = self.session
+        return session.stats() if session is not None else {"state": "idle"}
+
+
+# 写入分析请求（前端调用）
+def request_profile(control_file: Path, target: str, iterations: int, interval_ms: float = DEFAULT_INTERVAL_MS):
+    write_json_atomic(control_file, {
+        "id": time.time_ns(),
+        "target": target,
+        "iterations": iterations,
+        "interval_ms": interval_ms,
+    })
+
+
+# 写入取消请求（前端调用）
+def cancel_profile(control_file: Path):
+    write_json_atomic(control_file, {"id": time.time_ns(), "action": "cancel"})
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 重复回复保护
+
+按用户记录最近几次回复内容的短哈希（8 字节），连续多次相同回复时拦截。
+用户数超过上限时淘汰最久未活动的用户（LRU），长时间无消息的用户按空闲时间过期，
+内存占用有上界；可选持久化到文件，重启后保护仍然生效。
+"""
+
+import json, time, hashlib, threading
+from pathlib import Path
+from collections import OrderedDict
+from settings_manager import write_json_atomic
+
+
+# 回复内容的短哈希
+def reply_hash(msg: str):
+    return int.from_bytes(hashlib.blake2b(msg.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# 重复回复保护
+class RepeatGuard:
+    def __init__(self, path: Path = None, times: int = 3, maxsize: int = 10000, idle_ttl: float = 86400,
+                 persist: bool = True):
+        self.path = Path(path) if path else None
+        self.persist = persist
+        self.times = times
+        self.maxsize = max(1, maxsize)
+        self.idle_ttl = idle_ttl
+        # user_mid -> (最后活动时间, 最近回复哈希)，最久未活动的在前
+        # 哈希用元组保存，每个用户约 200 字节（deque 约 1KB）
+        self._users: OrderedDict[int, tuple[float, tuple]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.blocked = 0
+        self.lru_evictions = 0
+        self.idle_evictions = 0
+        self.load()
+
+
+    # 加载
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            need = self.times + 1
+            for mid, last_seen, hashes in data.get("users", []):
+                self._users[int(mid)] = (float(last_seen), tuple(hashes[-need:]))
+            self._evict(time.time())
+        except Exception:
+            pass
+
+
+    # 保存（仅有变化时写入）
+    def save(self):
+        if self.path is None or not self.persist:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"users": [[mid, last_seen, list(hashes)] for mid, (last_seen, hashes) in self._users.items()]}
+            self._dirty = False
+        write_json_atomic(self.path, data, separators=(",", ":"))
+
+
+    # 调整参数
+    def configure(self, times: int = None, maxsize: int = None, idle_ttl: float = None, persist: bool = None):
+        with self._lock:
+            if times is not None:
+                self.times = times
+            if maxsize is not None:
+                self.maxsize = max(1, maxsize)
+            if idle_ttl is not None:
+                self.idle_ttl = idle_ttl
+            if persist is not None:
+                self.persist = persist
+            self._evict(time.time())
+
+
+    # 淘汰空闲过期及超出容量的用户
+    def _evict(self, now: float):
+        deadline = now - self.idle_ttl
+        while self._users:
+            mid, (last_seen, _) = next(iter(self._users.items()))
+            if last_seen >= deadline:
+                break
+            del self._users[mid]
+            self.idle_evictions += 1
+            self._dirty = True
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+            self.lru_evictions += 1
+            self._dirty = True
+
+
+    # 记录本次回复，连续 times+1 次相同时返回 True（应拦截）
+    def check(self, user_mid: int, msg: str):
+        if self.times <= 0:
+            return False
+        need = self.times + 1
+        now = time.time()
+        with self._lock:
+            item = self._users.pop(user_mid, None)
+            hashes = ((item[1] if item else ()) + (reply_hash(msg),))[-need:]
+            self._users[user_mid] = (now, hashes)
+            self._dirty = True
+            self._evict(now)
+            repeated = len(hashes) == need and len(set(hashes)) == 1
+            if repeated:
+                self.blocked += 1
+            return repeated
+
+
+    # 导出状态（用于快照）
+    def export_state(self):
+        with self._lock:
+            return [(mid, last_seen, list(hashes)) for mid, (last_seen, hashes) in self._users.items()]
+
+
+    # 合并快照中的状态（同一用户取最后活动时间较新者）
+    def import_state(self, users):
+        need = self.times + 1
+        with self._lock:
+            merged = dict(self._users)
+            for mid, last_seen, hashes in users:
+                current = merged.get(mid)
+                if current is None or last_seen > current[0]:
+                    merged[mid] = (last_seen, tuple(hashes[-need:]))
+                    self._dirty = True
+            self._users = OrderedDict(sorted(merged.items(), key=lambda item: item[1][0]))
+            self._evict(time.time())
+
+
+    def __len__(self):
+        return len(self._users)
+
+
+    # 统计信息
+    def stats(self):
+        return {
+            "size": len(self._users),
+            "maxsize": self.maxsize,
+            "blocked": self.blocked,
+            "lru_evictions": self.lru_evictions,
+            "idle_evictions": self.idle_evictions,
+        }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 会话回复并发分发
+
+多个工作线程并发处理会话回复；同一 sender_uid 的消息固定分配到同一工作线程，
+保证同一用户的回复顺序。提供队列深度及回复耗时统计。
+"""
+
+import time, queue, threading
+from collections import deque
+
+
+# 回复分发器
+class ReplyDispatcher:
+    def __init__(self, handler, workers: int = 4, on_error=None, latency_window: int = 200):
+        # handler(user_mid, *args) 在工作线程中执行
+        self.handler = handler
+        self.on_error = on_error
+        self.workers = max(1, workers)
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        self._latency = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._threads = [
+            threading.Thread(target=self._worker, args=(q,), daemon=True, name=f"BiliMateReply-{idx}")
+            for idx, q in enumerate(self._queues)
+        ]
+        for t in self._threads:
+            t.start()
+
+
+    # 提交回复任务
+    def submit(self, user_mid: int, *args):
+        with self._lock:
+            self.submitted += 1
+        self._queues[hash(user_mid) % self.workers].put((time.monotonic(), user_mid, args))
+
+
+    # 工作线程
+    def _worker(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            if item is None:
+                q.task_done()
+                return
+            submit_time, user_mid, args = item
+            try:
+                self.handler(user_mid, *args)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                if self.on_error:
+                    self.on_error(user_mid, e)
+            finally:
+                with self._lock:
+                    self.completed += 1
+                    self._latency.append(time.monotonic() - submit_time)
+                q.task_done()
+
+
+    # 等待队列清空
+    def join(self):
+        for q in self._queues:
+            q.join()
+
+
+    # 停止工作线程（处理完已提交的任务）
+    def stop(self):
+        for q in self._queues:
+            q.put(None)
+        for t in self._threads:
+            t.join()
+
+
+    # 队列深度
+    def queue_depth(self):
+        return sum(q.qsize() for q in self._queues)
+
+
+    # 统计信息
+    def stats(self):
+        with self._lock:
+            latency = sorted(self._latency)
+            submitted, completed, failed = self.submitted, self.completed, self.failed
+        if latency:
+            avg = sum(latency) / len(latency)
+            p95 = latency[min(len(latency) - 1, int(len(latency) * 0.95))]
+        else:
+            avg = p95 = 0.0
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth(),
+            "submitted": submitted,
+            "completed": completed,
+            "failed": failed,
+            "latency_avg": round(avg, 3),
+            "latency_p95": round(p95, 3),
+        }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 回复规则引擎
+
+将 完全匹配 / 关键词匹配 / 兜底回复 三类规则编译为只读索引：
+关键词规则编译为 Aho-Corasick 自动机，单次扫描消息即可找出全部命中关键词，
+多个关键词同时命中时，按设置中的先后顺序取第一个（与原逐条扫描的结果一致）。
+"""
+
+from collections import deque
+
+
+# 关键词多模式匹配器（Aho-Corasick）
+class KeywordMatcher:
+    # 关键词较少时，逐条 `in` 扫描（C 实现）比自动机更快
+    LINEAR_SCAN_MAX = 100
+
+    def __init__(self, keywords=()):
+        # 关键词按优先级排列，下标越小优先级越高
+        self.keywords = list(keywords)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # 到达该状态时可命中的最高优先级（含失败链），-1 表示无
+        self._best: list[int] = [-1]
+        # 空关键词对任意消息都命中
+        self._always = -1
+        for priority, word in enumerate(self.keywords):
+            if not word:
+                if self._always < 0:
+                    self._always = priority
+                continue
+            self._insert(word, priority)
+        self._build()
+
+
+    # 插入关键词
+    def _insert(self, word: str, priority: int):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(-1)
+            state = nxt
+        if self._best[state] < 0 or priority < self._best[state]:
+            self._best[state] = priority
+
+
+    # 构建失败指针
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                inherited = self._best[self._fail[nxt]]
+                if inherited >= 0 and (self._best[nxt] < 0 or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+
+
+    # 查找优先级最高的命中关键词，返回下标，无命中返回 None
+    def search(self, text: str):
+        if len(self.keywords) <= self.LINEAR_SCAN_MAX:
+            return next((i for i, k in enumerate(self.keywords) if k in text), None)
+        best = self._always
+        if best == 0:
+            return 0
+        goto, fail, best_of = self._goto, self._fail, self._best
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = best_of[state]
+            if hit >= 0 and (best < 0 or hit < best):
+                best = hit
+                if best == 0:
+                    break
+        return best if best >= 0 else None
+
+
+    # 查找命中的关键词
+    def find(self, text: str):
+        idx = self.search(text)
+        return None if idx is None else self.keywords[idx]
+
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+# 单一身份（粉丝/非粉丝）的回复规则
+class ReplyRules:
+    def __init__(self, complete_dict: dict = None, keyword_dict: dict = None, other_reply: str = ""):
+        self.complete_dict = dict(complete_dict or {})
+        self.keyword_dict = dict(keyword_dict or {})
+        self.other_reply = other_reply
+        self.matcher = KeywordMatcher(self.keyword_dict)
+
+
+    # 匹配回复，返回 (回复内容, 命中规则)
+    def match(self, message_lower: str):
+        if message_lower in self.complete_dict:
+            return self.complete_dict[message_lower], f"complete:{message_lower}"
+        hit_key = self.matcher.find(message_lower)
+        if hit_key is not None:
+            return self.keyword_dict[hit_key], f"keyword:{hit_key}"
+        return self.other_reply, "other"
+
+
+# 全部回复规则
+class RuleSet:
+    ROLES = ("fans", "non_fans")
+
+    def __init__(self, settings: dict):
+        self.new_fans_reply = settings.get("new_fans_reply")
+        self.rules = {
+            role: ReplyRules(
+                settings.get(f"{role}_complete_dict"),
+                settings.get(f"{role}_keyword_dict"),
+                settings.get(f"{role}_other_reply"),
+            )
+            for role in self.ROLES
+        }
+
+
+    # 按身份匹配回复
+    def match(self, role: str, message_lower: str):
+        return self.rules[role].match(message_lower)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 消息发送队列
+
+回复消息放入有界队列，由后台线程按令牌桶限速发送，轮询与规则匹配不必等待发送完成。
+发送私信不是幂等操作：只有限流类返回码与确定未送达的异常（连接被拒绝、建立连接超时、接口熔断）
+按指数退避重试，读取超时等请求可能已送达的异常不重试，避免重复回复；每条消息记录从入队到发送成功的耗时。
+"""
+
+import time, queue, threading
+from collections import deque
+from fans_loader import RateLimiter
+from api_resilience import CircuitOpenError
+
+try:
+    from urllib3.exceptions import ConnectTimeoutError
+    from requests.exceptions import ConnectTimeout
+except ImportError:
+    ConnectTimeoutError = ConnectTimeout = ()
+
+# 可重试的返回码（请求被拦截 / 请求过于频繁）
+TRANSIENT_CODES = (-412, -509, -799)
+# 请求确定未发出的异常（urllib3 的 NewConnectionError 为 ConnectTimeoutError 的子类）
+UNSENT_ERRORS = (ConnectionRefusedError, CircuitOpenError) + tuple(
+    cls for cls in (ConnectTimeoutError, ConnectTimeout) if isinstance(cls, type))
+
+
+# 异常是否表明请求未发出（沿 requests / urllib3 包装的异常链查找）
+def is_unsent(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, UNSENT_ERRORS):
+            return True
+        seen.add(id(error))
+        wrapped = [getattr(error, "reason", None), error.__cause__, error.__context__]
+        wrapped += [arg for arg in error.args if isinstance(arg, BaseException)]
+        error = next((e for e in wrapped if isinstance(e, BaseException) and id(e) not in seen), None)
+    return False
+
+
+# 发送失败
+class SendError(Exception):
+    def __init__(self, code, message: str = ""):
+        super().__init__(f"code={code} {message}".strip())
+        self.code = code
+
+
+# 消息发送队列
+class SendQueue:
+    def __init__(self, send_func, rate: float = 1, burst: int = 3, retries: int = 3, retry_delay: float = 2.0,
+                 max_delay: float = 30.0, queue_size: int = 1000, on_result=None, latency_window: int = 200):
+        # send_func(user_mid=, msg=) 执行实际发送
+        # on_result(user_mid, msg, context, error, latency) 发送结束后回调，成功时 error 为 None
+        self.send_func = send_func
+        self.on_result = on_result
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.limiter = RateLimiter(rate, burst=self.burst)
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._latency = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="BiliMateSend")
+        self._thread.start()
+
+
+    # 调整限速与重试参数
+    def configure(self, rate: float = None, burst: int = None, retries: int = None, retry_delay: float = None):
+        if (rate is not None and rate != self.rate) or (burst is not None and max(1, burst) != self.burst):
+            self.rate = self.rate if rate is None else rate
+            self.burst = self.burst if burst is None else max(1, burst)
+            self.limiter = RateLimiter(self.rate, burst=self.burst)
+        if retries is not None:
+            self.retries = max(0, retries)
+        if retry_delay is not None:
+            self.retry_delay = retry_delay
+
+
+    # 提交消息（不阻塞），队列已满返回 False
+    def submit(self, user_mid: int, msg: str, **context):
+        try:
+            self._queue.put_nowait((time.monotonic(), user_mid, msg, context))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+
+    # 发送一条消息（带重试），失败时抛出最后一次的异常
+    def _send(self, user_mid: int, msg: str):
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self.retried += 1
+                time.sleep(min(self.retry_delay * (2 ** (attempt - 1)), self.max_delay))
+            self.limiter.acquire()
+            try:
+                result = self.send_func(user_mid=user_mid, msg=msg)
+            except Exception as e:
+                error = e
+                # 可能已送达（如读取超时），不重试
+                if not is_unsent(e):
+                    break
+                continue
+            code = result.get("code", 0) if isinstance(result, dict) else 0
+            if not code:
+                return
+            error = SendError(code, result.get("message", ""))
+            if code not in TRANSIENT_CODES:
+                break
+        raise error
+
+
+    # 后台线程
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            submit_time, user_mid, msg, context = item
+            error = None
+            try:
+                self._send(user_mid, msg)
+            except Exception as e:
+                error = e
+            latency = time.monotonic() - submit_time
+            with self._lock:
+                if error is None:
+                    self.sent += 1
+                    self._latency.append(latency)
+                else:
+                    self.failed += 1
+            try:
+                if self.on_result:
+                    self.on_result(user_mid, msg, context, error, latency)
+            except Exception as e:
+                print(f"发送结果处理异常：{e}")
+            finally:
+                self._queue.task_done()
+
+
+    # 等待队列清空
+    def join(self):
+        self._queue.join()
+
+
+    # 发送完已提交的消息并停止
+    def close(self, timeout: float = 10):
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+    # 统计信息
+    def stats(self):
+        with self._lock:
+            latency = sorted(self._latency)
+            stats = {
+                "queue_depth": self._queue.qsize(),
+                "submitted": self.submitted,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+            }
+        if latency:
+            stats["latency_avg"] = round(sum(latency) / len(latency), 3)
+            stats["latency_p95"] = round(latency[min(len(latency) - 1, int(len(latency) * 0.95))], 3)
+        else:
+            stats["latency_avg"] = stats["latency_p95"] = 0.0
+        return stats
@@ -16,22 +16,35 @@ Date    : 2025-08-26
 Change  : 初版发布
 """
 
-import os, sys
-import json, struct, qrcode, time, threading
+import os, signal, argparse
+import json, qrcode, time, threading
 from pathlib import Path
-import multiprocessing.shared_memory as shm
-from collections import deque
 from bilibili_api import BiliApi
+from settings_manager import SettingsManager
+from fans_registry import FansRegistry
+from fan_index import FanIndex, FanNames
+from fans_loader import PagedFansLoader
+from reply_dispatcher import ReplyDispatcher
+from ttl_cache import TTLCache
+from session_cursor import SessionCursor
+from shm_protocol import ShmWriter, EventRingWriter, encode_fans
+from log_writer import AsyncLogWriter
+from history_store import HistoryWriter
+from repeat_guard import RepeatGuard
+from poll_scheduler import AdaptiveInterval
+from send_queue import SendQueue
+from api_resilience import ResilientApi, TaskSupervisor
+from checkpoint import STAT_FIELDS, save_checkpoint, load_checkpoint
+from accounts import DATA_DIR, DEFAULT_ACCOUNT, AccountPaths, load_accounts, share_connection_pool
+from profiler import Profiler
+from timeseries import StatsSeries
+from metrics import MetricsRegistry, MetricsServer, STAGE_SECONDS, STAGE_ERRORS, REPLIES, encode_snapshot, timed_stage
 
-# 共享内存大小
-SHARED_SIZE = 128 * 1024
+# 共享内存中发布的粉丝数上限（前端仅展示最新的部分粉丝）
+SHM_FANS_LIMIT = 1000
+# 单次轮询最多读取的会话页数
+SESSION_MAX_PAGES = 20
 
-# 文件
-DATA_DIR = Path(__file__).parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
-COOKIE_FILE = DATA_DIR / "cookies.json"
-SETTINGS_FILE = DATA_DIR / "settings.json"
-LOG_FILE = DATA_DIR / f"log_BiliMate.txt"
 # 默认设置
 DEFAULT_SETTINGS = {
     "new_fans_reply": "感谢关注，眼光不错哟",
@@ -53,16 +66,60 @@ DEFAULT_SETTINGS = {
     "login_remember": True,
     "repet_protect_times": 3,
     "interval_seconds": 5,
+    "interval_max_seconds": 60,
+    "fans_interval_seconds": 10,
+    "fans_interval_max_seconds": 300,
+    "poll_backoff": 1.5,
+    "poll_jitter": 0.2,
+    "fans_load_concurrency": 4,
+    "fans_load_rate": 5,
+    "fans_load_retries": 2,
+    "fans_incremental_max_pages": 4,
+    "fans_full_sync_hours": 24,
+    "async_engine": False,
+    "reply_workers": 4,
+    "user_name_lookup": True,
+    "user_cache_size": 2048,
+    "user_cache_ttl": 3600,
+    "log_max_mb": 100,
+    "log_backups": 5,
+    "log_compress": False,
+    "repet_state_size": 10000,
+    "repet_state_idle_hours": 24,
+    "repet_state_persist": True,
+    "send_rate": 1,
+    "send_burst": 3,
+    "send_retries": 3,
+    "send_retry_delay": 2,
+    "api_retry_delay": 1,
+    "api_breaker_threshold": 5,
+    "api_breaker_reset": 60,
+    "checkpoint_interval": 300,
 }
 
 
 
 
+# 将退出信号转为 KeyboardInterrupt
+def raise_keyboard_interrupt(*_):
+    raise KeyboardInterrupt
+
+
 # BiliMate服务端
 class BiliMateServer:
-    def __init__(self):
-        # 初始化
-        self.bili_api = BiliApi()
+    def __init__(self, account: str = DEFAULT_ACCOUNT, data_dir: Path = DATA_DIR):
+        # 初始化（每个账号独立的数据目录与共享内存名称）
+        self.account = account
+        self.paths = AccountPaths(account, data_dir)
+        self.log_writer = AsyncLogWriter(self.paths.log_file)
+        # 运行指标（接口耗时、各阶段耗时、回复结果）
+        self.metrics = MetricsRegistry()
+        # 按需性能分析（前端通过控制文件发起，结果写入数据目录）
+        self.profiler = Profiler(self.paths.profile_request_file, self.paths.data_dir, log=self.log_print)
+        # 接口调用经容错层（重试 + 熔断），同一进程内的账号共用连接池
+        bili_api = BiliApi()
+        share_connection_pool(getattr(bili_api, "session", None))
+        self.bili_api = ResilientApi(bili_api, metrics=self.metrics)
         self.login_status = "未登录"
         self.login_url = ""
         self.login_time_cnt = 0
@@ -74,25 +131,61 @@ class BiliMateServer:
         self.inc_like = 0
         self.total_fav = 0
         self.inc_fav = 0
-        self.fans_list = []
-        self.timestamp_ns = 0
-        self.message_list: dict[int, list[str]] = {}
+        # 粉丝昵称按需查询（SQLite），粉丝索引只保存 mid
+        self.fan_names = FanNames(self.paths.fan_names_file)
+        self.fans_list = FanIndex(names=self.fan_names)
+        self.new_fans_list = FansRegistry()
+        self.fans_num = 0
+        self.fans_full_sync_time = 0
+        # 粉丝列表对账与轮询互斥（启动时对账在后台进行）
+        self.fans_lock = threading.Lock()
+        # 后台全量加载线程，加载期间新关注的粉丝暂存于 fans_reload_added，替换前合并
+        self.fans_reload_thread = None
+        self.fans_reload_added = None
+        self.fans_sync_stats = {
+            "full_syncs": 0,
+            "incremental_syncs": 0,
+            "pages_fetched": 0,
+            "pages_saved": 0,
+            "last_pages_saved": 0,
+            # 本地未能定位的粉丝数差（正数为未加载到的粉丝，负数为未能定位的取消关注），下次定期全量加载时纠正
+            "unplaced": 0,
+        }
+        self.session_cursor = SessionCursor(self.paths.session_cursor_file)
+        self.repeat_guard = RepeatGuard(self.paths.repeat_guard_file)
+        self.settings_manager = SettingsManager(self.paths.settings_file, DEFAULT_SETTINGS)
+        self.rule_set = None
         self.thread_update_video_data_status = False
         self.thread_auto_reply_msg_status = False
+        self.notice_status = True
+        # 各任务出错时在进程内单独重新运行
+        self.supervisors = {
+            name: TaskSupervisor(name, log=self.log_print)
+            for name in ("粉丝轮询", "粉丝加载", "会话轮询", "更新视频数据")
+        }
+        # 粉丝轮询与会话轮询各自的自适应间隔
+        self.fans_interval = AdaptiveInterval()
+        self.session_interval = AdaptiveInterval()
+        self.reply_lock = threading.RLock()
+        self.reply_dispatcher = None
+        # 消息发送队列（后台限速发送）
+        self.send_queue = SendQueue(self.send_reply, on_result=self.on_send_result)
+        self.user_cache = TTLCache()
+        self.user_cache_seeded = 0
+        self.user_cache_skipped = 0
+        self.load_settings()
         # 创建共享内存
-        try:
-            self.mem = shm.SharedMemory(name="BiliMate_shm", create=True, size=SHARED_SIZE)
-        except FileExistsError:
-            self.mem = shm.SharedMemory(name="BiliMate_shm", create=False, size=SHARED_SIZE)
-        # 启动线程-共享内存
-        self._thread_update_shared_mem = threading.Thread(target=self.thread_update_shared_mem, daemon=True)
-        self._thread_update_shared_mem.start()
+        self.shm_writer = ShmWriter(self.paths.shm_name)
+        self.reply_events = EventRingWriter(self.paths.shm_name)
+        # 回复历史
+        self.history = HistoryWriter(self.paths.history_file)
+        # 频道数据时间序列（分钟 / 小时 / 天）
+        self.stats_series = StatsSeries(self.paths.data_dir)
+        self._shm_fans_version = None
 
 
     # 打印日志
     def log_print(self, *args, **kwargs):
-        MAX_LOG_SIZE = 100 * 1024 * 1024   # 100 MB
-        CUT_SIZE     = 10 * 1024 * 1024    # 每次砍掉前 10 MB
         # 获取当前时间
         current_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
         # 构造日志字符串
@@ -101,65 +194,106 @@ class BiliMateServer:
             log_txt = f"\n[{current_time}] " + print_str[1:]
         else:
             log_txt = f"[{current_time}] " + print_str
-        # 打印到控制台
-        print(log_txt, **kwargs)
-        # 日志裁剪
-        if LOG_FILE.exists() and LOG_FILE.stat().st_size >= MAX_LOG_SIZE:
-            try:
-                data = LOG_FILE.read_bytes()
-                new_data = data[CUT_SIZE:]
-                LOG_FILE.write_bytes(new_data)
-            except Exception:
-                pass
-        # 打开日志文件并写入日志内容
-        with open(LOG_FILE, 'a', encoding='utf-8') as file:
-            file.write(log_txt + "\n")
+        # 打印到控制台（多账号时标注账号）
+        if self.account != DEFAULT_ACCOUNT:
+            print(log_txt.replace(f"[{current_time}]", f"[{current_time}][{self.account}]", 1), **kwargs)
+        else:
+            print(log_txt, **kwargs)
+        # 交由后台线程写入日志文件（含轮转）
+        self.log_writer.write(log_txt)
 
 
-    # 重启程序
-    def restart_program(self):
-        self.log_print("\n正在重启程序...")
-        time.sleep(3)
-        os.execv(sys.executable, [sys.executable] + sys.argv)
+    # 退出前发完已排队的消息，保存状态并写完剩余日志及回复历史
+    def close(self):
+        self.send_queue.close()
+        try:
+            self.save_checkpoint()
+        except Exception as e:
+            self.log_print(f"保存状态快照失败：{e}")
+        self.history.close()
+        self.stats_series.close()
+        self.fan_names.close()
+        self.session_cursor.save(force=True)
+        self.repeat_guard.save()
+        self.log_writer.close()
 
 
     # 加载设置参数
     def load_settings(self):
+        # 设置文件未变化时不重新解析
         try:
-            settings = json.loads(SETTINGS_FILE.read_text(encoding="utf-8"))
-        except Exception as e:
-            settings = DEFAULT_SETTINGS.copy()
-            self.save_settings(settings)
-            print(f"加载设置参数失败，恢复默认参数: {e}")
-        self.login_remember = settings.get("login_remember", DEFAULT_SETTINGS["login_remember"])
-        self.interval_seconds = settings.get("interval_seconds", DEFAULT_SETTINGS["interval_seconds"])
-        self.repet_protect_times = settings.get("repet_protect_times", DEFAULT_SETTINGS["repet_protect_times"])
-        self.new_fans_reply = settings.get("new_fans_reply")
-        self.non_fans_complete_dict = settings.get("non_fans_complete_dict")
-        self.non_fans_keyword_dict = settings.get("non_fans_keyword_dict")
-        self.non_fans_other_reply = settings.get("non_fans_other_reply")
-        self.fans_complete_dict = settings.get("fans_complete_dict")
-        self.fans_keyword_dict = settings.get("fans_keyword_dict")
-        self.fans_other_reply = settings.get("fans_other_reply")
+            snapshot = self.settings_manager.reload_if_changed()
+        except ValueError as e:
+            self.log_print(e)
+            return False
+        if snapshot is None:
+            return True
+        self.login_remember = snapshot["login_remember"]
+        self.interval_seconds = snapshot["interval_seconds"]
+        self.session_interval.configure(
+            min_interval=self.interval_seconds,
+            max_interval=snapshot["interval_max_seconds"],
+            backoff=snapshot["poll_backoff"],
+            jitter=snapshot["poll_jitter"],
+        )
+        self.fans_interval.configure(
+            min_interval=snapshot["fans_interval_seconds"],
+            max_interval=snapshot["fans_interval_max_seconds"],
+            backoff=snapshot["poll_backoff"],
+            jitter=snapshot["poll_jitter"],
+        )
+        self.repet_protect_times = snapshot["repet_protect_times"]
+        self.repeat_guard.configure(
+            times=self.repet_protect_times,
+            maxsize=snapshot["repet_state_size"],
+            idle_ttl=snapshot["repet_state_idle_hours"] * 3600,
+            persist=snapshot["repet_state_persist"],
+        )
+        self.fans_load_concurrency = snapshot["fans_load_concurrency"]
+        self.fans_load_rate = snapshot["fans_load_rate"]
+        self.fans_load_retries = snapshot["fans_load_retries"]
+        self.fans_incremental_max_pages = snapshot["fans_incremental_max_pages"]
+        self.fans_full_sync_hours = snapshot["fans_full_sync_hours"]
+        self.async_engine = snapshot["async_engine"]
+        self.reply_workers = snapshot["reply_workers"]
+        self.send_queue.configure(
+            rate=snapshot["send_rate"],
+            burst=snapshot["send_burst"],
+            retries=snapshot["send_retries"],
+            retry_delay=snapshot["send_retry_delay"],
+        )
+        self.user_name_lookup = snapshot["user_name_lookup"]
+        self.checkpoint_interval = snapshot["checkpoint_interval"]
+        self.bili_api.configure(
+            retry_delay=snapshot["api_retry_delay"],
+            breaker_threshold=snapshot["api_breaker_threshold"],
+            breaker_reset=snapshot["api_breaker_reset"],
+        )
+        self.log_writer.configure(
+            max_bytes=int(snapshot["log_max_mb"] * 1024 * 1024),
+            backups=snapshot["log_backups"],
+            compress=snapshot["log_compress"],
+        )
+        self.user_cache.configure(
+            maxsize=snapshot["user_cache_size"],
+            ttl=snapshot["user_cache_ttl"],
+        )
+        # 整体替换预编译的回复规则
+        self.rule_set = snapshot.rule_set
         return True
 
 
     # 保存设置参数
     def save_settings(self, settings):
-        SETTINGS_FILE.write_text(
-            json.dumps(settings, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        self.settings_manager.save(settings)
 
 
     # 更新共享内存
     def update_shared_mem(self):
-        data = {
+        # 数值指标（固定偏移）
+        self.shm_writer.write_metrics({
             "time_stamp": int(time.time()),
-            "login_status": self.login_status,
-            "login_url": self.bili_api.login_url,
             "login_time_cnt": self.login_time_cnt,
-            "my_uname": self.bili_api.my_uname,
             "my_mid": self.bili_api.my_mid,
             "total_fans": self.total_fans,
             "inc_fans": self.inc_fans,
@@ -169,15 +303,49 @@ class BiliMateServer:
             "inc_like": self.inc_like,
             "total_fav": self.total_fav,
             "inc_fav": self.inc_fav,
-            "fans_list": self.fans_list,
+            "loaded_fans": len(self.fans_list),
             "state_info_status": self.thread_update_video_data_status,
             "reply_info_status": self.thread_auto_reply_msg_status,
+        })
+        # 状态信息（内容变化时才重写）
+        status = {
+            "login_status": self.login_status,
+            "login_url": self.bili_api.login_url,
+            "my_uname": self.bili_api.my_uname,
+            "fans_sync_stats": self.fans_sync_stats,
+            "reply_stats": self.reply_dispatcher.stats() if self.reply_dispatcher else {},
+            "send_stats": self.send_queue.stats(),
+            "api_stats": self.bili_api.stats(),
+            "degraded": self.bili_api.degraded(),
+            "task_stats": {name: sup.stats() for name, sup in self.supervisors.items()},
+            "user_cache_stats": self.user_cache_stats(),
+            "repeat_guard_stats": self.repeat_guard.stats(),
+            "profile": self.profiler.stats(),
+            "poll_intervals": {
+                "fans": self.fans_interval.stats(),
+                "sessions": self.session_interval.stats(),
+            },
         }
-        # print(data)
-        payload = json.dumps(data).encode()
-        length = len(payload)
-        self.mem.buf[:4] = struct.pack('<I', length)
-        self.mem.buf[4:4+length] = payload
+        self.shm_writer.write_section("status", json.dumps(status, ensure_ascii=False).encode())
+        # 粉丝列表（变化时才编码，仅发布最新的 SHM_FANS_LIMIT 个）
+        fans_version = (id(self.fans_list), self.fans_list.version)
+        if fans_version != self._shm_fans_version:
+            self.shm_writer.write_section("fans", encode_fans(self.fans_list.newest(SHM_FANS_LIMIT)))
+            self._shm_fans_version = fans_version
+        # 运行指标
+        self.shm_writer.write_section("metrics", encode_snapshot(self.publish_metrics()))
+
+
+    # 更新数值指标并返回指标快照
+    def publish_metrics(self):
+        self.metrics.set("bilimate_fans_loaded", len(self.fans_list))
+        self.metrics.set("bilimate_reply_queue_depth",
+                         self.reply_dispatcher.stats().get("queue_depth", 0) if self.reply_dispatcher else 0)
+        self.metrics.set("bilimate_send_queue_depth", self.send_queue.stats().get("queue_depth", 0))
+        degraded = self.bili_api.degraded()
+        for endpoint in self.bili_api.breakers:
+            self.metrics.set("bilimate_api_circuit_open", int(endpoint in degraded), endpoint=endpoint)
+        return self.metrics.snapshot()
 
 
     # 等待登录结果
@@ -219,9 +387,9 @@ class BiliMateServer:
     # 登录
     def login(self):
         # 自动加载历史 cookies
-        if COOKIE_FILE.exists():
+        if self.paths.cookie_file.exists():
             try:
-                cookies = json.loads(COOKIE_FILE.read_text(encoding="utf-8"))
+                cookies = json.loads(self.paths.cookie_file.read_text(encoding="utf-8"))
                 self.bili_api.session.cookies.update(cookies)
                 self.bili_api.get_account_info()
                 if self.bili_api.my_mid != None:
@@ -257,8 +425,8 @@ class BiliMateServer:
     def save_login(self):
         cookies = self.bili_api.session.cookies.get_dict()
         if cookies:
-            COOKIE_FILE.parent.mkdir(parents=True, exist_ok=True)
-            COOKIE_FILE.write_text(json.dumps(cookies, indent=2, ensure_ascii=False))
+            self.paths.cookie_file.parent.mkdir(parents=True, exist_ok=True)
+            self.paths.cookie_file.write_text(json.dumps(cookies, indent=2, ensure_ascii=False))
 
 
     # 获取粉丝数
@@ -266,32 +434,121 @@ class BiliMateServer:
         # 更新关系状态(会同步更新粉丝状态)
         relation_state = self.bili_api.get_relation_state()
         self.fans_num = relation_state.get("follower", 0)
+        # 粉丝数随粉丝轮询记录，趋势精确到分钟
+        if self.fans_num:
+            self.stats_series.record(total_fans=self.fans_num)
         return self.fans_num
 
 
+    # 粉丝列表加载器
+    def fans_loader(self):
+        return PagedFansLoader(
+            self.bili_api,
+            concurrency=self.fans_load_concurrency,
+            rate=self.fans_load_rate,
+            retries=self.fans_load_retries,
+        )
+
+
     # 更新粉丝列表
     def reload_fans_list(self):
         total = self.get_fans_num()
         if not total:
-            return []
-        if total > 1000:
-            self.log_print("您的粉丝数超过1000，目前仅加载前1000个粉丝")
-            total = 1000
-        self.fans_list = []
-        pages = (total - 1) // 50 + 1
-        for page in range(1, pages+1):
-            fans_detail = self.bili_api.get_fans_detail(page=page, num=50)
-            if not fans_detail or 'list' not in fans_detail:
-                return []
-            self.fans_list.extend({'uname': f['uname'], 'mid': f['mid']} for f in fans_detail['list'])
+            return self.fans_list
+        loader = self.fans_loader()
+        failed_pages = []
+
+        # 逐页写入索引，失败页记录页码
+        def pages():
+            for page, fans in loader.iter_pages(total):
+                if fans is None:
+                    failed_pages.append(page)
+                else:
+                    yield fans
+
+        self.fans_reload_added = []
+        try:
+            fans_list = FanIndex.from_pages(pages(), self.fan_names)
+            tail_pages = self.load_fans_tail(loader, fans_list, total)
+            self.fans_full_sync_time = time.time()
+            self.fans_sync_stats["full_syncs"] += 1
+            self.fans_sync_stats["pages_fetched"] += (total - 1) // 50 + 1 + tail_pages
+            self.fans_sync_stats["last_pages_saved"] = 0
+            if failed_pages:
+                self.log_print(f"粉丝列表第 {failed_pages} 页加载失败，已保留原有记录")
+                # 失败页对应的粉丝未知，保留原有记录，避免误判为非粉丝
+                fans_list.extend_oldest(self.fans_list.order())
+            # 开始加载时已关注、但因分页错位未能加载到的粉丝数
+            unplaced = max(0, total - len(fans_list))
+            # 合并加载期间新关注的粉丝并替换（与粉丝轮询互斥，合并后到替换前新关注的粉丝不会丢失）
+            with self.fans_lock:
+                for fans in self.fans_reload_added:
+                    fans_list.extend_newest(fans)
+                self.fans_list = fans_list
+                self.fans_reload_added = None
+        finally:
+            self.fans_reload_added = None
+        self.fans_sync_stats["unplaced"] = unplaced
+        if unplaced:
+            self.log_print(f"加载期间粉丝列表有变化，{unplaced} 个粉丝未能加载，将在下次全量加载时补全")
+        if not failed_pages:
+            # 清理已取消关注用户的昵称
+            self.fan_names.prune(self.fans_list)
         return self.fans_list
 
 
+    # 补拉末尾分页：加载期间有新关注时分页整体后移，最早关注的部分粉丝会超出加载范围，返回补拉页数
+    def load_fans_tail(self, loader: PagedFansLoader, fans_list: FanIndex, total: int):
+        missing = total - len(fans_list)
+        if missing <= 0:
+            return 0
+        first = (total - 1) // loader.page_size + 2
+        results, _ = loader.fetch_pages(range(first, first + (missing - 1) // loader.page_size + 1))
+        tail = [f for page in sorted(results) for f in results[page]]
+        self.fan_names.put_many(tail)
+        fans_list.extend_oldest(reversed([f['mid'] for f in tail]))
+        return len(results)
+
+
+    # 后台全量加载粉丝列表（加载期间照常轮询新粉丝与回复，完成后替换）
+    def reload_fans_background(self):
+        if self.fans_reload_thread is not None and self.fans_reload_thread.is_alive():
+            return
+        self.fans_reload_thread = threading.Thread(
+            target=self.supervisors["粉丝加载"].run, args=(self.reload_fans_list,),
+            daemon=True, name="BiliMateFansReload")
+        self.fans_reload_thread.start()
+
+
     # 更新粉丝列表
     def update_fans_list(self):
-        # 如果有粉丝解除关注，需重新遍历一遍粉丝列表
-        if len(self.fans_list) != self.get_fans_num():
-            self.reload_fans_list()
+        # 后台全量加载进行中，完成前不对账
+        if self.fans_reload_thread is not None and self.fans_reload_thread.is_alive():
+            return
+        # 定期全量加载，纠正增量对账可能遗漏的差异
+        if time.time() - self.fans_full_sync_time >= self.fans_full_sync_hours * 3600:
+            self.reload_fans_background()
+            return
+        total = self.get_fans_num()
+        # 未能加载到的粉丝不参与对账
+        expected = total - self.fans_sync_stats["unplaced"]
+        if len(self.fans_list) == expected:
+            return
+        # 粉丝数变化（如解除关注），从最新一页开始增量对账
+        result, fetched = self.fans_loader().reconcile(
+            self.fans_list, expected, max_pages=self.fans_incremental_max_pages)
+        self.fans_sync_stats["pages_fetched"] += fetched
+        if result is None:
+            # 差异不在最新几页（如较早的粉丝取消关注），记为未定位，留待定期全量加载
+            self.fans_sync_stats["unplaced"] = total - len(self.fans_list)
+            self.log_print(f"粉丝列表增量对账未能定位 {len(self.fans_list) - expected} 个变化，将在下次定期全量加载时纠正")
+            return
+        saved = (total - 1) // 50 + 1 - fetched if total else 0
+        self.fans_list.replace_newest(*result)
+        self.fans_sync_stats["incremental_syncs"] += 1
+        self.fans_sync_stats["pages_saved"] += saved
+        self.fans_sync_stats["last_pages_saved"] = saved
+        self.log_print(f"粉丝列表增量同步完成，拉取 {fetched} 页，节省 {saved} 页")
 
 
     # 获取新关注用户
@@ -299,107 +556,193 @@ class BiliMateServer:
         fans_list_status = self.bili_api.get_fans_list_status()
         new_fans_count = fans_list_status.get("count", 0)
         last_access_ts = fans_list_status.get("time", 0)
-        self.new_fans_list = []
+        self.new_fans_list.clear()
         if new_fans_count:
             new_fans_detail = self.bili_api.get_fans_detail(num=new_fans_count, last_access_ts=last_access_ts)
             if not new_fans_detail or 'list' not in new_fans_detail:
-                return []
-            self.new_fans_list.extend({'uname': f['uname'], 'mid': f['mid']} for f in new_fans_detail['list'])
-        # 合并到总列表
-        self.fans_list[:0] = self.new_fans_list
+                return self.new_fans_list
+            self.new_fans_list.extend_newest(new_fans_detail['list'])
+            # 新粉丝的昵称随接口返回，直接写入缓存
+            self.seed_user_cache({f['mid']: f['uname'] for f in new_fans_detail['list']})
+            # 合并到总列表（后台全量加载进行中时，同时记入待合并列表）
+            self.fans_list.extend_newest(new_fans_detail['list'])
+            added = self.fans_reload_added
+            if added is not None:
+                added.append(new_fans_detail['list'])
         return self.new_fans_list
 
 
     # 粉丝判断
     def is_fan(self, user_mid: int = 0):
-        for fan in self.fans_list:
-            if fan.get('mid') == user_mid:
-                return True
-        return False
+        return user_mid in self.fans_list
 
 
     # 新粉丝判断
     def is_new_fan(self, user_mid: int = 0):
-        for idx, fan in enumerate(self.new_fans_list):
-            if fan.get('mid') == user_mid:
-                del self.new_fans_list[idx]     # 仅生效一次，立即移除
-                return True
-        return False
+        # 仅生效一次，立即移除
+        return self.new_fans_list.remove(user_mid) is not None
 
 
     # 检查重复消息
     def check_repet_message(self, user_mid: int = 0, msg: str = "无消息内容"):
-        if self.repet_protect_times == 0:
-            return False
-        need = self.repet_protect_times + 1
-        if (user_mid not in self.message_list or
-                self.message_list[user_mid].maxlen != need):
-            self.message_list[user_mid] = deque(maxlen=need)
-        dq = self.message_list[user_mid]
-        dq.append(msg)
-        if len(dq) < need:
-            return False
-        return len(set(dq)) == 1
+        return self.repeat_guard.check(user_mid, msg)
 
 
-    # 发送消息
-    def send_message(self, user_mid: int = 0, msg: str = "无消息内容"):
+    # 发送消息，seqno 为会话消息序号（新粉丝欢迎语为 None），发送成功后才标记为已处理
+    def send_message(self, user_mid: int = 0, msg: str = "无消息内容", seqno: int = None):
         message_lower = msg.lower()
-        if self.is_new_fan(user_mid):
-            msg_replay = self.new_fans_reply
+        # 本次回复使用同一份规则快照
+        rule_set = self.rule_set
+        # 新粉丝判断需与欢迎语发送互斥
+        with self.reply_lock:
+            new_fan = self.is_new_fan(user_mid)
+        if new_fan:
+            role, hit_rule = "new_fans", "new_fans_reply"
+            msg_replay = rule_set.new_fans_reply
             self.log_print(f"用户身份：新粉丝")
         elif self.is_fan(user_mid):
-            if message_lower in self.fans_complete_dict:
-                msg_replay = self.fans_complete_dict[message_lower]
-            else:
-                hit_key = next((k for k in self.fans_keyword_dict
-                    if k in message_lower), None)
-                if hit_key is not None:
-                    msg_replay = self.fans_keyword_dict[hit_key]
-                else:
-                    msg_replay = self.fans_other_reply
+            role = "fans"
+            msg_replay, hit_rule = rule_set.match(role, message_lower)
             self.log_print(f"用户身份：粉丝")
             self.log_print(f"消息内容：\n{msg}")
         else:
-            if message_lower in self.non_fans_complete_dict:
-                msg_replay = self.non_fans_complete_dict[message_lower]
-            else:
-                hit_key = next((k for k in self.non_fans_keyword_dict
-                    if k in message_lower), None)
-                if hit_key is not None:
-                    msg_replay = self.non_fans_keyword_dict[hit_key]
-                else:
-                    msg_replay = self.non_fans_other_reply
+            role = "non_fans"
+            msg_replay, hit_rule = rule_set.match(role, message_lower)
             self.log_print(f"用户身份：非粉丝")
             self.log_print(f"消息内容：\n{msg}")
 
         if msg_replay and not self.check_repet_message(user_mid, msg_replay):
             self.log_print(f"消息回复：\n{msg_replay}")
-            self.bili_api.send_message(user_mid=user_mid, msg=msg_replay)
+            # 放入发送队列，由后台线程限速发送
+            if not self.send_queue.submit(user_mid, msg_replay, role=role, rule=hit_rule, message="" if new_fan else msg,
+                                          seqno=seqno):
+                self.log_print(f"发送队列已满，丢弃回复：UID:{user_mid}")
+                if seqno is not None:
+                    self.session_cursor.release(user_mid, seqno)
+                self.record_history(user_mid, role, hit_rule, "dropped", "" if new_fan else msg, msg_replay)
         else:
             self.log_print(f"无匹配消息回复")
+            status = "repeat" if msg_replay else "no_reply"
+            self.record_history(user_mid, role, hit_rule, status, "" if new_fan else msg, "")
+            # 无需发送，消息已处理完毕
+            if seqno is not None:
+                self.session_cursor.mark_handled(user_mid, seqno)
+
+
+    # 记录回复历史与回复结果计数
+    def record_history(self, user_mid: int, role: str, rule: str, status: str, msg: str, reply: str):
+        self.metrics.inc(REPLIES, status=status)
+        self.history.record(user_mid, role, rule, status, msg, reply)
+
+
+    # 发送回复（在发送线程中执行，限速与重试等待不计入性能分析）
+    def send_reply(self, user_mid: int, msg: str):
+        with self.profiler.iteration("auto_reply", count=False):
+            return self.bili_api.send_message(user_mid=user_mid, msg=msg)
+
+
+    # 发送结果（在发送线程中执行）
+    def on_send_result(self, user_mid: int, reply: str, context: dict, error: Exception, latency: float):
+        with self.profiler.iteration("auto_reply", count=False):
+            self.handle_send_result(user_mid, reply, context, error, latency)
+
+
+    # 处理发送结果
+    def handle_send_result(self, user_mid: int, reply: str, context: dict, error: Exception, latency: float):
+        # 发送耗时含排队与重试
+        self.metrics.observe(STAGE_SECONDS, latency, stage="send")
+        if error is None:
+            # 回复事件写入共享内存，供前端展示
+            self.reply_events.append(user_mid, context["role"], context["rule"], context["message"], reply)
+            self.record_history(user_mid, context["role"], context["rule"], "sent", context["message"], reply)
+            # 发送成功后才标记已处理，排队中重启的消息会重新回复
+            if context.get("seqno") is not None:
+                self.session_cursor.mark_handled(user_mid, context["seqno"])
+        else:
+            self.metrics.inc(STAGE_ERRORS, stage="send")
+            if context.get("seqno") is not None:
+                self.session_cursor.release(user_mid, context["seqno"])
+            self.log_print(f"发送消息失败：UID:{user_mid} {error}（耗时{latency:.2f}s）")
+            self.record_history(user_mid, context["role"], context["rule"], "failed", context["message"], str(error))
 
 
     # 获取新会话
+    @timed_stage("get_sessions")
     def get_new_sessions(self):
-        # 记住当前时间戳
-        temp_timestamp_ns = self.timestamp_ns
+        begin_ts = self.session_cursor.timestamp_ns
+        end_ts = int(time.time_ns() / 1000)
+        # 读取最近会话列表，has_more 时按最早会话时间继续向前翻页
+        session_list = []
+        page_end_ts = end_ts
+        for _ in range(SESSION_MAX_PAGES):
+            sessions = self.bili_api.get_sessions(begin_ts=begin_ts, end_ts=page_end_ts)
+            page = sessions.get("session_list") or []
+            session_list.extend(page)
+            if not sessions.get("has_more") or not page:
+                break
+            oldest_ts = min(each.get("session_ts", 0) for each in page)
+            if oldest_ts - 1 <= begin_ts:
+                break
+            page_end_ts = oldest_ts - 1
         # 更新当前时间戳
-        self.timestamp_ns = int(time.time_ns() / 1000)
-        # 读取最近会话列表
-        sessions = self.bili_api.get_sessions(begin_ts=temp_timestamp_ns, end_ts=self.timestamp_ns)
-        # 此处可添加has_more判断优化
-        session_list = sessions.get("session_list")
+        self.session_cursor.advance(end_ts, active=bool(session_list))
         return session_list
 
 
     # 获取用户昵称
     def get_user_name(self, user_mid: int = 0):
-        user_info = self.bili_api.get_user_info(user_mid)
-        return user_info['card']['name']
+        # 昵称仅用于日志时可跳过查询
+        if not self.user_name_lookup:
+            self.user_cache_skipped += 1
+            return f"UID:{user_mid}"
+        user_name = self.user_cache.get(user_mid)
+        if user_name is not None:
+            return user_name
+        # 轮询时已批量预热，缓存过期或被淘汰时再查粉丝列表
+        fan = self.fans_list.get(user_mid)
+        if fan is not None:
+            user_name = fan['uname']
+            self.user_cache_seeded += 1
+        else:
+            try:
+                user_info = self.bili_api.get_user_info(user_mid)
+                user_name = user_info['card']['name']
+            except Exception as e:
+                # 降级：查询失败时以 UID 代替昵称，不影响回复
+                self.log_print(f"获取用户昵称失败：{e}")
+                return f"UID:{user_mid}"
+        self.user_cache.set(user_mid, user_name)
+        return user_name
+
+
+    # 批量预热昵称缓存：粉丝的昵称从昵称库一次查出，非粉丝留待回复时查询
+    def warm_user_cache(self, mids):
+        if not self.user_name_lookup:
+            return
+        missing = [mid for mid in set(mids) if mid not in self.user_cache]
+        if missing:
+            self.seed_user_cache(self.fans_list.get_many(missing))
+
+
+    # 写入已知昵称
+    def seed_user_cache(self, unames: dict):
+        if not self.user_name_lookup:
+            return
+        for mid, uname in unames.items():
+            self.user_cache.set(mid, uname)
+        self.user_cache_seeded += len(unames)
+
+
+    # 用户昵称缓存统计
+    def user_cache_stats(self):
+        stats = self.user_cache.stats()
+        stats["seeded"] = self.user_cache_seeded
+        stats["skipped"] = self.user_cache_skipped
+        return stats
 
 
     # 更新视频数据
+    @timed_stage("update_video_data")
     def update_video_data(self):
         # 获取视频数据
         video_data = self.bili_api.get_video_data()
@@ -411,70 +754,208 @@ class BiliMateServer:
         self.inc_like = video_data.get("inc_like", 0)
         self.total_fav = video_data.get("total_fav", 0)
         self.inc_fav = video_data.get("inc_fav", 0)
+        self.stats_series.record(
+            total_click=self.total_click,
+            total_like=self.total_like,
+            total_fav=self.total_fav,
+        )
 
 
-    # 自动回复消息
-    def auto_reply_msg(self):
-        # 获取新粉丝
-        self.get_new_fans()
-        # 新粉丝打招呼
-        while self.new_fans_list:
-            self.notice_status = True
-            self.log_print(f"\n检测到新粉丝【{self.new_fans_list[0]['uname']}】关注")
-            self.send_message(user_mid=self.new_fans_list[0]['mid'])
+    # 保存状态快照
+    @timed_stage("checkpoint")
+    def save_checkpoint(self):
+        self.session_cursor.save(force=True)
+        self.repeat_guard.save()
+        if self.bili_api.my_mid is None:
+            return 0
+        return save_checkpoint(self.paths.checkpoint_file, {
+            "my_mid": self.bili_api.my_mid,
+            "stats": {field: getattr(self, field) for field in STAT_FIELDS},
+            "fans_full_sync_time": self.fans_full_sync_time,
+            "fan_mids": self.fans_list.order(),
+            "cursor": self.session_cursor.export_state(),
+            "repeat": self.repeat_guard.export_state(),
+        })
+
+
+    # 恢复状态快照（仅限同一账号），成功返回 True
+    def restore_checkpoint(self):
+        state = load_checkpoint(self.paths.checkpoint_file)
+        if state is None or state["my_mid"] != self.bili_api.my_mid:
+            return False
+        for field, value in state.get("stats", {}).items():
+            setattr(self, field, value)
+        self.fans_full_sync_time = state.get("fans_full_sync_time", 0)
+        if "cursor" in state:
+            self.session_cursor.import_state(*state["cursor"])
+        if "repeat" in state:
+            self.repeat_guard.import_state(state["repeat"])
+        if state.get("fan_mids"):
+            self.fans_list = FanIndex(state["fan_mids"], names=self.fan_names)
+        else:
+            return False
+        age = time.time() - state["created"]
+        self.log_print(f"已恢复状态快照（{age / 60:.0f}分钟前），粉丝数：{len(self.fans_list)}")
+        return True
+
+
+    # 后台对账粉丝列表
+    def reconcile_fans(self):
+        with self.fans_lock:
+            if not self.supervisors["粉丝轮询"].run(self.update_fans_list):
+                return
+        self.log_print(f"粉丝列表对账完成，已加载粉丝数：{len(self.fans_list)}")
+
+
+    # 轮询粉丝变化
+    @timed_stage("poll_fans")
+    def poll_fans(self):
+        # 后台对账进行中，本轮跳过
+        if not self.fans_lock.acquire(blocking=False):
+            return
+        try:
+            # 获取新粉丝
+            self.get_new_fans()
+            # 有新粉丝时加快轮询，否则逐步退避
+            self.fans_interval.record(bool(self.new_fans_list))
+            # 新粉丝打招呼
+            with self.reply_lock:
+                while self.new_fans_list:
+                    self.notice_status = True
+                    new_fan = self.new_fans_list.latest()
+                    self.log_print(f"\n检测到新粉丝【{new_fan['uname']}】关注")
+                    self.send_message(user_mid=new_fan['mid'])
+            # 同步粉丝列表（解除关注等）
+            self.update_fans_list()
+        finally:
+            self.fans_lock.release()
+
+
+    # 轮询新消息
+    @timed_stage("poll_sessions")
+    def poll_sessions(self):
         # 获取新消息
         new_sessions = self.get_new_sessions()
+        unread = []
         # 消息回复
         if new_sessions:
             for each_session in new_sessions:
                 if each_session.get("unread_count", 0) > 0:
-                    self.notice_status = True
-                    self.log_print(f"\n检测到新消息")
-                    unread_mid = each_session['last_msg']['sender_uid']
-                    unread_name = self.get_user_name(unread_mid)
-                    unread_msg = json.loads(each_session['last_msg']['content'])['content']
-                    self.log_print(f"消息用户：{unread_name}")
-                    self.send_message(user_mid=unread_mid, msg=unread_msg)
+                    last_msg = each_session['last_msg']
+                    unread_mid = last_msg['sender_uid']
+                    unread_seqno = last_msg.get('msg_seqno', last_msg.get('timestamp', 0))
+                    # 已回复过的消息（如重启后重新拉取）不再回复
+                    if self.session_cursor.is_handled(unread_mid, unread_seqno):
+                        continue
+                    unread_msg = json.loads(last_msg['content'])['content']
+                    self.session_cursor.add_pending(unread_mid, unread_seqno, each_session.get("session_ts", 0))
+                    unread.append((unread_mid, unread_msg, unread_seqno))
+        if unread:
+            self.notice_status = True
+            self.log_print(f"\n检测到 {len(unread)} 条新消息")
+            # 本轮发送者的昵称一次批量查询，回复线程直接读缓存
+            self.warm_user_cache(mid for mid, _, _ in unread)
+            dispatcher = self.get_reply_dispatcher()
+            for unread_mid, unread_msg, unread_seqno in unread:
+                dispatcher.submit(unread_mid, unread_msg, unread_seqno)
+        submitted = len(unread)
+        # 有新消息时加快轮询，否则逐步退避
+        self.session_interval.record(submitted > 0)
+        # 保存会话游标（限频），重复保护状态随状态快照与退出时保存
+        self.session_cursor.save()
+
+
+    # 获取回复分发器（工作线程数变化时重建）
+    def get_reply_dispatcher(self):
+        workers = max(1, self.reply_workers)
+        if self.reply_dispatcher is None or self.reply_dispatcher.workers != workers:
+            if self.reply_dispatcher is not None:
+                self.reply_dispatcher.stop()
+            self.reply_dispatcher = ReplyDispatcher(
+                self.reply_session, workers=workers, on_error=self.on_reply_error)
+        return self.reply_dispatcher
+
+
+    # 回复单个会话（在分发器工作线程中执行）
+    @timed_stage("reply")
+    def reply_session(self, user_mid: int, msg: str, seqno: int = 0):
+        # 性能分析自动回复时一并采样（不计入轮数）
+        with self.profiler.iteration("auto_reply", count=False):
+            self.handle_session(user_mid, msg, seqno)
+
+
+    # 处理单个会话
+    def handle_session(self, user_mid: int, msg: str, seqno: int = 0):
+        unread_name = self.get_user_name(user_mid)
+        self.log_print(f"消息用户：{unread_name}")
+        try:
+            self.send_message(user_mid=user_mid, msg=msg, seqno=seqno)
+        except Exception as e:
+            self.session_cursor.release(user_mid, seqno)
+            self.record_history(user_mid, "", "", "error", msg, str(e))
+            raise
+
+
+    # 回复异常
+    def on_reply_error(self, user_mid: int, e: Exception):
+        self.log_print(f"回复消息异常：{user_mid} {e}")
+
+
+    # 空闲提示
+    def notice_idle(self):
         if self.notice_status:
             self.log_print("\n当前无新消息，持续监测中...")
             self.notice_status = False
-        
+
 
     # 线程-更新视频数据
     def thread_update_video_data(self):
+        supervisor = self.supervisors["更新视频数据"]
         while not self._thread_update_video_data_stop_evt.is_set():
-            try:
-                if self.thread_update_video_data_status:
-                    self.update_video_data()
-            except Exception as e:
-                self.log_print(f"更新视频数据异常：{e}")
-                self.log_print("\n[暂停线程]-更新视频数据")
-                self.log_print("将在1分钟后自动重启运行")
-                self.thread_update_video_data_status = False
-                time.sleep(1*60)
-                self.restart_program()
-                #self.thread_update_video_data_status = True
-            self._thread_update_video_data_stop_evt.wait(3600)
+            wait = 3600
+            # 出错时保留上次数据，退避后重新运行
+            if self.thread_update_video_data_status:
+                with self.profiler.iteration("video_data"):
+                    if not supervisor.run(self.update_video_data):
+                        wait = supervisor.backoff
+            self._thread_update_video_data_stop_evt.wait(wait)
 
 
     # 线程-自动回复消息
     def thread_auto_reply_msg(self):
+        # 粉丝与会话按各自的自适应间隔轮询
+        next_fans = next_sessions = 0.0
         while not self._thread_auto_reply_msg_stop_evt.is_set():
+            wait = self.interval_seconds
             try:
                 # 重新加载设置参数
                 self.load_settings()
                 if self.thread_auto_reply_msg_status:
-                    self.auto_reply_msg()
-                time.sleep(self.interval_seconds)
+                    # 一轮完整耗时（性能分析时对本轮采样）
+                    with self.metrics.timer(STAGE_SECONDS, stage="auto_reply"), self.profiler.iteration("auto_reply"):
+                        # 任一任务出错只退避该任务，另一任务照常运行
+                        if time.monotonic() >= next_fans:
+                            supervisor = self.supervisors["粉丝轮询"]
+                            delay = self.fans_interval.delay if supervisor.run(self.poll_fans) else supervisor.backoff
+                            next_fans = time.monotonic() + delay
+                        if time.monotonic() >= next_sessions:
+                            supervisor = self.supervisors["会话轮询"]
+                            delay = self.session_interval.delay if supervisor.run(self.poll_sessions) else supervisor.backoff
+                            self.notice_idle()
+                            next_sessions = time.monotonic() + delay
+                    wait = min(next_fans, next_sessions) - time.monotonic()
             except Exception as e:
                 self.log_print(f"自动回复消息异常：{e}")
-                self.log_print("\n[暂停线程]-自动回复消息")
-                self.log_print("将在1分钟后自动重启运行")
-                self.thread_auto_reply_msg_status = False
-                time.sleep(1*60)
-                self.restart_program()
-                #self.thread_auto_reply_msg_status = True
-            self._thread_auto_reply_msg_stop_evt.wait(self.interval_seconds)
+            self._thread_auto_reply_msg_stop_evt.wait(max(0, wait))
+
+
+    # 线程-状态快照
+    def thread_checkpoint(self):
+        while not self._thread_auto_reply_msg_stop_evt.wait(max(10, self.checkpoint_interval)):
+            try:
+                self.save_checkpoint()
+            except Exception as e:
+                self.log_print(f"保存状态快照失败：{e}")
 
 
     # 线程-共享内存
@@ -489,8 +970,8 @@ class BiliMateServer:
             time.sleep(1)
 
 
-    # 主引擎
-    def engine(self):
+    # 登录并初始加载粉丝列表
+    def prepare(self):
         # 先登录
         self.log_print("检查登录状态")
         while not self.login():
@@ -498,12 +979,25 @@ class BiliMateServer:
             self.login_status = "超时未登录"
             time.sleep(2)
         self.log_print("登录已完成")
+        # 有快照时直接恢复，粉丝列表在后台对账
+        if self.restore_checkpoint():
+            threading.Thread(target=self.reconcile_fans, daemon=True, name="BiliMateReconcile").start()
+            return
         # 初始更新粉丝列表
         self.log_print("初始加载粉丝列表")
         self.reload_fans_list()
         self.log_print("加载粉丝列表完成")
         self.log_print(f"粉丝总数：{self.fans_num}，已加载粉丝数：{len(self.fans_list)}")
 
+
+    # 主引擎
+    def engine(self):
+        # 启动线程-共享内存
+        self._thread_update_shared_mem = threading.Thread(target=self.thread_update_shared_mem, daemon=True)
+        self._thread_update_shared_mem.start()
+        # 登录并初始加载粉丝列表
+        self.prepare()
+
         # 启动线程-更新视频数据
         self.thread_update_video_data_status = True
         self._thread_update_video_data_stop_evt = threading.Event()
@@ -520,16 +1014,36 @@ class BiliMateServer:
         self._thread_auto_reply_msg_data.start()
         self.log_print("\n[启动线程]-自动回复消息")
 
+        # 启动线程-状态快照
+        self._thread_checkpoint = threading.Thread(target=self.thread_checkpoint, daemon=True)
+        self._thread_checkpoint.start()
+
         try:
             self._thread_auto_reply_msg_data.join()
             self._thread_update_video_data.join()
             self._thread_update_shared_mem.join()
         except KeyboardInterrupt:
             self.log_print("\n程序已终止")
+        finally:
+            self.close()
 
 
 
 
 if __name__ == "__main__":
-    bilimate = BiliMateServer()
-    bilimate.engine()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="BiliMate 服务端")
+    parser.add_argument("--accounts", nargs="*", help="托管的账号（默认读取 data/accounts.json）")
+    parser.add_argument("--metrics-port", type=int, default=0, help="本地指标端点端口（0 为不启动，由 app.py 统一提供）")
+    args = parser.parse_args()
+    accounts = args.accounts or load_accounts()
+    servers = [BiliMateServer(account) for account in accounts]
+    if args.metrics_port:
+        MetricsServer(lambda: [({"account": s.account}, s.metrics.snapshot()) for s in servers], args.metrics_port).start()
+    if len(servers) > 1 or servers[0].async_engine:
+        # 多账号共用同一个事件循环与线程池
+        from async_engine import BiliMateAsyncEngine
+        BiliMateAsyncEngine(servers).run()
+    else:
+        # SIGTERM 按 Ctrl+C 处理，退出前保存状态
+        signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+        servers[0].engine()
\ No newline at end of file
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 会话游标
+
+持久化会话轮询的时间游标，并记录每个用户已处理的最新消息序号（msg_seqno）。
+重启后从上一轮的起点重新拉取，已处理的消息按序号跳过，既不重复回复也不遗漏。
+消息在回复发送成功后才标记为已处理；仍在发送队列中的消息，持久化的游标不越过其会话时间。
+"""
+
+import json, time, threading
+from pathlib import Path
+from collections import OrderedDict
+from settings_manager import write_json_atomic
+
+
+# 会话游标
+class SessionCursor:
+    def __init__(self, path: Path, max_users: int = 10000, save_interval: float = 30):
+        self.path = Path(path)
+        self.max_users = max_users
+        # 两次写入文件的最短间隔（秒），退出与保存快照时强制写入
+        self.save_interval = save_interval
+        self._last_save = 0.0
+        # 当前轮询游标（微秒）
+        self.timestamp_ns = 0
+        # 持久化的游标：上一轮的起点，重启后从此处重新拉取
+        self.saved_timestamp_ns = 0
+        # user_mid -> 已处理的最新消息序号
+        self._handled: OrderedDict[int, int] = OrderedDict()
+        # 已提交回复、尚未发送完成的消息：(user_mid, seqno) -> 会话时间（微秒）
+        self._pending: dict[tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+
+    # 加载
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.timestamp_ns = self.saved_timestamp_ns = int(data.get("timestamp_ns", 0))
+            self._handled = OrderedDict((int(k), int(v)) for k, v in data.get("handled", []))
+        except Exception:
+            pass
+
+
+    # 保存（写临时文件后替换，避免写一半），距上次写入不足 save_interval 秒时跳过，force 时立即写入
+    def save(self, force: bool = False):
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.monotonic()
+            if not force and now - self._last_save < self.save_interval:
+                return
+            self._last_save = now
+            data = {
+                "timestamp_ns": self._persisted_timestamp(),
+                "handled": list(self._handled.items()),
+            }
+            self._dirty = False
+        write_json_atomic(self.path, data, separators=(",", ":"))
+
+
+    # 持久化的游标：不越过尚未发送完成的最早消息
+    def _persisted_timestamp(self):
+        if not self._pending:
+            return self.saved_timestamp_ns
+        return min(self.saved_timestamp_ns, min(self._pending.values()) - 1)
+
+
+    # 推进游标，active 为本轮是否拉取到会话（无会话时重启后从旧游标拉取结果相同，无需写入）
+    def advance(self, end_ts: int, active: bool = True):
+        with self._lock:
+            changed = self.timestamp_ns != self.saved_timestamp_ns
+            self.saved_timestamp_ns = self.timestamp_ns
+            self.timestamp_ns = end_ts
+            if active and changed:
+                self._dirty = True
+
+
+    # 消息是否已处理（或正在发送回复）
+    def is_handled(self, user_mid: int, seqno: int):
+        with self._lock:
+            return seqno <= self._handled.get(user_mid, -1) or (user_mid, seqno) in self._pending
+
+
+    # 记录已提交回复、尚未发送完成的消息
+    def add_pending(self, user_mid: int, seqno: int, session_ts: int):
+        if session_ts <= 0:
+            return
+        with self._lock:
+            self._pending[(user_mid, seqno)] = session_ts
+            self._dirty = True
+
+
+    # 回复未能发送（丢弃或失败），不再阻止游标推进
+    def release(self, user_mid: int, seqno: int):
+        with self._lock:
+            if self._pending.pop((user_mid, seqno), None) is not None:
+                self._dirty = True
+
+
+    # 标记消息已处理
+    def mark_handled(self, user_mid: int, seqno: int):
+        with self._lock:
+            if self._pending.pop((user_mid, seqno), None) is not None:
+                self._dirty = True
+            if seqno > self._handled.get(user_mid, -1):
+                self._handled[user_mid] = seqno
+                self._handled.move_to_end(user_mid)
+                while len(self._handled) > self.max_users:
+                    self._handled.popitem(last=False)
+                self._dirty = True
+
+
+    # 导出状态（用于快照）
+    def export_state(self):
+        with self._lock:
+            return self._persisted_timestamp(), list(self._handled.items())
+
+
+    # 合并快照中的状态（游标取较新者，序号取较大者）
+    def import_state(self, timestamp_ns: int, handled):
+        with self._lock:
+            if timestamp_ns > self.saved_timestamp_ns:
+                self.saved_timestamp_ns = self.timestamp_ns = timestamp_ns
+                self._dirty = True
+            for user_mid, seqno in handled:
+                if seqno > self._handled.get(user_mid, -1):
+                    self._handled[user_mid] = seqno
+                    self._dirty = True
+            while len(self._handled) > self.max_users:
+                self._handled.popitem(last=False)
+
+
+    def __len__(self):
+        return len(self._handled)
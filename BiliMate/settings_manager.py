@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 设置管理
+
+仅当 settings.json 的修改时间或大小变化时才重新解析，
+每次重新加载生成不可变的设置快照（含预编译的回复规则），由回复流程整体替换引用。
+写入统一采用 临时文件 + 替换，读取方不会读到写了一半的文件。
+"""
+
+import os, json, threading
+from pathlib import Path
+from types import MappingProxyType
+from rule_engine import RuleSet
+
+
+# 原子写入文件（临时文件 + 替换）
+def write_bytes_atomic(path: Path, data: bytes):
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+# 原子写入 JSON 文件
+def write_json_atomic(path: Path, data, **kwargs):
+    write_bytes_atomic(path, json.dumps(data, **kwargs).encode("utf-8"))
+
+
+# 设置快照（只读）
+class SettingsSnapshot:
+    def __init__(self, settings: dict, defaults: dict, version: int = 0):
+        self.settings = MappingProxyType(dict(settings))
+        self.defaults = defaults
+        self.version = version
+        self.rule_set = RuleSet(settings)
+
+
+    # 读取设置项，缺省时取默认值
+    def get(self, key: str):
+        return self.settings.get(key, self.defaults.get(key))
+
+
+    def __getitem__(self, key: str):
+        return self.get(key)
+
+
+# 设置管理器
+class SettingsManager:
+    def __init__(self, path: Path, defaults: dict):
+        self.path = Path(path)
+        self.defaults = defaults
+        self.snapshot: SettingsSnapshot = None
+        self._stat_key = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+
+    # 文件状态（修改时间 + 大小）
+    def _stat(self):
+        try:
+            st = self.path.stat()
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+
+    # 文件有变化时重新加载，返回新快照；无变化返回 None
+    def reload_if_changed(self):
+        with self._lock:
+            stat_key = self._stat()
+            if stat_key is not None and stat_key == self._stat_key and self.snapshot is not None:
+                return None
+            try:
+                settings = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                if self.snapshot is not None and stat_key is not None:
+                    # 文件内容有误时保留当前快照，不覆盖用户文件
+                    self._stat_key = stat_key
+                    raise ValueError(f"设置文件解析失败，继续使用当前设置: {e}")
+                settings = dict(self.defaults)
+                write_json_atomic(self.path, settings, ensure_ascii=False, indent=2)
+                stat_key = self._stat()
+                print(f"加载设置参数失败，恢复默认参数: {e}")
+            self._stat_key = stat_key
+            self.reloads += 1
+            self.snapshot = SettingsSnapshot(settings, self.defaults, self.reloads)
+            return self.snapshot
+
+
+    # 保存设置
+    def save(self, settings: dict):
+        write_json_atomic(self.path, settings, ensure_ascii=False, indent=2)
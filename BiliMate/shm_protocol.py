@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 共享内存协议
+
+主段（固定大小）：
+    头部    magic(4s) version(H) reserved(H) seq(Q)
+    数值区  固定偏移的整数指标（时间戳、粉丝量、播放量等）
+    目录    每个可变分区一项：generation(I) capacity(I)
+可变分区各自位于独立的共享内存段 <name>_<分区>_<generation>：
+    头部    seq(Q) length(I)
+    数据    length 字节
+
+写入采用顺序锁：写前 seq+1（奇数表示写入中），写后再 +1；
+读取方 seq 为奇数或前后不一致时重读，seq 未变化时直接复用上次结果。
+可变分区内容未变化时不重写；容量不足时以新的 generation 重新创建分区段。
+
+回复事件环形缓冲区位于独立的共享内存段 <name>_events，
+服务端追加结构化回复事件，前端按已读序号只读取新事件。
+"""
+
+import struct, time, threading
+import multiprocessing.shared_memory as shm
+
+MAGIC = b"BMS1"
+VERSION = 1
+
+# 主段
+MAIN_SIZE = 4096
+HEADER = struct.Struct("<4sHHQ")
+SEQ_OFFSET = 8
+# 数值指标（固定偏移）
+METRIC_FIELDS = (
+    "time_stamp", "login_time_cnt", "my_mid",
+    "total_fans", "inc_fans", "total_click", "inc_click",
+    "total_like", "inc_like", "total_fav", "inc_fav",
+    "loaded_fans", "state_info_status", "reply_info_status",
+)
+METRICS = struct.Struct("<" + "q" * len(METRIC_FIELDS))
+METRICS_OFFSET = HEADER.size
+# 可变分区
+SECTIONS = ("status", "fans", "metrics")
+DIRECTORY_ENTRY = struct.Struct("<II")
+DIRECTORY_OFFSET = METRICS_OFFSET + METRICS.size
+
+# 分区段
+SECTION_HEADER = struct.Struct("<QI")
+SECTION_MIN_CAPACITY = 4096
+
+# 粉丝分区编码
+FAN_ENTRY = struct.Struct("<qH")
+
+# 读取重试次数
+READ_RETRIES = 100
+
+
+# 分区段名称
+def section_name(name: str, section: str, generation: int):
+    return f"{name}_{section}_{generation}"
+
+
+# 编码粉丝列表
+def encode_fans(fans):
+    parts = [struct.pack("<I", len(fans))]
+    for f in fans:
+        uname = str(f['uname']).encode("utf-8")[:0xFFFF]
+        parts.append(FAN_ENTRY.pack(f['mid'], len(uname)))
+        parts.append(uname)
+    return b"".join(parts)
+
+
+# 解码粉丝列表
+def decode_fans(payload: bytes):
+    if not payload:
+        return []
+    count = struct.unpack_from("<I", payload, 0)[0]
+    offset = 4
+    fans = []
+    for _ in range(count):
+        mid, length = FAN_ENTRY.unpack_from(payload, offset)
+        offset += FAN_ENTRY.size
+        fans.append({'uname': payload[offset:offset + length].decode("utf-8", errors="ignore"), 'mid': mid})
+        offset += length
+    return fans
+
+
+# 打开或创建共享内存段
+def open_segment(name: str, size: int, create: bool):
+    if not create:
+        return shm.SharedMemory(name=name, create=False)
+    try:
+        return shm.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        old = shm.SharedMemory(name=name, create=False)
+        if old.size >= size:
+            return old
+        old.close()
+        old.unlink()
+        return shm.SharedMemory(name=name, create=True, size=size)
+
+
+# 顺序锁写入
+def seq_begin(buf, offset: int):
+    seq = struct.unpack_from("<Q", buf, offset)[0]
+    if seq % 2 == 0:
+        seq += 1
+    struct.pack_into("<Q", buf, offset, seq)
+    return seq
+
+
+def seq_end(buf, offset: int, seq: int):
+    struct.pack_into("<Q", buf, offset, seq + 1)
+
+
+# 写入端（服务端）
+class ShmWriter:
+    def __init__(self, name: str = "BiliMate_shm"):
+        self.name = name
+        self.main = open_segment(name, MAIN_SIZE, create=True)
+        self.segments: dict[str, shm.SharedMemory] = {}
+        self.generations = {section: 0 for section in SECTIONS}
+        self._last_payload: dict[str, bytes] = {}
+        self._last_metrics = None
+        buf = self.main.buf
+        seq = seq_begin(buf, SEQ_OFFSET)
+        struct.pack_into("<4sHH", buf, 0, MAGIC, VERSION, 0)
+        for idx in range(len(SECTIONS)):
+            DIRECTORY_ENTRY.pack_into(buf, DIRECTORY_OFFSET + idx * DIRECTORY_ENTRY.size, 0, 0)
+        seq_end(buf, SEQ_OFFSET, seq)
+
+
+    # 写入数值指标（未变化时不写）
+    def write_metrics(self, metrics: dict):
+        values = tuple(int(metrics.get(field) or 0) for field in METRIC_FIELDS)
+        if values == self._last_metrics:
+            return False
+        buf = self.main.buf
+        seq = seq_begin(buf, SEQ_OFFSET)
+        METRICS.pack_into(buf, METRICS_OFFSET, *values)
+        seq_end(buf, SEQ_OFFSET, seq)
+        self._last_metrics = values
+        return True
+
+
+    # 写入可变分区（未变化时不写）
+    def write_section(self, section: str, payload: bytes):
+        if self._last_payload.get(section) == payload:
+            return False
+        segment = self.segments.get(section)
+        need = SECTION_HEADER.size + len(payload)
+        if segment is None or segment.size < need:
+            segment = self._grow(section, need)
+        buf = segment.buf
+        seq = seq_begin(buf, 0)
+        struct.pack_into("<I", buf, 8, len(payload))
+        buf[SECTION_HEADER.size:SECTION_HEADER.size + len(payload)] = payload
+        seq_end(buf, 0, seq)
+        self._last_payload[section] = payload
+        return True
+
+
+    # 以新的 generation 创建更大的分区段
+    def _grow(self, section: str, need: int):
+        capacity = SECTION_MIN_CAPACITY
+        while capacity < need * 3 // 2:
+            capacity *= 2
+        generation = self.generations[section] + 1
+        segment = open_segment(section_name(self.name, section, generation), capacity, create=True)
+        segment.buf[:SECTION_HEADER.size] = SECTION_HEADER.pack(0, 0)
+        # 更新目录
+        buf = self.main.buf
+        idx = SECTIONS.index(section)
+        seq = seq_begin(buf, SEQ_OFFSET)
+        DIRECTORY_ENTRY.pack_into(buf, DIRECTORY_OFFSET + idx * DIRECTORY_ENTRY.size, generation, segment.size)
+        seq_end(buf, SEQ_OFFSET, seq)
+        # 释放旧分区段（已打开的读取方仍可读完，随后按新 generation 重新打开）
+        old = self.segments.get(section)
+        if old is not None:
+            old.close()
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments[section] = segment
+        self.generations[section] = generation
+        return segment
+
+
+    # 关闭并删除全部共享内存段
+    def close(self, unlink: bool = False):
+        for segment in self.segments.values():
+            segment.close()
+            if unlink:
+                segment.unlink()
+        self.main.close()
+        if unlink:
+            self.main.unlink()
+
+
+# 读取端（前端）
+class ShmReader:
+    def __init__(self, name: str = "BiliMate_shm"):
+        self.name = name
+        self.main = open_segment(name, MAIN_SIZE, create=False)
+        magic, version, _ = struct.unpack_from("<4sHH", self.main.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"共享内存协议不匹配：{magic!r} v{version}")
+        self.segments: dict[str, tuple[int, shm.SharedMemory]] = {}
+        self.seq = None
+        self.metrics: dict = {}
+        self.directory: dict[str, int] = {}
+        self.section_seq: dict[str, int] = {}
+        self.sections: dict[str, bytes] = {}
+        self.decoded: dict[str, tuple] = {}
+
+
+    # 顺序锁读取
+    @staticmethod
+    def _read_consistent(buf, seq_offset: int, reader):
+        for _ in range(READ_RETRIES):
+            seq1 = struct.unpack_from("<Q", buf, seq_offset)[0]
+            if seq1 % 2:
+                time.sleep(0)
+                continue
+            result = reader(buf)
+            seq2 = struct.unpack_from("<Q", buf, seq_offset)[0]
+            if seq1 == seq2:
+                return seq1, result
+        raise TimeoutError("共享内存读取超时")
+
+
+    # 读取主段，返回是否有变化
+    def read_main(self):
+        seq = struct.unpack_from("<Q", self.main.buf, SEQ_OFFSET)[0]
+        if seq == self.seq:
+            return False
+
+        def reader(buf):
+            metrics = dict(zip(METRIC_FIELDS, METRICS.unpack_from(buf, METRICS_OFFSET)))
+            directory = {
+                section: DIRECTORY_ENTRY.unpack_from(buf, DIRECTORY_OFFSET + idx * DIRECTORY_ENTRY.size)[0]
+                for idx, section in enumerate(SECTIONS)
+            }
+            return metrics, directory
+
+        self.seq, (self.metrics, self.directory) = self._read_consistent(self.main.buf, SEQ_OFFSET, reader)
+        return True
+
+
+    # 读取可变分区，未变化时返回缓存
+    def read_section(self, section: str):
+        generation = self.directory.get(section, 0)
+        if not generation:
+            return b""
+        cached = self.segments.get(section)
+        if cached is None or cached[0] != generation:
+            if cached is not None:
+                cached[1].close()
+            try:
+                segment = open_segment(section_name(self.name, section, generation), 0, create=False)
+            except FileNotFoundError:
+                # 写入端刚更换分区段，下次读取主段后重试
+                self.seq = None
+                return self.sections.get(section, b"")
+            self.segments[section] = (generation, segment)
+            self.section_seq.pop(section, None)
+        segment = self.segments[section][1]
+        seq = struct.unpack_from("<Q", segment.buf, 0)[0]
+        if seq == self.section_seq.get(section):
+            return self.sections[section]
+
+        def reader(buf):
+            length = struct.unpack_from("<I", buf, 8)[0]
+            return bytes(buf[SECTION_HEADER.size:SECTION_HEADER.size + length])
+
+        self.section_seq[section], self.sections[section] = self._read_consistent(segment.buf, 0, reader)
+        return self.sections[section]
+
+
+    # 读取并解码可变分区，内容未变化时返回上次解码结果
+    def read_decoded(self, section: str, decoder):
+        payload = self.read_section(section)
+        key = (self.directory.get(section, 0), self.section_seq.get(section))
+        cached = self.decoded.get(section)
+        if cached is None or cached[0] != key:
+            cached = self.decoded[section] = (key, decoder(payload))
+        return cached[1]
+
+
+    # 关闭（不删除共享内存）
+    def close(self):
+        for _, segment in self.segments.values():
+            segment.close()
+        self.segments.clear()
+        self.main.close()
+
+
+# 回复事件环形缓冲区
+# 头部  magic(4s) capacity(I) slot_size(I) reserved(I) head(Q)  head 为下一条事件的序号
+# 槽位  state(Q) timestamp(d) mid(q) role(B) rule_len(H) msg_len(H) reply_len(H) 数据
+#       state = 2*序号+1 表示写入中，2*序号+2 表示写入完成
+EVENT_MAGIC = b"BME1"
+EVENT_HEADER = struct.Struct("<4sIIIQ")
+EVENT_HEAD_OFFSET = 16
+EVENT_SLOT = struct.Struct("<QdqBHHH")
+EVENT_CAPACITY = 256
+EVENT_SLOT_SIZE = 512
+EVENT_ROLES = ("new_fans", "fans", "non_fans")
+
+
+# 事件段名称
+def events_name(name: str):
+    return f"{name}_events"
+
+
+# 按字节截断字符串
+def _truncate(text: str, limit: int):
+    data = str(text or "").encode("utf-8")[:limit]
+    return data.decode("utf-8", errors="ignore").encode("utf-8")
+
+
+# 事件写入端（服务端，多线程安全）
+class EventRingWriter:
+    def __init__(self, name: str = "BiliMate_shm", capacity: int = EVENT_CAPACITY, slot_size: int = EVENT_SLOT_SIZE):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        size = EVENT_HEADER.size + capacity * slot_size
+        self.segment = open_segment(events_name(name), size, create=True)
+        magic, old_capacity, old_slot_size, _, head = EVENT_HEADER.unpack_from(self.segment.buf, 0)
+        if magic != EVENT_MAGIC or old_capacity != capacity or old_slot_size != slot_size:
+            head = 0
+            self.segment.buf[:size] = bytes(size)
+        # 沿用已有序号，前端的已读位置在服务端重启后仍然有效
+        EVENT_HEADER.pack_into(self.segment.buf, 0, EVENT_MAGIC, capacity, slot_size, 0, head)
+        self._lock = threading.Lock()
+
+
+    # 追加事件
+    def append(self, mid: int, role: str, rule: str, msg: str, reply: str, timestamp: float = None):
+        space = self.slot_size - EVENT_SLOT.size
+        reply_b = _truncate(reply, space // 2)
+        rule_b = _truncate(rule, min(128, space - len(reply_b)))
+        msg_b = _truncate(msg, space - len(reply_b) - len(rule_b))
+        role_idx = EVENT_ROLES.index(role) if role in EVENT_ROLES else 255
+        buf = self.segment.buf
+        with self._lock:
+            seq = struct.unpack_from("<Q", buf, EVENT_HEAD_OFFSET)[0]
+            offset = EVENT_HEADER.size + (seq % self.capacity) * self.slot_size
+            struct.pack_into("<Q", buf, offset, 2 * seq + 1)
+            EVENT_SLOT.pack_into(buf, offset, 2 * seq + 1, timestamp or time.time(), mid, role_idx,
+                                 len(rule_b), len(msg_b), len(reply_b))
+            data = rule_b + msg_b + reply_b
+            start = offset + EVENT_SLOT.size
+            buf[start:start + len(data)] = data
+            struct.pack_into("<Q", buf, offset, 2 * seq + 2)
+            struct.pack_into("<Q", buf, EVENT_HEAD_OFFSET, seq + 1)
+        return seq
+
+
+    # 关闭
+    def close(self, unlink: bool = False):
+        self.segment.close()
+        if unlink:
+            self.segment.unlink()
+
+
+# 事件读取端（前端，每个会话各自记录已读位置）
+class EventRingReader:
+    def __init__(self, name: str = "BiliMate_shm"):
+        self.segment = open_segment(events_name(name), 0, create=False)
+        magic, self.capacity, self.slot_size, _, _ = EVENT_HEADER.unpack_from(self.segment.buf, 0)
+        if magic != EVENT_MAGIC:
+            raise ValueError(f"事件缓冲区协议不匹配：{magic!r}")
+        self.last_seq = -1
+
+
+    # 当前序号
+    def head(self):
+        return struct.unpack_from("<Q", self.segment.buf, EVENT_HEAD_OFFSET)[0]
+
+
+    # 读取单条事件，已被覆盖或写入中返回 None
+    def _read_slot(self, seq: int):
+        buf = self.segment.buf
+        offset = EVENT_HEADER.size + (seq % self.capacity) * self.slot_size
+        state, timestamp, mid, role_idx, rule_len, msg_len, reply_len = EVENT_SLOT.unpack_from(buf, offset)
+        if state != 2 * seq + 2:
+            return None
+        start = offset + EVENT_SLOT.size
+        data = bytes(buf[start:start + rule_len + msg_len + reply_len])
+        if struct.unpack_from("<Q", buf, offset)[0] != state:
+            return None
+        return {
+            "seq": seq,
+            "timestamp": timestamp,
+            "mid": mid,
+            "role": EVENT_ROLES[role_idx] if role_idx < len(EVENT_ROLES) else "",
+            "rule": data[:rule_len].decode("utf-8", errors="ignore"),
+            "msg": data[rule_len:rule_len + msg_len].decode("utf-8", errors="ignore"),
+            "reply": data[rule_len + msg_len:].decode("utf-8", errors="ignore"),
+        }
+
+
+    # 读取上次之后的新事件（最多 limit 条）
+    def read_new(self, limit: int = None):
+        head = self.head()
+        if head <= self.last_seq:
+            # 服务端重置了缓冲区
+            self.last_seq = -1
+        start = max(self.last_seq + 1, head - self.capacity)
+        if limit is not None:
+            start = max(start, head - limit)
+        events = []
+        for seq in range(start, head):
+            event = self._read_slot(seq)
+            if event is not None:
+                events.append(event)
+        self.last_seq = head - 1
+        return events
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 多进程监督
+
+把账号分片到若干个 server.py 工作进程（每个进程托管一组账号，充分利用多核）。
+每个账号的服务端每秒写入共享内存时间戳，监督线程据此判断工作进程是否存活：
+进程退出或时间戳停止更新即重启该进程，连续失败按指数退避；
+失败次数过多的进程暂时移出进程池，其账号重新分配给其它进程，冷却后再加入。
+账号列表（data/accounts.json）变化时同样重新分配，已在运行的账号尽量不迁移。
+"""
+
+import sys, time, math, subprocess, threading
+from pathlib import Path
+from accounts import ACCOUNTS_FILE, AccountPaths, load_accounts
+from shm_protocol import ShmReader
+from metrics import decode_snapshot
+
+SERVER_FILE = Path(__file__).parent / "server.py"
+
+
+# 读取账号的共享内存时间戳，未就绪返回 None
+def read_heartbeat(shm_name: str):
+    try:
+        reader = ShmReader(shm_name)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        reader.read_main()
+        return reader.metrics.get("time_stamp") or None
+    except TimeoutError:
+        return None
+    finally:
+        reader.close()
+
+
+# 分配账号：已分配的账号尽量留在原进程，其余分给负载最低的进程
+def assign_accounts(accounts, workers, previous: dict = None):
+    if not workers:
+        return {}
+    capacity = math.ceil(len(accounts) / len(workers))
+    shards = {worker: [] for worker in workers}
+    pending = []
+    for account in accounts:
+        worker = (previous or {}).get(account)
+        if worker in shards and len(shards[worker]) < capacity:
+            shards[worker].append(account)
+        else:
+            pending.append(account)
+    for account in pending:
+        worker = min(shards, key=lambda w: (len(shards[w]), w))
+        shards[worker].append(account)
+    return shards
+
+
+# 工作进程
+class Worker:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.accounts: list[str] = []
+        self.proc: subprocess.Popen = None
+        self.started = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.restart_at = 0.0
+        # 移出进程池直到该时间
+        self.retired_until = 0.0
+
+
+    # 是否在运行
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+
+# 工作进程监督
+class WorkerSupervisor:
+    def __init__(self, workers: int = 1, health_timeout: float = 30, startup_grace: float = 60,
+                 check_interval: float = 5, base_delay: float = 2, max_delay: float = 300,
+                 max_failures: int = 5, retire_seconds: float = 600, accounts_file: Path = ACCOUNTS_FILE):
+        self.workers = [Worker(idx) for idx in range(max(1, workers))]
+        self.health_timeout = health_timeout
+        self.startup_grace = startup_grace
+        self.check_interval = check_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_failures = max_failures
+        self.retire_seconds = retire_seconds
+        self.accounts_file = Path(accounts_file)
+        self._accounts_key = None
+        self._active = ()
+        self._stop = threading.Event()
+        self._thread = None
+        self.rebalances = 0
+        # 各账号的共享内存读取端（汇总指标用）
+        self._readers: dict[str, ShmReader] = {}
+        self._readers_lock = threading.Lock()
+
+
+    # 打印日志
+    @staticmethod
+    def log(msg: str):
+        current_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        print(f"[{current_time}][监督] {msg}")
+
+
+    # 启动工作进程
+    def start_worker(self, worker: Worker):
+        if not worker.accounts:
+            return
+        worker.proc = subprocess.Popen([sys.executable, str(SERVER_FILE), "--accounts", *worker.accounts])
+        worker.started = time.monotonic()
+        self.log(f"启动进程 #{worker.idx}（PID {worker.proc.pid}）：{', '.join(worker.accounts)}")
+
+
+    # 停止工作进程
+    def stop_worker(self, worker: Worker, timeout: float = 10):
+        if not worker.alive():
+            worker.proc = None
+            return
+        worker.proc.terminate()
+        try:
+            worker.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            worker.proc.kill()
+            worker.proc.wait()
+        worker.proc = None
+
+
+    # 工作进程是否健康，返回 (是否健康, 原因)
+    def check_health(self, worker: Worker):
+        if not worker.alive():
+            code = worker.proc.returncode if worker.proc else None
+            return False, f"进程已退出（{code}）"
+        if time.monotonic() - worker.started < self.startup_grace:
+            return True, ""
+        now = time.time()
+        for account in worker.accounts:
+            heartbeat = read_heartbeat(AccountPaths(account).shm_name)
+            if heartbeat is None or now - heartbeat > self.health_timeout:
+                return False, f"账号 {account} 心跳超时"
+        return True, ""
+
+
+    # 重新分配账号（账号列表或可用进程变化时）
+    def rebalance(self, force: bool = False):
+        try:
+            stat = self.accounts_file.stat()
+            accounts_key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            accounts_key = None
+        now = time.monotonic()
+        active = tuple(w.idx for w in self.workers if w.retired_until <= now)
+        if not active:
+            # 全部进程都已移出时，保留编号最小的进程
+            active = (self.workers[0].idx,)
+        if not force and accounts_key == self._accounts_key and active == self._active:
+            return False
+        self._accounts_key, self._active = accounts_key, active
+        previous = {account: w.idx for w in self.workers for account in w.accounts}
+        shards = assign_accounts(load_accounts(self.accounts_file), active, previous)
+        for worker in self.workers:
+            accounts = shards.get(worker.idx, [])
+            if accounts == worker.accounts:
+                continue
+            # 账号变化的进程重启（热重启由状态快照保证）
+            self.stop_worker(worker)
+            worker.accounts = accounts
+            worker.failures = 0
+            worker.restart_at = 0.0
+            self.start_worker(worker)
+        self.rebalances += 1
+        return True
+
+
+    # 一轮检查
+    def check(self):
+        self.rebalance()
+        now = time.monotonic()
+        for worker in self.workers:
+            if not worker.accounts:
+                continue
+            if worker.proc is None:
+                # 等待退避结束后重启
+                if now >= worker.restart_at:
+                    worker.restarts += 1
+                    self.start_worker(worker)
+                continue
+            healthy, reason = self.check_health(worker)
+            if healthy:
+                # 稳定运行一段时间后清零失败计数
+                if worker.failures and now - worker.started > self.max_delay:
+                    worker.failures = 0
+                continue
+            # 无响应的进程可能无法处理 SIGTERM，缩短等待
+            self.stop_worker(worker, timeout=3)
+            worker.failures += 1
+            if worker.failures >= self.max_failures:
+                worker.retired_until = now + self.retire_seconds
+                # 没有其它进程可接管时（如只有一个进程）账号不变，冷却结束前不重启
+                worker.restart_at = worker.retired_until
+                self.log(f"进程 #{worker.idx} {reason}，连续失败 {worker.failures} 次，暂时移出，账号重新分配")
+                worker.failures = 0
+                continue
+            delay = min(self.base_delay * (2 ** (worker.failures - 1)), self.max_delay)
+            worker.restart_at = now + delay
+            self.log(f"进程 #{worker.idx} {reason}，{delay:.0f}秒后重启")
+
+
+    # 监督循环
+    def run(self):
+        self.rebalance(force=True)
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.log(f"检查异常：{e}")
+
+
+    # 在后台线程中启动
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name="BiliMateSupervisor")
+        self._thread.start()
+
+
+    # 停止监督并结束全部工作进程
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_interval + 1)
+        for worker in self.workers:
+            self.stop_worker(worker, timeout=3)
+
+
+    # 汇总各账号的指标快照与工作进程状态，返回 [(附加标签, 快照)]
+    def collect_metrics(self):
+        results = [({}, {
+            "gauges": [["bilimate_worker_up", {"worker": str(w.idx)}, int(w.alive())] for w in self.workers],
+            "counters": [["bilimate_worker_restarts_total", {"worker": str(w.idx)}, w.restarts] for w in self.workers],
+        })]
+        with self._readers_lock:
+            for worker in self.workers:
+                for account in worker.accounts:
+                    reader = self._readers.get(account)
+                    try:
+                        if reader is None:
+                            reader = self._readers[account] = ShmReader(AccountPaths(account).shm_name)
+                        reader.read_main()
+                        if time.time() - reader.metrics.get("time_stamp", 0) > self.health_timeout:
+                            # 共享内存可能已由重启后的进程重新创建
+                            raise FileNotFoundError(account)
+                        snapshot = reader.read_decoded("metrics", decode_snapshot)
+                    except (FileNotFoundError, ValueError, TimeoutError):
+                        # 工作进程重启中，下次重新打开
+                        if self._readers.pop(account, None) is not None:
+                            reader.close()
+                        continue
+                    results.append(({"account": account}, snapshot))
+        return results
+
+
+    # 状态信息
+    def stats(self):
+        return [
+            {
+                "idx": w.idx,
+                "pid": w.proc.pid if w.alive() else None,
+                "accounts": list(w.accounts),
+                "failures": w.failures,
+                "restarts": w.restarts,
+                "retired": w.retired_until > time.monotonic(),
+            }
+            for w in self.workers
+        ]
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 频道数据时间序列
+
+粉丝量、播放量、点赞量、收藏量按分钟、小时、天三个精度保存，每个精度一个内存映射文件：
+    头部  magic(4s) version(H) fields(H) capacity(I) seq(Q) count(Q)
+    数据  capacity 条定长记录：ts(q) + 各字段(q)，环形覆盖最旧的记录（保留期限）
+写入一条数据时同时写入三个精度：与最后一条记录处于同一时间段则覆盖（取该时段最后的值），
+否则追加，降采样无需后台任务；各字段都取得过数值后才开始写入，避免以 0 补位造成虚假的骤降。写入采用顺序锁（seq 为奇数表示写入中），读取方可并发读取。
+前端以 NumPy 结构化数组整体读取，切片与换算均为向量化操作。
+"""
+
+import mmap, struct, time, threading
+from pathlib import Path
+
+MAGIC = b"BMTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQQ")
+SEQ_OFFSET = 12
+# 记录的数值字段（ts 之外）
+FIELDS = ("total_fans", "total_click", "total_like", "total_fav")
+RECORD = struct.Struct("<q" + "q" * len(FIELDS))
+
+# 精度：名称 -> (时间段秒数, 保留条数)
+TIERS = {
+    "minute": (60, 7 * 24 * 60),
+    "hour": (3600, 90 * 24),
+    "day": (86400, 10 * 366),
+}
+
+# 读取重试次数
+READ_RETRIES = 100
+
+
+# 时间序列文件
+def tier_file(data_dir: Path, tier: str):
+    return Path(data_dir) / f"stats_{tier}.bin"
+
+
+# 单个精度的环形记录文件（写入端）
+class TierWriter:
+    def __init__(self, path: Path, step: int, capacity: int):
+        self.path = Path(path)
+        self.step = step
+        self.capacity = capacity
+        size = HEADER.size + capacity * RECORD.size
+        with open(self.path, "r+b" if self.path.exists() else "w+b") as f:
+            header = f.read(HEADER.size)
+            valid = False
+            if len(header) == HEADER.size:
+                magic, version, fields, old_capacity, _, _ = HEADER.unpack(header)
+                valid = (magic, version, fields, old_capacity) == (MAGIC, VERSION, len(FIELDS), capacity)
+            if not valid:
+                # 新文件或格式变化：重新创建
+                f.seek(0)
+                f.truncate(0)
+                f.write(HEADER.pack(MAGIC, VERSION, len(FIELDS), capacity, 0, 0))
+                f.truncate(size)
+                f.flush()
+            self.mm = mmap.mmap(f.fileno(), size)
+        _, _, _, _, self.seq, self.count = HEADER.unpack_from(self.mm, 0)
+        if self.seq % 2:
+            # 上次写入中断：count 在记录写完后才更新，已发布的记录保留，只有第 count 个槽位可能不完整
+            # （同一时间段覆盖时最后一条的各字段均为该时段内的值）；环形已写满时该槽位是最旧的记录，
+            # 以其后一条记录代替
+            if self.count >= capacity > 1:
+                RECORD.pack_into(self.mm, HEADER.size + (self.count % capacity) * RECORD.size,
+                                 *self.record(self.count + 1))
+            self.seq += 1
+            struct.pack_into("<Q", self.mm, SEQ_OFFSET, self.seq)
+        last = self.record(self.count - 1) if self.count else None
+        self.last_bucket = last[0] // step if last else None
+
+
+    # 读取第 index 条记录（按追加顺序）
+    def record(self, index: int):
+        return RECORD.unpack_from(self.mm, HEADER.size + (index % self.capacity) * RECORD.size)
+
+
+    # 写入：同一时间段覆盖最后一条，否则追加
+    def write(self, ts: int, values: tuple):
+        bucket = ts // self.step
+        if self.last_bucket is not None and bucket < self.last_bucket:
+            # 时钟回拨，忽略
+            return False
+        count = self.count if bucket == self.last_bucket else self.count + 1
+        struct.pack_into("<Q", self.mm, SEQ_OFFSET, self.seq + 1)
+        RECORD.pack_into(self.mm, HEADER.size + ((count - 1) % self.capacity) * RECORD.size,
+                         bucket * self.step, *values)
+        self.seq += 2
+        self.count = count
+        struct.pack_into("<QQ", self.mm, SEQ_OFFSET, self.seq, self.count)
+        self.last_bucket = bucket
+        return True
+
+
+    # 关闭
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+
+
+# 时间序列写入端（服务端）
+class StatsSeries:
+    def __init__(self, data_dir: Path, tiers: dict = None):
+        self.tiers = {
+            name: TierWriter(tier_file(data_dir, name), step, capacity)
+            for name, (step, capacity) in (tiers or TIERS).items()
+        }
+        self._lock = threading.Lock()
+        # 各字段最新值（部分字段更新时其余字段沿用，None 表示尚未取得）
+        self.latest = dict.fromkeys(FIELDS)
+        for writer in self.tiers.values():
+            if writer.count:
+                self.latest = dict(zip(FIELDS, writer.record(writer.count - 1)[1:]))
+                break
+        self.writes = 0
+
+
+    # 记录数据（可只传部分字段），尚有字段未取得过、或值未变化且仍在同一分钟内时跳过
+    def record(self, timestamp: float = None, **values):
+        ts = int(time.time() if timestamp is None else timestamp)
+        with self._lock:
+            latest = dict(self.latest, **{key: int(value) for key, value in values.items() if key in self.latest})
+            minute = self.tiers.get("minute")
+            if latest == self.latest and minute is not None and minute.last_bucket == ts // minute.step:
+                return False
+            self.latest = latest
+            if None in latest.values():
+                return False
+            row = tuple(latest[field] for field in FIELDS)
+            for writer in self.tiers.values():
+                writer.write(ts, row)
+            self.writes += 1
+            return True
+
+
+    # 落盘
+    def flush(self):
+        with self._lock:
+            for writer in self.tiers.values():
+                writer.mm.flush()
+
+
+    # 关闭
+    def close(self):
+        with self._lock:
+            for writer in self.tiers.values():
+                writer.close()
+            self.tiers = {}
+
+
+    # 统计信息
+    def stats(self):
+        return {name: min(writer.count, writer.capacity) for name, writer in self.tiers.items()}
+
+
+# NumPy 结构化记录类型
+def record_dtype():
+    import numpy as np
+    return np.dtype([("ts", "<i8")] + [(field, "<i8") for field in FIELDS])
+
+
+# 读取某一精度的全部记录（按时间升序的 NumPy 结构化数组），文件不存在时返回空数组
+def read_tier(data_dir: Path, tier: str):
+    import numpy as np
+    dtype = record_dtype()
+    path = tier_file(data_dir, tier)
+    records = None
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return np.empty(0, dtype=dtype)
+    try:
+        magic, version, fields, capacity, _, _ = HEADER.unpack_from(mm, 0)
+        if (magic, version, fields) != (MAGIC, VERSION, len(FIELDS)):
+            return np.empty(0, dtype=dtype)
+        records = np.frombuffer(mm, dtype=dtype, count=capacity, offset=HEADER.size)
+        for _ in range(READ_RETRIES):
+            seq1, count = struct.unpack_from("<QQ", mm, SEQ_OFFSET)
+            if seq1 % 2:
+                time.sleep(0)
+                continue
+            # 环形缓冲区：最旧的记录位于 count % capacity
+            if count <= capacity:
+                result = records[:count].copy()
+            else:
+                start = count % capacity
+                result = np.concatenate((records[start:], records[:start]))
+            if struct.unpack_from("<Q", mm, SEQ_OFFSET)[0] == seq1:
+                return result
+        raise TimeoutError("时间序列读取超时")
+    finally:
+        del records
+        mm.close()
+
+
+# 按时间范围切片（ts 升序，二分查找）
+def slice_range(records, start: float = None, end: float = None):
+    import numpy as np
+    ts = records["ts"]
+    lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+    hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+    return records[lo:hi]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 带过期时间的 LRU 缓存
+
+容量满时淘汰最久未使用的条目，超过 ttl 秒的条目视为过期；线程安全。
+"""
+
+import time, threading
+from collections import OrderedDict
+
+
+# LRU + TTL 缓存
+class TTLCache:
+    def __init__(self, maxsize: int = 2048, ttl: float = 3600):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        # key -> (过期时间, 值)
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    # 读取，未命中或已过期返回 default
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expire, value = item
+            if expire < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    # 写入
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+
+    # 调整容量与过期时间
+    def configure(self, maxsize: int = None, ttl: float = None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = max(1, maxsize)
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+
+    # 是否有未过期的条目（不计入命中统计）
+    def __contains__(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[0] >= time.monotonic()
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+    # 统计信息
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
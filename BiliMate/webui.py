@@ -16,25 +16,25 @@ Date    : 2025-08-26
 Change  : 初版发布
 """
 
-import json, struct, qrcode, time
+import json, qrcode, time
+from html import escape
 from pathlib import Path
-import multiprocessing.shared_memory as shm
 from collections import deque
 from PIL import Image
 from io import BytesIO
+import numpy as np
 import pandas as pd
 import streamlit as st
+from settings_manager import write_json_atomic
+from shm_protocol import ShmReader, EventRingReader, decode_fans
+from history_store import HistoryReader
+from timeseries import FIELDS, read_tier, slice_range
+from profiler import TARGETS, DEFAULT_INTERVAL_MS, list_profiles, request_profile, cancel_profile
+from accounts import AccountPaths, load_accounts, add_account
+from metrics import DEFAULT_PORT, API_SECONDS, API_REQUESTS, STAGE_SECONDS, STAGE_ERRORS, REPLIES, decode_snapshot, summarize, counter_values
 
 
-# 共享内存大小
-SHARED_SIZE = 128 * 1024
-
-# 文件
-DATA_DIR = Path(__file__).parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
-COOKIE_FILE = DATA_DIR / "cookies.json"
-SETTINGS_FILE = DATA_DIR / "settings.json"
-LOG_FILE = DATA_DIR / f"log_BiliMate.txt"
+# 文件（各账号的数据文件见 accounts.AccountPaths）
 LOGO_FILE = Path(__file__).parent / "favicon.ico"
 # 默认设置
 DEFAULT_SETTINGS = {
@@ -57,6 +57,35 @@ DEFAULT_SETTINGS = {
     "login_remember": True,
     "repet_protect_times": 3,
     "interval_seconds": 5,
+    "interval_max_seconds": 60,
+    "fans_interval_seconds": 10,
+    "fans_interval_max_seconds": 300,
+    "poll_backoff": 1.5,
+    "poll_jitter": 0.2,
+    "fans_load_concurrency": 4,
+    "fans_load_rate": 5,
+    "fans_load_retries": 2,
+    "fans_incremental_max_pages": 4,
+    "fans_full_sync_hours": 24,
+    "async_engine": False,
+    "reply_workers": 4,
+    "user_name_lookup": True,
+    "user_cache_size": 2048,
+    "user_cache_ttl": 3600,
+    "log_max_mb": 100,
+    "log_backups": 5,
+    "log_compress": False,
+    "repet_state_size": 10000,
+    "repet_state_idle_hours": 24,
+    "repet_state_persist": True,
+    "send_rate": 1,
+    "send_burst": 3,
+    "send_retries": 3,
+    "send_retry_delay": 2,
+    "api_retry_delay": 1,
+    "api_breaker_threshold": 5,
+    "api_breaker_reset": 60,
+    "checkpoint_interval": 300,
 }
 
 # 状态更新时间
@@ -69,6 +98,17 @@ REPLY_INFO_REFRESH_INTERVAL = 5
 # 显示回复行数
 REPLY_INFO_DISPLAY_LINES = 50
 
+# 回复历史每页条数
+HISTORY_PAGE_SIZE = 20
+
+# 数据趋势：精度 -> (名称, 可选时间范围（秒，None 为全部）)
+TREND_TIERS = {
+    "minute": ("分钟", {"近6小时": 6 * 3600, "近24小时": 86400, "近7天": 7 * 86400}),
+    "hour": ("小时", {"近7天": 7 * 86400, "近30天": 30 * 86400, "近90天": 90 * 86400}),
+    "day": ("天", {"近90天": 90 * 86400, "近1年": 366 * 86400, "全部": None}),
+}
+TREND_FIELDS = dict(zip(FIELDS, ("粉丝量", "播放量", "点赞量", "收藏量")))
+
 
 
 # BiliMate客户端
@@ -98,7 +138,8 @@ class BiliMateWebUI:
             page_title="BiliMate",
             page_icon=LOGO_FILE,
             layout="centered",
-            initial_sidebar_state="collapsed",
+            # 多账号时展开侧边栏（账号切换）
+            initial_sidebar_state="expanded" if len(load_accounts()) > 1 else "collapsed",
             menu_items={}
         )
         st.logo(
@@ -106,11 +147,21 @@ class BiliMateWebUI:
             size="large",
             link="https://github.com/mbaozi/BiliMate"
         )
+        # 账号切换
+        self.account = self.select_account()
+        self.paths = AccountPaths(self.account)
         # 初始化共享内存
         self.timestamp_list = deque(maxlen=5)
         try:
-            self.mem = shm.SharedMemory(name="BiliMate_shm", create=False, size=SHARED_SIZE)
-        except FileNotFoundError:
+            # 每个浏览器会话复用同一个读取端（按账号区分），未变化的分区不重复解码
+            reader_key, event_key = f"shm_reader:{self.account}", f"event_reader:{self.account}"
+            if reader_key not in st.session_state:
+                st.session_state[reader_key] = ShmReader(self.paths.shm_name)
+            self.shm_reader = st.session_state[reader_key]
+            if event_key not in st.session_state:
+                st.session_state[event_key] = EventRingReader(self.paths.shm_name)
+            self.event_reader = st.session_state[event_key]
+        except (FileNotFoundError, ValueError):
             st.error("BiliMate 服务异常")
             st.stop()
         self.reload_shared_mem()
@@ -125,10 +176,27 @@ class BiliMateWebUI:
             self.page_dashboard()
 
 
+    # 侧边栏：账号切换
+    def select_account(self):
+        accounts = load_accounts()
+        with st.sidebar:
+            account = st.selectbox("当前账号", accounts, key="account")
+            with st.expander("添加账号"):
+                name = st.text_input("账号名", key="new_account", help="字母、数字、下划线或短横线，长度 1-16")
+                if st.button("添加", use_container_width=True):
+                    try:
+                        add_account(name.strip())
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.success("已添加：经 app.py 运行时数秒内自动开始托管；单独运行 server.py 时需重启并指定该账号")
+        return account or accounts[0]
+
+
     # 加载设置参数
     def load_settings(self):
         try:
-            settings = json.loads(SETTINGS_FILE.read_text(encoding="utf-8"))
+            settings = json.loads(self.paths.settings_file.read_text(encoding="utf-8"))
         except Exception as e:
             settings = DEFAULT_SETTINGS.copy()
             self.save_settings(settings)
@@ -138,10 +206,8 @@ class BiliMateWebUI:
 
     # 保存设置参数
     def save_settings(self, settings):
-        SETTINGS_FILE.write_text(
-            json.dumps(settings, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        # 原子写入，服务端不会读到写了一半的文件
+        write_json_atomic(self.paths.settings_file, settings, ensure_ascii=False, indent=2)
 
     
     # 确认访问口令
@@ -172,20 +238,22 @@ class BiliMateWebUI:
     @st.fragment(run_every=STATUS_VIEW_REFRESH_INTERVAL)
     def reload_shared_mem(self):
         try:
-            length = struct.unpack('<I', self.mem.buf[:4])[0]
-            payload = bytes(self.mem.buf[4:4+length]).decode()
-            data =  json.loads(payload)
+            reader = self.shm_reader
+            # 主段顺序号未变化时直接复用上次读取结果
+            reader.read_main()
+            data = reader.metrics
+            status = reader.read_decoded("status", lambda payload: json.loads(payload or b"{}"))
             time_stamp = data.get("time_stamp", 0)
             self.timestamp_list.append(time_stamp)
             if len(self.timestamp_list) == 3 and len(set(self.timestamp_list)) == 1:
                 # 时间戳不更新了，服务端可能挂了
                 st.error("BiliMate 服务异常")
                 # st.stop()
-            self.login_status = data.get("login_status", "未登录")
-            self.login_url = data.get("login_url", "")
+            self.login_status = status.get("login_status", "未登录")
+            self.login_url = status.get("login_url", "")
             self.login_time_cnt = data.get("login_time_cnt", 120)
-            self.my_uname = data.get("my_uname", "")
-            self.my_mid = data.get("my_mid", 3546855325567315)
+            self.my_uname = status.get("my_uname", "")
+            self.my_mid = data.get("my_mid") or 3546855325567315
             self.total_fans = data.get("total_fans", 0)
             self.inc_fans = data.get("inc_fans", 0)
             self.total_click = data.get("total_click", 0)
@@ -194,9 +262,15 @@ class BiliMateWebUI:
             self.inc_like = data.get("inc_like", 0)
             self.total_fav = data.get("total_fav", 0)
             self.inc_fav = data.get("inc_fav", 0)
-            self.fans_list = data.get("fans_list", "[]")
-            self.state_info_status = data.get("state_info_status", False)
-            self.reply_info_status = data.get("reply_info_status", False)
+            self.loaded_fans = data.get("loaded_fans", 0)
+            self.state_info_status = bool(data.get("state_info_status", False))
+            self.reply_info_status = bool(data.get("reply_info_status", False))
+            self.reply_stats = status.get("reply_stats", {})
+            self.repeat_guard_stats = status.get("repeat_guard_stats", {})
+            self.poll_intervals = status.get("poll_intervals", {})
+            self.send_stats = status.get("send_stats", {})
+            self.degraded = status.get("degraded", [])
+            self.profile = status.get("profile", {})
         except Exception as e:
             st.toast(f"更新共享内存异常: {e}", icon="⚠️")
 
@@ -246,14 +320,26 @@ class BiliMateWebUI:
             interval_seconds_value = min_value
         elif interval_seconds_value > max_value:
             interval_seconds_value = max_value
-        interval_seconds = st.number_input(
-            label="循环间隔（秒）",
-            min_value=min_value,
-            max_value=max_value,
-            value=interval_seconds_value,
-            step=1,
-            format="%d"
-        )
+        interval_max_seconds_value = min(max(settings.get("interval_max_seconds", 60), interval_seconds_value), 60 * 60)
+        col1, col2 = st.columns(2)
+        with col1:
+            interval_seconds = st.number_input(
+                label="最短轮询间隔（秒，有新消息后）",
+                min_value=min_value,
+                max_value=max_value,
+                value=interval_seconds_value,
+                step=1,
+                format="%d"
+            )
+        with col2:
+            interval_max_seconds = st.number_input(
+                label="最长轮询间隔（秒，持续空闲时）",
+                min_value=min_value,
+                max_value=60 * 60,
+                value=interval_max_seconds_value,
+                step=1,
+                format="%d"
+            )
         col1, col2 = st.columns(2)
         with col1:
             if st.button("💾 保存", use_container_width=True):
@@ -265,6 +351,7 @@ class BiliMateWebUI:
                 settings["token_key"] = token_key
                 settings["repet_protect_times"] = repet_protect_times
                 settings["interval_seconds"] = interval_seconds
+                settings["interval_max_seconds"] = max(interval_seconds, interval_max_seconds)
                 self.save_settings(settings)
                 st.toast("已保存！", icon="✅")
         with col2:
@@ -275,15 +362,148 @@ class BiliMateWebUI:
                 st.rerun()
 
 
+    # 弹窗：回复历史
+    @st.dialog("回复历史", width="large")
+    def dialog_history(self):
+        if not self.paths.history_file.exists():
+            st.info("暂无回复历史")
+            return
+        reader = HistoryReader(self.paths.history_file)
+        try:
+            tab_user, tab_rule = st.tabs(["用户对话", "规则命中"])
+            with tab_user:
+                mid = st.number_input("用户UID（为0时显示全部）", min_value=0, step=1, format="%d", key="history_mid")
+                # 游标分页：记录每页起点 id
+                pages = st.session_state.setdefault(f"history_pages:{self.account}", {}).setdefault(mid, [None])
+                before_id = pages[-1]
+                if mid:
+                    rows = reader.conversations(mid, limit=HISTORY_PAGE_SIZE, before_id=before_id)
+                else:
+                    rows = reader.recent(limit=HISTORY_PAGE_SIZE, before_id=before_id)
+                if rows:
+                    df = pd.DataFrame(rows)
+                    df["ts"] = df["ts"].map(lambda ts: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)))
+                    st.dataframe(
+                        df[["ts", "mid", "role", "rule", "status", "msg", "reply"]].rename(columns={
+                            "ts": "时间", "mid": "UID", "role": "身份", "rule": "命中规则",
+                            "status": "状态", "msg": "消息", "reply": "回复"}),
+                        use_container_width=True, hide_index=True)
+                else:
+                    st.caption("暂无记录")
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    if st.button("⬅️ 上一页", disabled=len(pages) <= 1, use_container_width=True):
+                        pages.pop()
+                        st.rerun(scope="fragment")
+                with col2:
+                    st.caption(f"第 {len(pages)} 页")
+                with col3:
+                    if st.button("下一页 ➡️", disabled=len(rows) < HISTORY_PAGE_SIZE, use_container_width=True):
+                        pages.append(rows[-1]["id"])
+                        st.rerun(scope="fragment")
+            with tab_rule:
+                days = st.selectbox("统计范围", [1, 7, 30], index=1, format_func=lambda x: f"近 {x} 天")
+                hits = reader.rule_hits(days)
+                if hits:
+                    st.dataframe(pd.DataFrame(hits).rename(columns={"rule": "命中规则", "hits": "回复次数"}),
+                                 use_container_width=True, hide_index=True)
+                else:
+                    st.caption("暂无记录")
+        finally:
+            reader.close()
+
+
+    # 弹窗：运行指标
+    @st.dialog("运行指标", width="large")
+    def dialog_metrics(self):
+        snapshot = self.shm_reader.read_decoded("metrics", decode_snapshot)
+        if not snapshot:
+            st.info("暂无指标")
+            return
+
+        # 耗时摘要表（毫秒），errors 为 {标签值: 异常数}
+        def latency_table(name: str, label: str, title: str, errors: dict):
+            rows = summarize(snapshot, name)
+            if not rows:
+                st.caption("暂无记录")
+                return
+            df = pd.DataFrame(rows).sort_values(label)
+            df["errors"] = df[label].map(lambda key: errors.get(key, 0))
+            for col in ("avg", "p50", "p95", "p99"):
+                df[col] = (df[col] * 1000).round(1)
+            st.dataframe(
+                df[[label, "count", "errors", "avg", "p50", "p95", "p99"]].rename(columns={
+                    label: title, "count": "次数", "errors": "异常", "avg": "平均(ms)",
+                    "p50": "P50(ms)", "p95": "P95(ms)", "p99": "P99(ms)"}),
+                use_container_width=True, hide_index=True)
+
+        api_errors = {}
+        for labels, value in counter_values(snapshot, API_REQUESTS):
+            if labels.get("result") != "ok":
+                api_errors[labels["endpoint"]] = api_errors.get(labels["endpoint"], 0) + value
+        stage_errors = {labels["stage"]: value for labels, value in counter_values(snapshot, STAGE_ERRORS)}
+        tab_api, tab_stage, tab_profile = st.tabs(["接口耗时", "阶段耗时", "性能分析"])
+        with tab_api:
+            latency_table(API_SECONDS, "endpoint", "接口", api_errors)
+        with tab_stage:
+            latency_table(STAGE_SECONDS, "stage", "阶段", stage_errors)
+        with tab_profile:
+            self.show_profile()
+        replies = counter_values(snapshot, REPLIES)
+        if replies:
+            st.caption("回复结果：" + " ｜ ".join(f"{labels['status']} {value:.0f}" for labels, value in replies))
+        st.caption(f"分位数按分桶估算；Prometheus 格式指标默认见 http://127.0.0.1:{DEFAULT_PORT}/metrics")
+
+
+    # 性能分析：发起 / 取消分析，下载结果
+    def show_profile(self):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            target = st.selectbox("分析任务", list(TARGETS), format_func=lambda key: TARGETS[key], key="profile_target")
+        with col2:
+            iterations = st.number_input("迭代轮数", min_value=1, max_value=1000, value=10, step=1, key="profile_iterations")
+        with col3:
+            interval_ms = st.number_input("采样间隔(ms)", min_value=1, max_value=100, value=DEFAULT_INTERVAL_MS, step=1,
+                                          key="profile_interval")
+        running = self.profile.get("state") == "running"
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("开始分析", disabled=running, use_container_width=True):
+                request_profile(self.paths.profile_request_file, target, int(iterations), interval_ms)
+                st.toast("已发起性能分析，将在下一轮迭代开始采样", icon="⏱️")
+        with col2:
+            if st.button("取消分析", disabled=not running, use_container_width=True):
+                cancel_profile(self.paths.profile_request_file)
+        if running:
+            st.caption(f"分析中：{TARGETS.get(self.profile.get('target'), '')} "
+                       f"{self.profile.get('done', 0)}/{self.profile.get('iterations', 0)} 轮 ｜ "
+                       f"采样 {self.profile.get('samples', 0)}（更新视频数据每小时一轮）")
+        profiles = list_profiles(self.paths.data_dir)
+        if not profiles:
+            st.caption("暂无分析结果")
+            return
+        for summary, folded in profiles[:5]:
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                st.caption(summary.stem)
+            with col2:
+                st.download_button("摘要", summary.read_bytes(), file_name=summary.name, mime="text/plain",
+                                   key=f"dl_{summary.name}", use_container_width=True)
+            with col3:
+                if folded.exists():
+                    st.download_button("调用栈", folded.read_bytes(), file_name=folded.name, mime="text/plain",
+                                       key=f"dl_{folded.name}", use_container_width=True)
+        with st.expander("最近一次摘要"):
+            st.code(profiles[0][0].read_text(encoding="utf-8"), language=None)
+
+
     # 弹窗：粉丝列表
     @st.dialog("粉丝列表", width="large")
     def dialog_fans(self):
         # st.subheader("粉丝列表")
-        st.caption(f"共 **{len(self.fans_list)}** 位粉丝，此处最多显示100位")
-        if len(self.fans_list) > 100:
-            fans_list_dis = self.fans_list[0:100]
-        else:
-            fans_list_dis = self.fans_list
+        fans_list = self.shm_reader.read_decoded("fans", decode_fans)
+        st.caption(f"共 **{self.loaded_fans}** 位粉丝，此处最多显示100位")
+        fans_list_dis = fans_list[0:100]
         st.html('<hr style="border:none;margin:0.5em 0;height:1px;background:#f0f0f080;">')
         cols = st.columns(5)
         for idx, f in enumerate(fans_list_dis):
@@ -319,29 +539,49 @@ class BiliMateWebUI:
         col4.metric("⭐ 收藏量", f"{self.total_fav:,}", delta=f"{self.inc_fav:+d}")
 
 
+    # 数据趋势图（时间序列整体读取为 NumPy 数组，按时间范围二分切片）
+    def show_trends(self):
+        with st.expander("📈 数据趋势"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                tier = st.selectbox("精度", list(TREND_TIERS), index=1, format_func=lambda key: TREND_TIERS[key][0],
+                                    key="trend_tier")
+            with col2:
+                ranges = TREND_TIERS[tier][1]
+                span = st.selectbox("时间范围", list(ranges), key=f"trend_range_{tier}")
+            with col3:
+                field = st.selectbox("数据", list(TREND_FIELDS), format_func=TREND_FIELDS.get, key="trend_field")
+            try:
+                records = read_tier(self.paths.data_dir, tier)
+            except Exception as e:
+                st.caption(f"读取数据趋势异常：{e}")
+                return
+            seconds = ranges[span]
+            if seconds is not None:
+                records = slice_range(records, start=time.time() - seconds)
+            if len(records) < 2:
+                st.caption("暂无足够数据")
+                return
+            # 向量化换算：本地时间与相邻时段的增量
+            offset = time.localtime().tm_gmtoff
+            index = pd.DatetimeIndex((records["ts"] + offset).astype("datetime64[s]"), name="时间")
+            values = records[field]
+            st.line_chart(pd.DataFrame({TREND_FIELDS[field]: values}, index=index), height=220)
+            st.bar_chart(pd.DataFrame({"增量": np.diff(values)}, index=index[1:]), height=160)
+            st.caption(f"{len(records)} 个数据点 ｜ 区间增量 {int(values[-1] - values[0]):+,}")
+
+
     # 局部：回复显示
     @st.fragment(run_every=REPLY_INFO_REFRESH_INTERVAL)
     def show_reply_info(self):
-        mtime = LOG_FILE.stat().st_mtime if LOG_FILE.exists() else 0
-        if getattr(self, "_last_log_mtime", None) != mtime:
-            self._last_log_mtime = mtime
-            if not LOG_FILE.exists():
-                self._cached_log = "<div>暂无日志文件</div>"
-            else:
-                try:
-                    import os
-                    with open(LOG_FILE, "rb") as f:
-                        f.seek(0, os.SEEK_END)
-                        start = max(0, f.tell() - 64 * 1024)
-                        f.seek(start)
-                        tail_lines = f.readlines()[-50:]
-                    from html import escape
-                    self._cached_log = "<br>".join(
-                        escape(line.decode("utf-8", errors="ignore").rstrip("\r\n"))
-                        for line in tail_lines
-                    ) or "<div>暂无日志内容</div>"
-                except Exception as e:
-                    self._cached_log = f"读取日志失败：{e}"
+        # 仅读取上次之后的新回复事件，无需读取日志文件
+        events = st.session_state.setdefault(f"reply_events:{self.account}", deque(maxlen=REPLY_INFO_DISPLAY_LINES))
+        try:
+            for event in self.event_reader.read_new(limit=REPLY_INFO_DISPLAY_LINES):
+                events.append(self.format_reply_event(event))
+        except Exception as e:
+            st.toast(f"读取回复记录异常: {e}", icon="⚠️")
+        self._cached_log = "<br>".join(events) or "<div>暂无回复记录</div>"
         st.components.v1.html(
             f"""
             <div id="logBox">{self._cached_log}</div>
@@ -361,6 +601,50 @@ class BiliMateWebUI:
         )
 
 
+    # 回复事件格式化（追加时转义一次）
+    @staticmethod
+    def format_reply_event(event: dict):
+        current_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event["timestamp"]))
+        role = {"new_fans": "新粉丝", "fans": "粉丝", "non_fans": "非粉丝"}.get(event["role"], "未知")
+        line = f"[{current_time}] 【{role}】UID:{event['mid']}"
+        if event["msg"]:
+            line += f" 消息：{event['msg']}"
+        line += f" → 回复：{event['reply']}（{event['rule']}）"
+        return escape(line).replace("\n", " ")
+
+
+    # 局部：回复队列显示
+    @st.fragment(run_every=REPLY_INFO_REFRESH_INTERVAL)
+    def show_reply_stats(self):
+        if self.degraded:
+            st.warning(f"部分接口异常，降级运行中：{'、'.join(self.degraded)}", icon="⚠️")
+        stats = self.reply_stats
+        if stats:
+            st.caption(
+                f"待回复：{stats.get('queue_depth', 0)} ｜ 已回复：{stats.get('completed', 0)} ｜ "
+                f"平均耗时：{stats.get('latency_avg', 0):.2f}s ｜ P95：{stats.get('latency_p95', 0):.2f}s"
+            )
+        send = self.send_stats
+        if send:
+            st.caption(
+                f"待发送：{send.get('queue_depth', 0)} ｜ 已发送：{send.get('sent', 0)} ｜ 失败：{send.get('failed', 0)} ｜ "
+                f"重试：{send.get('retried', 0)} ｜ 发送耗时：{send.get('latency_avg', 0):.2f}s ｜ P95：{send.get('latency_p95', 0):.2f}s"
+            )
+        intervals = self.poll_intervals
+        if intervals:
+            sessions = intervals.get("sessions", {})
+            fans = intervals.get("fans", {})
+            st.caption(
+                f"当前轮询间隔：会话 {sessions.get('delay', 0):.1f}s ｜ 粉丝 {fans.get('delay', 0):.1f}s"
+            )
+        guard = self.repeat_guard_stats
+        if guard:
+            st.caption(
+                f"重复保护：{guard.get('size', 0)}/{guard.get('maxsize', 0)} 用户 ｜ 已拦截：{guard.get('blocked', 0)} ｜ "
+                f"淘汰：{guard.get('lru_evictions', 0)}（容量） {guard.get('idle_evictions', 0)}（空闲）"
+            )
+
+
     # 局部：登录状态显示
     @st.fragment(run_every=1)
     def show_login_status(self):
@@ -422,7 +706,7 @@ class BiliMateWebUI:
         with col1:
             st.markdown(f"### 你好，{self.my_uname}")
         with col2:
-            col2_1, col2_2, col2_3, col2_4 = st.columns(4)
+            col2_1, col2_2, col2_3, col2_4, col2_5, col2_6 = st.columns(6)
             with col2_1:
                 st.link_button(
                     label="📺",
@@ -448,6 +732,12 @@ class BiliMateWebUI:
                 if st.button("👥", key="open_fans", help="粉丝列表", use_container_width=True):
                     self.dialog_fans()
             with col2_4:
+                if st.button("📜", key="open_history", help="回复历史", use_container_width=True):
+                    self.dialog_history()
+            with col2_5:
+                if st.button("📈", key="open_metrics", help="运行指标", use_container_width=True):
+                    self.dialog_metrics()
+            with col2_6:
                 if st.button("⚙️", key="open_settings", help="功能设置", use_container_width=True):
                     self.dialog_settings()
 
@@ -458,6 +748,7 @@ class BiliMateWebUI:
         with colb2:
             self.show_state_info_status()
         self.show_state_info()
+        self.show_trends()
 
         st.html('<hr style="border:none;margin:0.5em 0;height:1px;background:#f0f0f080;">')
         colc1, colc2 = st.columns([6, 1])
@@ -465,6 +756,7 @@ class BiliMateWebUI:
             st.subheader("回复记录")
         with colc2:
             self.show_reply_info_status()
+        self.show_reply_stats()
         self.show_reply_info()
 
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 多账号内存基准测试
+
+在同一进程内创建 N 个账号的服务端（不登录、不发请求），每个账号填充粉丝索引与重复保护状态，
+统计每个账号增加的 Python 堆内存（tracemalloc）、进程常驻内存（RSS）与线程数。
+
+用法：python ./benchmarks/bench_accounts.py [--accounts 10] [--fans 1000] [--users 2000]
+"""
+
+import sys, gc, tempfile, threading, tracemalloc, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from server import BiliMateServer
+
+
+# 进程常驻内存（MB），仅 Linux
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * 4096 / 1024 / 1024
+    except OSError:
+        return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--fans", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    servers = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        gc.collect()
+        tracemalloc.start()
+        base_heap = tracemalloc.get_traced_memory()[0]
+        base_rss = rss_mb()
+        base_threads = threading.active_count()
+        try:
+            for idx in range(args.accounts):
+                server = BiliMateServer(account=f"bench{idx}", data_dir=Path(data_dir))
+                server.fans_list.extend_newest(
+                    {'uname': f"粉丝{n}", 'mid': 10 ** 9 + n} for n in range(args.fans))
+                for n in range(args.users):
+                    server.repeat_guard.check(n, f"回复{n % 7}")
+                servers.append(server)
+            gc.collect()
+            heap = tracemalloc.get_traced_memory()[0] - base_heap
+            rss = rss_mb() - base_rss
+            threads = threading.active_count() - base_threads
+        finally:
+            tracemalloc.stop()
+            for server in servers:
+                server.close()
+                server.shm_writer.close(unlink=True)
+                server.reply_events.close(unlink=True)
+
+    n = max(1, args.accounts)
+    print(f"账号数：{args.accounts}，每账号粉丝：{args.fans}，重复保护用户：{args.users}")
+    print(f"Python 堆：{heap / 1024 / 1024:.2f} MB（每账号 {heap / n / 1024:.0f} KB）")
+    print(f"常驻内存：{rss:.2f} MB（每账号 {rss / n * 1024:.0f} KB，含共享内存段）")
+    print(f"线程数  ：{threads}（每账号 {threads / n:.1f}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 端到端压测
+
+启动本地模拟B站接口（mock_bili_server.py），在临时数据目录中运行一个完整的服务端（真实 BiliApi，
+请求经转发适配器发往模拟接口），按流量规模持续产生私信与新粉丝，统计稳定运行期间的
+回复吞吐（条/秒）、回复耗时分位数（私信产生到收到回复）、各接口调用次数，以及服务端各阶段耗时。
+
+用法：python ./benchmarks/bench_e2e.py [--profile medium] [--duration 60] [--latency-ms 50] [--error-rate 0]
+      [--interval 5] [--send-rate 1] [--send-burst 3] [--reply-workers 4]
+"""
+
+import os, sys, json, time, tempfile, threading, argparse, contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from server import BiliMateServer, DEFAULT_SETTINGS
+from accounts import AccountPaths
+from metrics import API_SECONDS, STAGE_SECONDS, summarize
+from mock_bili_server import PROFILES, MOCK_SESSDATA, MockBili, MockBiliServer, mount_mock, percentile
+
+ACCOUNT = "bench"
+# 登录与初始加载粉丝列表的超时
+READY_TIMEOUT = 300
+
+
+# 写入账号的登录状态与设置
+def prepare_account(data_dir: Path, overrides: dict):
+    paths = AccountPaths(ACCOUNT, data_dir)
+    paths.cookie_file.write_text(json.dumps({"SESSDATA": MOCK_SESSDATA}))
+    paths.settings_file.write_text(json.dumps(dict(DEFAULT_SETTINGS, **overrides), ensure_ascii=False))
+
+
+# 等待服务端完成登录与初始加载
+def wait_ready(server: BiliMateServer, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.thread_auto_reply_msg_status:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+# 打印耗时摘要表
+def print_latency(title: str, rows: list, label: str):
+    if not rows:
+        return
+    print(f"\n{title}")
+    print(f"  {'':<22}{'次数':>8}{'平均(ms)':>12}{'P50(ms)':>11}{'P95(ms)':>11}{'P99(ms)':>11}")
+    for row in sorted(rows, key=lambda r: r[label]):
+        print(f"  {row[label]:<22}{row['count']:>8}{row['avg'] * 1000:>12.1f}"
+              f"{row['p50'] * 1000:>11.1f}{row['p95'] * 1000:>11.1f}{row['p99'] * 1000:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="medium")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--interval", type=float, default=DEFAULT_SETTINGS["interval_seconds"])
+    parser.add_argument("--send-rate", type=float, default=DEFAULT_SETTINGS["send_rate"])
+    parser.add_argument("--send-burst", type=int, default=DEFAULT_SETTINGS["send_burst"])
+    parser.add_argument("--reply-workers", type=int, default=DEFAULT_SETTINGS["reply_workers"])
+    args = parser.parse_args()
+
+    bili = MockBili(latency_ms=args.latency_ms, error_rate=args.error_rate, **PROFILES[args.profile])
+    mock = MockBiliServer(bili).start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        prepare_account(Path(data_dir), {
+            "interval_seconds": args.interval,
+            "send_rate": args.send_rate,
+            "send_burst": args.send_burst,
+            "reply_workers": args.reply_workers,
+        })
+        server = BiliMateServer(account=ACCOUNT, data_dir=Path(data_dir))
+        mount_mock(server.bili_api.session, mock.url)
+        # 服务端日志仅写入临时目录中的日志文件
+        quiet = contextlib.redirect_stdout(open(os.devnull, "w"))
+        quiet.__enter__()
+        try:
+            start = time.monotonic()
+            threading.Thread(target=server.engine, daemon=True, name="BenchServer").start()
+            if not wait_ready(server, READY_TIMEOUT):
+                print("服务端启动超时", bili.stats())
+                return
+            ready = time.monotonic() - start
+            # 仅统计稳定运行期间
+            before = bili.stats()
+            latency_start = len(bili.reply_latency)
+            time.sleep(args.duration)
+            after = bili.stats()
+            latency = sorted(bili.reply_latency[latency_start:])
+            snapshot = server.metrics.snapshot()
+        finally:
+            server.thread_auto_reply_msg_status = False
+            server.thread_update_video_data_status = False
+            server.close()
+            server.shm_writer.close(unlink=True)
+            server.reply_events.close(unlink=True)
+            mock.close()
+            quiet.__exit__(None, None, None)
+
+    replies = after["replies"] - before["replies"]
+    dms = after["dms"] - before["dms"]
+    print(f"流量规模：{args.profile} {PROFILES[args.profile]}，接口延迟 {args.latency_ms:.0f}ms，错误率 {args.error_rate:.0%}")
+    print(f"设置：轮询间隔 {args.interval}s，发送速率 {args.send_rate}/s（突发 {args.send_burst}），回复线程 {args.reply_workers}")
+    print(f"启动耗时：{ready:.2f}s（登录 + 加载 {PROFILES[args.profile]['fans']} 粉丝）")
+    print(f"统计时长：{args.duration:.0f}s，新私信：{dms}，回复：{replies}，其它发送：{after['other_sends'] - before['other_sends']}，"
+          f"待回复：{after['pending']}")
+    print(f"回复吞吐：{replies / args.duration:.2f} 条/秒（私信到达 {dms / args.duration:.2f} 条/秒）")
+    print(f"回复耗时：P50 {percentile(latency, 0.5):.2f}s ｜ P95 {percentile(latency, 0.95):.2f}s ｜ "
+          f"P99 {percentile(latency, 0.99):.2f}s")
+    print("\n接口调用次数（统计期间）：")
+    for name, count in sorted(after["calls"].items()):
+        calls = count - before["calls"].get(name, 0)
+        errors = after["errors"].get(name, 0) - before["errors"].get(name, 0)
+        print(f"  {name:<22}{calls:>8}" + (f"（错误 {errors}）" if errors else ""))
+    if after["unknown_paths"]:
+        print(f"\n未模拟的接口路径：{after['unknown_paths']}")
+    print_latency("服务端接口耗时（全程）：", summarize(snapshot, API_SECONDS), "endpoint")
+    print_latency("服务端阶段耗时（全程）：", summarize(snapshot, STAGE_SECONDS), "stage")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 粉丝索引基准测试
+
+按粉丝规模分别在子进程中构建粉丝索引（分页流式写入 mid 数组与昵称库），统计：
+构建耗时、常驻内存增量（RSS）与构建期间峰值、成员判断耗时（命中 / 未命中）、昵称查询耗时；
+并与原先的 mid -> 记录字典（FansRegistry）对比内存占用与成员判断耗时。
+
+用法：python ./benchmarks/bench_fans_index.py [--sizes 10000,100000,1000000] [--lookups 200000]
+"""
+
+import sys, json, time, random, resource, tempfile, subprocess, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from fan_index import FanIndex, FanNames
+from fans_registry import FansRegistry
+
+PAGE_SIZE = 50
+MID_BASE = 10 ** 9
+MID_MULTIPLIER = 0x9E3779B97F4B
+
+
+# 进程常驻内存（MB），仅 Linux
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * 4096 / 1024 / 1024
+    except OSError:
+        return 0.0
+
+
+# 进程峰值常驻内存（MB）
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+# 模拟接口分页（从新到旧），mid 互不相同且无序（奇数乘数在 2^40 内为一一映射），均为偶数
+def make_pages(size: int):
+    for start in range(0, size, PAGE_SIZE):
+        yield [{'uname': f"粉丝{n}", 'mid': MID_BASE + (n * MID_MULTIPLIER % (1 << 40)) * 2}
+               for n in range(start, min(size, start + PAGE_SIZE))]
+
+
+# 平均单次成员判断耗时（微秒）
+def lookup_us(container, mids):
+    start = time.perf_counter()
+    for mid in mids:
+        mid in container
+    return (time.perf_counter() - start) / len(mids) * 1e6
+
+
+# 单个规模（子进程中运行）
+def run_size(size: int, lookups: int, kind: str):
+    base = rss_mb()
+    start = time.perf_counter()
+    result = {"size": size, "kind": kind}
+    with tempfile.TemporaryDirectory() as data_dir:
+        if kind == "index":
+            names = FanNames(Path(data_dir) / "fan_names.db")
+            container = FanIndex.from_pages(make_pages(size), names)
+        else:
+            names = None
+            container = FansRegistry()
+            for page in make_pages(size):
+                container.extend_newest(page)
+        result["build_s"] = time.perf_counter() - start
+        result["rss_mb"] = rss_mb() - base
+        result["peak_mb"] = peak_rss_mb() - base
+        rng = random.Random(1)
+        order = container.newest_mids(size) if kind == "index" else [f['mid'] for f in container.newest(size)]
+        hits = [order[rng.randrange(size)] for _ in range(lookups)]
+        misses = [mid + 1 for mid in hits]
+        result["hit_us"] = lookup_us(container, hits)
+        result["miss_us"] = lookup_us(container, misses)
+        if names is not None:
+            sample = hits[:2000]
+            start = time.perf_counter()
+            for mid in sample:
+                container.get(mid)
+            result["name_us"] = (time.perf_counter() - start) / len(sample) * 1e6
+            # 含 WAL 文件
+            result["names_db_mb"] = sum(path.stat().st_size for path in Path(data_dir).glob("fan_names.db*")) / 1024 / 1024
+            result["index_mb"] = container.nbytes() / 1024 / 1024
+            names.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_size(int(args.run[0]), args.lookups, args.run[1])))
+        return
+
+    print(f"{'粉丝数':>10}{'结构':>10}{'构建(s)':>10}{'RSS(MB)':>10}{'峰值(MB)':>10}"
+          f"{'命中(us)':>10}{'未命中(us)':>12}{'昵称(us)':>10}{'昵称库(MB)':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for kind in ("index", "dict"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", str(size), kind, "--lookups", str(args.lookups)],
+                capture_output=True, text=True, check=True).stdout
+            r = json.loads(output)
+            name_us = f"{r['name_us']:.1f}" if "name_us" in r else "-"
+            db_mb = f"{r['names_db_mb']:.1f}" if "names_db_mb" in r else "-"
+            print(f"{size:>10}{kind:>10}{r['build_s']:>10.2f}{r['rss_mb']:>10.1f}{r['peak_mb']:>10.1f}"
+                  f"{r['hit_us']:>10.2f}{r['miss_us']:>12.2f}{name_us:>10}{db_mb:>12}")
+
+
+if __name__ == "__main__":
+    main()
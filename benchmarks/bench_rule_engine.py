@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 关键词匹配基准测试
+
+对比 原逐条扫描（k in message_lower） 与 Aho-Corasick 编译索引 的匹配耗时。
+
+用法：python ./benchmarks/bench_rule_engine.py [--rules 5000] [--messages 2000]
+"""
+
+import sys, time, random, argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from rule_engine import KeywordMatcher
+
+CHARS = "abcdefghijklmnopqrstuvwxyz你好谢关注视频教程资源链接怎么下载哪里"
+
+
+# 随机字符串
+def random_text(rng: random.Random, min_len: int, max_len: int):
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(min_len, max_len)))
+
+
+# 原逐条扫描
+def linear_scan(keyword_dict: dict, message_lower: str):
+    return next((k for k in keyword_dict if k in message_lower), None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keyword_dict = {random_text(rng, 3, 8): f"回复{i}" for i in range(args.rules)}
+    keywords = list(keyword_dict)
+    messages = []
+    for _ in range(args.messages):
+        msg = random_text(rng, 5, 60)
+        # 一半消息嵌入一个已有关键词
+        if rng.random() < 0.5:
+            pos = rng.randint(0, len(msg))
+            msg = msg[:pos] + rng.choice(keywords) + msg[pos:]
+        messages.append(msg)
+
+    t0 = time.perf_counter()
+    matcher = KeywordMatcher(keyword_dict)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    expected = [linear_scan(keyword_dict, m) for m in messages]
+    t_linear = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    actual = [matcher.find(m) for m in messages]
+    t_matcher = time.perf_counter() - t0
+
+    if expected != actual:
+        diff = sum(1 for a, b in zip(expected, actual) if a != b)
+        print(f"匹配结果不一致：{diff} 条")
+        sys.exit(1)
+
+    hits = sum(1 for e in expected if e is not None)
+    print(f"规则数：{args.rules}，消息数：{args.messages}，命中：{hits}")
+    print(f"编译耗时：{t_build * 1000:.1f} ms")
+    print(f"逐条扫描：{t_linear * 1000:.1f} ms（{t_linear / args.messages * 1e6:.1f} us/条）")
+    print(f"自动机  ：{t_matcher * 1000:.1f} ms（{t_matcher / args.messages * 1e6:.1f} us/条）")
+    print(f"加速比  ：{t_linear / t_matcher:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
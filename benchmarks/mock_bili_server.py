@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 本地模拟B站接口
+
+在本地 HTTP 端口模拟 BiliApi 用到的接口：扫码登录、账号信息、关系状态、粉丝列表、
+新粉丝数、会话列表、用户名片、发送私信与视频数据。返回结构与B站接口一致（code/message/data）。
+可配置接口延迟、错误率与流量规模（粉丝数、每分钟私信数、每分钟新粉丝数），
+私信与新粉丝按流逝时间惰性生成，并记录每条私信从产生到收到回复的耗时。
+
+BiliApi 的会话通过 MockRedirectAdapter 把 *.bilibili.com 的请求转发到本地端口，无需修改 BiliApi。
+接口路径集中在 ROUTES 中，BiliApi 使用的路径不同时只需修改此处（未匹配的路径会计入 unknown_paths）。
+
+用法：python ./benchmarks/mock_bili_server.py [--profile medium] [--port 8800]
+"""
+
+import json, time, random, threading, argparse
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 流量规模
+PROFILES = {
+    "small": dict(fans=1000, dm_per_minute=60, new_fans_per_minute=2, talkers=500),
+    "medium": dict(fans=10000, dm_per_minute=500, new_fans_per_minute=10, talkers=5000),
+    "large": dict(fans=100000, dm_per_minute=3000, new_fans_per_minute=60, talkers=50000),
+}
+
+# 私信内容（含默认回复规则的关键词）
+MESSAGES = ("你好", "hello", "你好呀，up主", "在吗", "求更新", "hello world", "催更", "[doge]")
+
+# 接口路径 -> 处理方法
+ROUTES = {
+    "/x/passport-login/web/qrcode/generate": "qrcode_generate",
+    "/x/passport-login/web/qrcode/poll": "qrcode_poll",
+    "/x/web-interface/nav": "nav",
+    "/x/relation/stat": "relation_stat",
+    "/x/relation/fans": "fans",
+    "/x/relation/followers/unread/count": "fans_unread",
+    "/session_svr/v1/session_svr/get_sessions": "get_sessions",
+    "/x/web-interface/card": "card",
+    "/web_im/v1/web_im/send_msg": "send_msg",
+    "/x/web/index/stat": "video_stat",
+}
+
+# 会话列表每页数量
+SESSION_PAGE_SIZE = 20
+# 扫码登录：轮询几次后视为已确认
+QRCODE_CONFIRM_POLLS = 3
+MOCK_SESSDATA = "mock_sessdata"
+
+
+# 分位数（已排序列表）
+def percentile(values, q: float):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+# 成功响应
+def ok(data):
+    return {"code": 0, "message": "0", "ttl": 1, "data": data}
+
+
+# 模拟B站接口的状态与流量
+class MockBili:
+    def __init__(self, fans: int = 10000, dm_per_minute: float = 500, new_fans_per_minute: float = 10,
+                 talkers: int = 5000, fan_ratio: float = 0.5, latency_ms: float = 50, latency_jitter: float = 0.5,
+                 error_rate: float = 0.0, error_code: int = -412, endpoint_errors: dict = None,
+                 my_mid: int = 10001, seed: int = 0):
+        self.my_mid = my_mid
+        self.dm_rate = dm_per_minute / 60
+        self.new_fans_rate = new_fans_per_minute / 60
+        self.fan_ratio = fan_ratio
+        self.latency = latency_ms / 1000
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        # 按接口单独设置的错误率，如 {"send_msg": 0.1}
+        self.endpoint_errors = dict(endpoint_errors or {})
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 粉丝 mid 按关注先后排列（末尾最新）
+        self.fans = [10 ** 8 + n for n in range(fans)]
+        self.next_fan = 10 ** 8 + fans
+        self.new_fans = 0
+        self.new_fans_access_ts = int(time.time())
+        self.non_fans = [5 * 10 ** 8 + n for n in range(talkers)]
+        # 会话：talker -> [session_ts(微秒), seqno, unread_count, content, 最早未回复私信的产生时间]
+        self.sessions: dict[int, list] = {}
+        self.seqno = 0
+        self.qrcode_polls: dict[str, int] = {}
+        self._last = time.monotonic()
+        self._dm_credit = 0.0
+        self._fan_credit = 0.0
+        # 统计
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.unknown_paths: dict[str, int] = {}
+        self.dms = 0
+        self.replies = 0
+        self.other_sends = 0
+        self.reply_latency: list[float] = []
+        self.started = time.time()
+
+
+    # 按流逝时间生成私信与新粉丝
+    def advance(self):
+        now = time.monotonic()
+        elapsed, self._last = now - self._last, now
+        self._fan_credit += elapsed * self.new_fans_rate
+        while self._fan_credit >= 1:
+            self._fan_credit -= 1
+            self.fans.append(self.next_fan)
+            self.next_fan += 1
+            self.new_fans += 1
+        self._dm_credit += elapsed * self.dm_rate
+        created = time.time()
+        while self._dm_credit >= 1:
+            self._dm_credit -= 1
+            pool = self.fans if self.random.random() < self.fan_ratio else self.non_fans
+            talker = pool[self.random.randrange(len(pool))]
+            self.seqno += 1
+            session = self.sessions.get(talker)
+            if session is None:
+                session = self.sessions[talker] = [0, 0, 0, "", None]
+            session[0] = time.time_ns() // 1000
+            session[1] = self.seqno
+            session[2] += 1
+            session[3] = self.random.choice(MESSAGES)
+            if session[4] is None:
+                session[4] = created
+            self.dms += 1
+
+
+    # 用户昵称
+    @staticmethod
+    def uname(mid: int):
+        return f"模拟用户{mid}"
+
+
+    # 模拟延迟与错误，返回错误响应或 None
+    def before_call(self, name: str):
+        if self.latency > 0:
+            jitter = self.latency * self.latency_jitter
+            time.sleep(max(0.0, self.random.uniform(self.latency - jitter, self.latency + jitter)))
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self.random.random() < self.endpoint_errors.get(name, self.error_rate):
+                self.errors[name] = self.errors.get(name, 0) + 1
+                return {"code": self.error_code, "message": "请求过于频繁，请稍后再试", "ttl": 1}
+        return None
+
+
+    # 处理请求，返回 (响应, 额外响应头)
+    def handle(self, path: str, params: dict, cookies: str):
+        name = ROUTES.get(path)
+        if name is None:
+            with self._lock:
+                self.unknown_paths[path] = self.unknown_paths.get(path, 0) + 1
+            return {"code": -404, "message": "啥都木有", "ttl": 1}, []
+        error = self.before_call(name)
+        if error is not None:
+            return error, []
+        with self._lock:
+            self.advance()
+            return getattr(self, "api_" + name)(params, cookies)
+
+
+    # 扫码登录：生成二维码
+    def api_qrcode_generate(self, params, cookies):
+        key = f"{self.random.getrandbits(64):016x}"
+        self.qrcode_polls[key] = 0
+        return ok({"url": f"https://account.bilibili.com/h5/account-h5/auth/scan-web?qrcode_key={key}",
+                   "qrcode_key": key}), []
+
+
+    # 扫码登录：轮询结果（86101 未扫码，86090 已扫码未确认，0 成功）
+    def api_qrcode_poll(self, params, cookies):
+        key = params.get("qrcode_key", "")
+        if key not in self.qrcode_polls:
+            return ok({"code": 86038, "message": "二维码已失效", "url": ""}), []
+        self.qrcode_polls[key] += 1
+        polls = self.qrcode_polls[key]
+        if polls < QRCODE_CONFIRM_POLLS - 1:
+            return ok({"code": 86101, "message": "未扫码", "url": ""}), []
+        if polls < QRCODE_CONFIRM_POLLS:
+            return ok({"code": 86090, "message": "二维码已扫码未确认", "url": ""}), []
+        del self.qrcode_polls[key]
+        headers = [
+            ("Set-Cookie", f"SESSDATA={MOCK_SESSDATA}; Domain=.bilibili.com; Path=/"),
+            ("Set-Cookie", "bili_jct=mock_csrf; Domain=.bilibili.com; Path=/"),
+            ("Set-Cookie", f"DedeUserID={self.my_mid}; Domain=.bilibili.com; Path=/"),
+        ]
+        return ok({"code": 0, "message": "", "url": "https://passport.biligame.com/crossDomain",
+                   "refresh_token": "mock_refresh"}), headers
+
+
+    # 账号信息
+    def api_nav(self, params, cookies):
+        if "SESSDATA=" not in cookies:
+            return {"code": -101, "message": "账号未登录", "ttl": 1, "data": {"isLogin": False}}, []
+        return ok({"isLogin": True, "mid": self.my_mid, "uname": "模拟UP主"}), []
+
+
+    # 关系状态
+    def api_relation_stat(self, params, cookies):
+        return ok({"mid": self.my_mid, "following": 0, "whisper": 0, "black": 0, "follower": len(self.fans)}), []
+
+
+    # 粉丝列表（按关注时间倒序分页）
+    def api_fans(self, params, cookies):
+        page = max(1, int(params.get("pn", 1)))
+        size = max(1, int(params.get("ps", 50)))
+        if params.get("last_access_ts"):
+            # 查看新粉丝后清零新粉丝数
+            self.new_fans = 0
+            self.new_fans_access_ts = int(time.time())
+        end = len(self.fans) - (page - 1) * size
+        mids = self.fans[max(0, end - size):max(0, end)][::-1]
+        return ok({
+            "list": [{"mid": mid, "uname": self.uname(mid), "mtime": 0, "attribute": 0} for mid in mids],
+            "total": len(self.fans),
+        }), []
+
+
+    # 新粉丝数
+    def api_fans_unread(self, params, cookies):
+        return ok({"count": self.new_fans, "time": self.new_fans_access_ts}), []
+
+
+    # 会话列表（session_ts 在 (begin_ts, end_ts] 内，按时间倒序分页）
+    def api_get_sessions(self, params, cookies):
+        begin_ts = int(params.get("begin_ts") or 0)
+        end_ts = int(params.get("end_ts") or 0) or time.time_ns() // 1000
+        matched = sorted(
+            ((session[0], talker) for talker, session in self.sessions.items() if begin_ts < session[0] <= end_ts),
+            reverse=True,
+        )
+        session_list = []
+        for session_ts, talker in matched[:SESSION_PAGE_SIZE]:
+            _, seqno, unread, content, _ = self.sessions[talker]
+            session_list.append({
+                "talker_id": talker,
+                "session_type": 1,
+                "session_ts": session_ts,
+                "unread_count": unread,
+                "last_msg": {
+                    "sender_uid": talker,
+                    "receiver_id": self.my_mid,
+                    "msg_type": 1,
+                    "msg_seqno": seqno,
+                    "timestamp": session_ts // 1_000_000,
+                    "content": json.dumps({"content": content}, ensure_ascii=False),
+                },
+            })
+        return ok({"session_list": session_list, "has_more": int(len(matched) > SESSION_PAGE_SIZE)}), []
+
+
+    # 用户名片
+    def api_card(self, params, cookies):
+        mid = int(params.get("mid", 0))
+        return ok({"card": {"mid": str(mid), "name": self.uname(mid)}, "follower": 0}), []
+
+
+    # 发送私信：记录私信产生到收到回复的耗时
+    def api_send_msg(self, params, cookies):
+        receiver = int(params.get("msg[receiver_id]") or params.get("receiver_id") or 0)
+        session = self.sessions.get(receiver)
+        if session is not None and session[4] is not None:
+            self.reply_latency.append(time.time() - session[4])
+            self.replies += 1
+            session[2] = 0
+            session[4] = None
+        else:
+            # 新粉丝欢迎语等
+            self.other_sends += 1
+        return ok({"msg_key": self.random.getrandbits(63), "msg_content": params.get("msg[content]", "")}), []
+
+
+    # 视频数据
+    def api_video_stat(self, params, cookies):
+        return ok({
+            "total_fans": len(self.fans), "incr_fans": self.new_fans,
+            "total_click": 123456, "incr_click": 321,
+            "total_like": 2345, "inc_like": 12,
+            "total_fav": 678, "inc_fav": 3,
+        }), []
+
+
+    # 统计信息
+    def stats(self):
+        with self._lock:
+            latency = sorted(self.reply_latency)
+            return {
+                "elapsed": time.time() - self.started,
+                "dms": self.dms,
+                "replies": self.replies,
+                "other_sends": self.other_sends,
+                "pending": sum(1 for session in self.sessions.values() if session[4] is not None),
+                "reply_latency_p50": percentile(latency, 0.5),
+                "reply_latency_p95": percentile(latency, 0.95),
+                "reply_latency_p99": percentile(latency, 0.99),
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "unknown_paths": dict(self.unknown_paths),
+            }
+
+
+# 本地 HTTP 服务
+class MockBiliServer:
+    def __init__(self, bili: MockBili, port: int = 0, host: str = "127.0.0.1"):
+        self.bili = bili
+        self.host = host
+        self.port = port
+        self._httpd = None
+
+
+    # 在后台线程中启动
+    def start(self):
+        bili = self.bili
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def respond(self, params: dict):
+                path = urlsplit(self.path).path
+                body, headers = bili.handle(path, params, self.headers.get("Cookie", ""))
+                payload = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query)
+                self.respond({key: values[-1] for key, values in query.items()})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length).decode("utf-8", "replace")
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(raw or "{}")
+                else:
+                    params = {key: values[-1] for key, values in parse_qs(raw).items()}
+                query = parse_qs(urlsplit(self.path).query)
+                params.update({key: values[-1] for key, values in query.items()})
+                self.respond(params)
+
+            # 不输出访问日志
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="MockBili").start()
+        return self
+
+
+    # 本地地址
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+
+    # 停止
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+# 把 *.bilibili.com 的请求转发到本地模拟服务（requests 传输适配器）
+def mock_redirect_adapter(base_url: str):
+    from requests.adapters import HTTPAdapter
+
+    class MockRedirectAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            if parts.hostname and parts.hostname.endswith("bilibili.com"):
+                # 复制请求，cookies 仍按原域名由会话管理
+                request = request.copy()
+                request.url = base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+                request.headers["X-Mock-Host"] = parts.hostname
+            return super().send(request, **kwargs)
+
+    return MockRedirectAdapter()
+
+
+# 将会话的请求转发到本地模拟服务
+def mount_mock(session, base_url: str):
+    adapter = mock_redirect_adapter(base_url)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟B站接口")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="medium")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    bili = MockBili(latency_ms=args.latency_ms, error_rate=args.error_rate, **PROFILES[args.profile])
+    server = MockBiliServer(bili, args.port).start()
+    print(f"模拟B站接口已启动：{server.url}（{args.profile}：{PROFILES[args.profile]}）")
+    try:
+        while True:
+            time.sleep(10)
+            stats = bili.stats()
+            print(f"私信 {stats['dms']} ｜ 已回复 {stats['replies']} ｜ 待回复 {stats['pending']} ｜ "
+                  f"回复耗时 P50 {stats['reply_latency_p50']:.2f}s P95 {stats['reply_latency_p95']:.2f}s")
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – asyncio 引擎测试
+"""
+
+import sys, asyncio, threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from async_engine import BiliMateAsyncEngine, PeriodicTask
+
+
+# 仅记录调用顺序的服务端
+class FakeServer:
+    def __init__(self):
+        self.events = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fans_reload_thread = None
+
+
+    def poll_sessions(self):
+        self.started.set()
+        self.release.wait(5)
+        self.events.append("poll_done")
+
+
+    def update_shared_mem(self):
+        self.events.append("shm")
+
+
+    def log_print(self, msg):
+        pass
+
+
+    def close(self):
+        self.events.append("close")
+
+
+# 退出时轮询仍在线程中阻塞：等待其结束后才关闭
+def test_shutdown_waits_for_blocked_poll():
+    server = FakeServer()
+    engine = BiliMateAsyncEngine(server)
+
+    async def main():
+        engine.stop_evt = asyncio.Event()
+        engine.start_periodic(PeriodicTask("会话轮询", server.poll_sessions, 60, log=server.log_print))
+        await asyncio.get_running_loop().run_in_executor(None, server.started.wait, 5)
+        asyncio.get_running_loop().call_later(0.2, server.release.set)
+        await engine.shutdown()
+
+    asyncio.run(main())
+    assert server.events == ["poll_done", "shm", "close"]
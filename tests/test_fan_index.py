@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 粉丝索引测试
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+import fan_index
+from fan_index import FanIndex
+
+
+def fan(mid):
+    return {'uname': f"粉丝{mid}", 'mid': mid}
+
+
+# 末尾范围之外的取消关注与重新关注：只标记失效，查询与快照结果与逐个删除一致
+def test_stale_order_outside_tail(monkeypatch):
+    monkeypatch.setattr(fan_index, "TAIL_SCAN", 4)
+    index = FanIndex(range(1, 21))
+    index.remove(2)
+    index.add(fan(3))
+    index.remove(19)
+    index.add(fan(2))
+    expected = [m for m in range(1, 21) if m not in (2, 3, 19)] + [3, 2]
+    assert len(index) == 19
+    assert 19 not in index and 2 in index
+    assert list(index.newest_mids(3)) == [2, 3, 20]
+    assert list(index.order()) == expected
+    assert list(index.newest_mids(100)) == expected[::-1]
+
+
+# 失效记录超过阈值时自动压缩
+def test_compact_after_threshold(monkeypatch):
+    monkeypatch.setattr(fan_index, "TAIL_SCAN", 1)
+    monkeypatch.setattr(fan_index, "COMPACT_THRESHOLD", 2)
+    index = FanIndex(range(1, 11))
+    for mid in (1, 2, 3):
+        index.remove(mid)
+    assert not index._stale
+    assert list(index._order) == list(range(4, 11))
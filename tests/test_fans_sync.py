@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 粉丝列表增量对账测试
+"""
+
+import sys, time, threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from fan_index import FanIndex
+from fans_loader import PagedFansLoader
+
+server = pytest.importorskip("server")
+
+
+# 模拟粉丝列表接口（fans 从新到旧），记录拉取的页码
+class FakeFansApi:
+    def __init__(self, fans):
+        self.fans = fans
+        self.pages = []
+
+
+    def get_fans_detail(self, page=1, num=50, last_access_ts=0):
+        self.pages.append(page)
+        return {'list': self.fans[(page - 1) * num:page * num]}
+
+
+# 仅含 update_fans_list 所需属性的服务端
+def make_server(api, fans_list, max_pages=4):
+    logs = []
+    stub = SimpleNamespace(
+        fans_reload_thread=None,
+        fans_full_sync_time=time.time(),
+        fans_full_sync_hours=24,
+        fans_incremental_max_pages=max_pages,
+        fans_list=fans_list,
+        fans_lock=threading.Lock(),
+        fans_reload_added=None,
+        fan_names=SimpleNamespace(put_many=lambda fans: None, prune=lambda keep: 0),
+        fans_sync_stats={"full_syncs": 0, "incremental_syncs": 0, "pages_fetched": 0, "pages_saved": 0,
+                         "last_pages_saved": 0, "unplaced": 0},
+        get_fans_num=lambda: len(api.fans),
+        fans_loader=lambda: PagedFansLoader(api, rate=0),
+        load_fans_tail=lambda loader, fans_list, total: 0,
+        log_print=logs.append,
+        logs=logs,
+    )
+    stub.reload_fans_background = lambda: pytest.fail("增量对账不应触发全量加载")
+    return stub
+
+
+def fans(mids):
+    return [{'uname': f"u{mid}", 'mid': mid} for mid in mids]
+
+
+# 较早的粉丝取消关注：只拉取 max_pages 页，不触发全量加载，差异记为未定位
+def test_old_unfollow_fetches_only_max_pages():
+    remote = fans(range(1200, 0, -1))
+    fans_list = FanIndex.from_pages([remote])
+    api = FakeFansApi([f for f in remote if f['mid'] != 5])
+    stub = make_server(api, fans_list, max_pages=4)
+
+    server.BiliMateServer.update_fans_list(stub)
+    assert api.pages == [1, 2, 3, 4]
+    assert stub.fans_sync_stats["unplaced"] == -1
+    assert len(fans_list) == 1200
+
+    # 差异已记录，之后的轮询不再重复拉取
+    api.pages.clear()
+    server.BiliMateServer.update_fans_list(stub)
+    assert api.pages == []
+
+
+# 最新的粉丝取消关注：增量对齐
+def test_recent_unfollow_reconciles():
+    remote = fans(range(1200, 0, -1))
+    fans_list = FanIndex.from_pages([remote])
+    api = FakeFansApi([f for f in remote if f['mid'] != 1190])
+    stub = make_server(api, fans_list)
+
+    server.BiliMateServer.update_fans_list(stub)
+    assert api.pages == [1]
+    assert 1190 not in fans_list and len(fans_list) == 1199
+    assert stub.fans_sync_stats["unplaced"] == 0
+
+
+# 全量加载替换前粉丝轮询新增的粉丝：替换与粉丝轮询互斥，新粉丝合并到新列表
+def test_reload_keeps_fans_added_before_swap():
+    remote = fans(range(100, 0, -1))
+    api = FakeFansApi(remote)
+    stub = make_server(api, FanIndex.from_pages([remote]))
+    stub.fans_lock.acquire()
+    reload = threading.Thread(target=server.BiliMateServer.reload_fans_list, args=(stub,))
+    reload.start()
+    deadline = time.monotonic() + 5
+    while len(api.pages) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    # 模拟粉丝轮询（持有 fans_lock）中的 get_new_fans
+    new_fan = fans([101])
+    stub.fans_list.extend_newest(new_fan)
+    stub.fans_reload_added.append(new_fan)
+    stub.fans_lock.release()
+    reload.join(5)
+    assert stub.fans_list is not None and 101 in stub.fans_list
+    assert len(stub.fans_list) == 101
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 按需性能分析测试
+"""
+
+import sys, time, threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from profiler import KEEP_PROFILES, Profiler, list_profiles, request_profile
+
+
+# 工作线程中不计轮数的迭代（回复、发送）也被采样，嵌套迭代结束前不停止采样
+def test_worker_threads_sampled(tmp_path):
+    control = tmp_path / "profile_request.json"
+    profiler = Profiler(control, tmp_path, log=lambda *_: None)
+    request_profile(control, "auto_reply", iterations=1, interval_ms=1)
+
+    def reply_worker():
+        with profiler.iteration("auto_reply", count=False):
+            with profiler.iteration("auto_reply", count=False):
+                pass
+            time.sleep(0.1)
+
+    with profiler.iteration("auto_reply"):
+        worker = threading.Thread(target=reply_worker, name="BiliMateReply-0")
+        worker.start()
+        worker.join()
+    session = profiler.session
+    session._thread.join(5)
+    assert session.state == "done" and session.done == 1
+    folded = (tmp_path / session.file).with_suffix(".folded").read_text(encoding="utf-8")
+    assert any(line.startswith("BiliMateReply-0;") for line in folded.splitlines())
+
+
+# 不同任务的结果按开始时间排序：新结果排在最前，清理时不被删除
+def test_newest_profile_kept_across_targets(tmp_path):
+    for day in range(1, KEEP_PROFILES + 1):
+        for suffix in (".txt", ".folded"):
+            (tmp_path / f"profile_video_data_202001{day:02d}_000000{suffix}").write_text("", encoding="utf-8")
+    control = tmp_path / "profile_request.json"
+    profiler = Profiler(control, tmp_path, log=lambda *_: None)
+    request_profile(control, "auto_reply", iterations=1, interval_ms=1)
+    with profiler.iteration("auto_reply"):
+        time.sleep(0.01)
+    session = profiler.session
+    session._thread.join(5)
+    profiles = list_profiles(tmp_path)
+    assert len(profiles) == KEEP_PROFILES
+    assert profiles[0][0].name == session.file
+    assert profiles[-1][0].name == "profile_video_data_20200102_000000.txt"
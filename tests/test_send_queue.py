@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 消息发送队列测试
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from send_queue import SendQueue
+
+requests = pytest.importorskip("requests")
+
+
+# 依次返回或抛出预设结果的发送函数
+class FakeSend:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+
+    def __call__(self, user_mid, msg):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def send_all(send):
+    results = []
+    queue = SendQueue(send, rate=1000, burst=10, retries=3, retry_delay=0,
+                      on_result=lambda mid, msg, ctx, error, latency: results.append(error))
+    queue.submit(1, "hi")
+    queue.close()
+    return results
+
+
+# 读取超时时消息可能已送达，不重试
+def test_read_timeout_not_retried():
+    send = FakeSend(requests.exceptions.ReadTimeout("read timed out"), {"code": 0})
+    results = send_all(send)
+    assert send.calls == 1
+    assert isinstance(results[0], requests.exceptions.ReadTimeout)
+
+
+# 连接被拒绝与限流类返回码重试
+def test_refused_and_transient_codes_retried():
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+    refused = requests.exceptions.ConnectionError(
+        MaxRetryError(None, "/", reason=NewConnectionError(None, "Connection refused")))
+    send = FakeSend(refused, {"code": -412, "message": "请求被拦截"}, {"code": 0})
+    assert send_all(send) == [None]
+    assert send.calls == 3
+
+
+# 非限流类返回码不重试
+def test_other_codes_not_retried():
+    send = FakeSend({"code": 21046, "message": "发送过于频繁"}, {"code": 0})
+    results = send_all(send)
+    assert send.calls == 1 and results[0].code == 21046
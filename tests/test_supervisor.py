@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 多进程监督测试
+"""
+
+import sys, json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+import supervisor
+from supervisor import WorkerSupervisor
+
+
+# 启动后立即退出的进程
+class CrashedProc:
+    pid = 0
+    returncode = 1
+
+    def poll(self):
+        return self.returncode
+
+
+# 单进程时反复崩溃：达到失败上限后在冷却期内不再重启
+def test_single_worker_retire_waits_for_cooldown(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(supervisor.time, "monotonic", lambda: clock[0])
+    accounts_file = tmp_path / "accounts.json"
+    accounts_file.write_text(json.dumps(["default"]))
+    sup = WorkerSupervisor(workers=1, base_delay=1, max_delay=10, max_failures=3, retire_seconds=600,
+                           accounts_file=accounts_file)
+    starts = []
+
+    def start_worker(worker):
+        worker.proc = CrashedProc()
+        worker.started = clock[0]
+        starts.append(clock[0])
+
+    monkeypatch.setattr(sup, "start_worker", start_worker)
+    monkeypatch.setattr(sup, "log", lambda msg: None)
+
+    sup.rebalance(force=True)
+    for _ in range(100):
+        clock[0] += 5
+        sup.check()
+    # 首次启动 + 两次退避重启，第三次失败后移出
+    assert len(starts) == 3
+    retired_until = sup.workers[0].retired_until
+    assert retired_until > clock[0]
+
+    # 冷却结束后重新启动
+    while clock[0] < retired_until:
+        clock[0] += 5
+        sup.check()
+    assert len(starts) == 4
+    assert starts[-1] >= retired_until
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BiliMate – 频道数据时间序列测试
+"""
+
+import sys, struct
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "BiliMate"))
+from timeseries import HEADER, RECORD, SEQ_OFFSET, StatsSeries
+
+
+# 只取得部分字段时不写入，避免其余字段记为 0
+def test_record_waits_for_all_fields(tmp_path):
+    series = StatsSeries(tmp_path)
+    assert not series.record(timestamp=60, total_fans=10)
+    assert series.stats()["minute"] == 0
+    assert series.record(timestamp=120, total_click=100, total_like=20, total_fav=5)
+    minute = series.tiers["minute"]
+    assert minute.record(minute.count - 1) == (120, 10, 100, 20, 5)
+    series.close()
+
+    # 重启后沿用已写入的数值，部分字段更新即可写入
+    series = StatsSeries(tmp_path)
+    assert series.record(timestamp=180, total_fans=11)
+    minute = series.tiers["minute"]
+    assert minute.record(minute.count - 1) == (180, 11, 100, 20, 5)
+    series.close()
+
+
+# 追加中断（seq 为奇数）：已发布的记录全部保留，只有未发布的槽位视为不完整
+def test_torn_append_keeps_published_records(tmp_path):
+    tiers = {"minute": (60, 4)}
+    series = StatsSeries(tmp_path, tiers)
+    for minute in range(1, 7):
+        series.record(timestamp=minute * 60, total_fans=minute, total_click=1, total_like=1, total_fav=1)
+    writer = series.tiers["minute"]
+    count = writer.count
+    # 模拟写入第 7 条时中断：seq 置为奇数，count 处的槽位（环形中最旧的记录）写了一半
+    struct.pack_into("<Q", writer.mm, SEQ_OFFSET, writer.seq + 1)
+    offset = HEADER.size + (count % 4) * RECORD.size
+    writer.mm[offset:offset + RECORD.size] = b"\xff" * RECORD.size
+    series.close()
+
+    series = StatsSeries(tmp_path, tiers)
+    writer = series.tiers["minute"]
+    assert writer.count == count and writer.seq % 2 == 0
+    assert writer.record(count - 1) == (360, 6, 1, 1, 1)
+    assert [writer.record(idx)[0] for idx in range(count - 4, count)] == [240, 240, 300, 360]
+    assert series.latest["total_fans"] == 6
+    series.close()